@@ -3,9 +3,16 @@ from flask import Flask
 
 def create_app():
     app = Flask(__name__)
+    # Rejects oversized requests while the form is parsed; uploads.py
+    # enforces MAX_UPLOAD_BYTES per file. The margin covers the other fields.
+    from app.uploads import MAX_UPLOAD_BYTES
+    app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + 64 * 1024
 
     from app.routes import main
     app.register_blueprint(main)
 
+    from app.catalog import start_catalog_watcher
+    start_catalog_watcher()
+
     return app
 
@@ -0,0 +1,185 @@
+# artifacts.py
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import cv2
+
+# Debug images and summaries are only written to disk in artifact mode.
+SAVE_ARTIFACTS = os.getenv("SAVE_ARTIFACTS", "0").lower() in ("1", "true", "yes")
+ARTIFACTS_DIR = os.getenv(
+    "ARTIFACTS_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "artifacts")
+)
+# Requests kept on disk: older manifests, and blobs only they use, are
+# removed once every ARTIFACTS_PRUNE_EVERY persisted requests.
+ARTIFACTS_RETENTION_SECONDS = float(os.getenv("ARTIFACTS_RETENTION_SECONDS", str(7 * 24 * 3600)))
+ARTIFACTS_MAX_REQUESTS = int(os.getenv("ARTIFACTS_MAX_REQUESTS", "500"))
+ARTIFACTS_PRUNE_EVERY = max(1, int(os.getenv("ARTIFACTS_PRUNE_EVERY", "50")))
+# Unreferenced blobs younger than this may belong to a request still being
+# persisted, so they are left alone.
+_ORPHAN_GRACE_SECONDS = 60
+
+
+class ArtifactStore:
+    """
+    Content-addressed store: every blob is written once under
+    objects/<sha[:2]>/<sha>.<ext>, and each request gets a manifest under
+    requests/<request_id>.json mapping artifact names to blob paths.
+    Concurrent requests never overwrite each other's files.
+
+    prune() keeps the newest max_requests manifests younger than
+    retention_seconds and deletes the rest, along with the blobs no kept
+    manifest refers to. It scans the whole store, so persisted requests
+    only trigger it once every prune_every of them (see request_persisted).
+    """
+
+    def __init__(self, root=ARTIFACTS_DIR, retention_seconds=ARTIFACTS_RETENTION_SECONDS,
+                 max_requests=ARTIFACTS_MAX_REQUESTS, prune_every=ARTIFACTS_PRUNE_EVERY):
+        self.root = root
+        self.retention_seconds = retention_seconds
+        self.max_requests = max_requests
+        self.prune_every = prune_every
+        self._persisted = 0
+        self._lock = threading.Lock()
+
+    def put_bytes(self, data, ext):
+        digest = hashlib.sha256(data).hexdigest()
+        rel_path = os.path.join("objects", digest[:2], f"{digest}.{ext}")
+        path = os.path.join(self.root, rel_path)
+        try:
+            # Reused blob: refresh it so prune() does not take it as an
+            # orphan before this request's manifest is written.
+            os.utime(path)
+        except FileNotFoundError:
+            self._write_atomic(path, data)
+        return rel_path
+
+    def put_manifest(self, request_id, manifest):
+        rel_path = os.path.join("requests", f"{request_id}.json")
+        self._write_atomic(os.path.join(self.root, rel_path), json.dumps(manifest, indent=2).encode())
+        return rel_path
+
+    def request_persisted(self):
+        """
+        Counts a persisted request and prunes on every prune_every-th one.
+        Returns prune()'s counts, or (0, 0) when it did not run.
+        """
+        with self._lock:
+            self._persisted += 1
+            due = self._persisted % self.prune_every == 0
+        return self.prune() if due else (0, 0)
+
+    def prune(self, now=None):
+        """
+        Applies the retention limits. Returns (manifests removed, blobs
+        removed).
+        """
+        now = now or time.time()
+        manifests = []
+        for path in glob.glob(os.path.join(self.root, "requests", "*.json")):
+            try:
+                manifests.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                continue
+        manifests.sort(reverse=True)
+
+        kept, removed = [], 0
+        for rank, (mtime, path) in enumerate(manifests):
+            if rank < self.max_requests and now - mtime <= self.retention_seconds:
+                kept.append(path)
+            elif self._remove(path):
+                removed += 1
+
+        referenced = set()
+        for path in kept:
+            try:
+                with open(path) as f:
+                    referenced.update(json.load(f).get("artifacts", {}).values())
+            except (OSError, ValueError):
+                continue
+
+        removed_blobs = 0
+        for path in glob.glob(os.path.join(self.root, "objects", "*", "*")):
+            rel_path = os.path.relpath(path, self.root)
+            try:
+                orphan = rel_path not in referenced and now - os.path.getmtime(path) > _ORPHAN_GRACE_SECONDS
+            except FileNotFoundError:
+                continue
+            if orphan and self._remove(path):
+                removed_blobs += 1
+        return removed, removed_blobs
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _write_atomic(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+# Shared by every request, so the persist count that paces pruning spans
+# requests.
+default_store = ArtifactStore()
+
+
+class RequestArtifacts:
+    """
+    Debug artifacts of one request, kept in memory. persist() encodes and
+    stores them only when artifact mode is enabled.
+    """
+
+    def __init__(self, request_id=None, enabled=None, store=None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self.enabled = SAVE_ARTIFACTS if enabled is None else enabled
+        self.store = store or default_store
+        self.images = {}
+        self.data = {}
+        self.paths = {}
+
+    def add_image(self, name, image):
+        self.images[name] = image
+
+    def add_json(self, name, obj):
+        self.data[name] = obj
+
+    def persist(self):
+        if not self.enabled:
+            return None
+
+        start = time.perf_counter()
+        for name, image in self.images.items():
+            ok, encoded = cv2.imencode(".jpg", image)
+            if ok:
+                self.paths[name] = self.store.put_bytes(encoded.tobytes(), "jpg")
+        for name, obj in self.data.items():
+            self.paths[name] = self.store.put_bytes(json.dumps(obj, indent=2).encode(), "json")
+
+        manifest_path = self.store.put_manifest(self.request_id, {
+            "request_id": self.request_id,
+            "created_at": time.time(),
+            "artifacts": self.paths
+        })
+        removed, removed_blobs = self.store.request_persisted()
+        print(f"[INFO] Saved {len(self.paths)} artifacts for request {self.request_id} "
+              f"to {manifest_path} in {(time.perf_counter() - start) * 1000:.0f} ms"
+              + (f", pruned {removed} old requests and {removed_blobs} blobs" if removed or removed_blobs else ""))
+        return self.paths
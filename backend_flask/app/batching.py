@@ -0,0 +1,107 @@
+# batching.py
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for up to max_wait_ms (or until
+    max_batch_size items are waiting), runs batch_fn once on the whole batch
+    and hands every caller its own result.
+
+    batch_fn takes a list of items and must return a list of results in the
+    same order. If it raises or returns the wrong number of results, every
+    caller in the batch gets the error. Calling the batcher waits at most
+    timeout seconds (None waits forever) and then raises TimeoutError.
+    Futures cancelled before their batch starts, including those of timed
+    out calls, are left out of the batch.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=5.0, name="micro-batcher", timeout=None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self.timeout = timeout
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self.batch_sizes = Counter()
+
+    def submit(self, item):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        future = self.submit(item)
+        try:
+            return future.result(timeout=timeout if timeout is not None else self.timeout)
+        except TimeoutError:
+            # Nobody is waiting any more; skip the item if it has not started.
+            future.cancel()
+            raise
+
+    def stats(self):
+        batches = sum(self.batch_sizes.values())
+        items = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": round(items / batches, 2) if batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            # Also restarts a worker that died, so queued items are not
+            # left waiting on a dead thread.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Marks the futures running, so callers can no longer cancel them
+            # and set_result below cannot fail on a cancelled one.
+            batch = [(item, future) for item, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            self.batch_sizes[len(batch)] += 1
+
+            # BaseException too: nothing a batch raises may end the worker.
+            try:
+                results = list(self.batch_fn(items))
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: batch_fn returned {len(results)} results for {len(items)} items")
+            except BaseException as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
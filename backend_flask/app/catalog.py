@@ -0,0 +1,103 @@
+# catalog.py
+import os
+import threading
+import time
+
+from app import recommend
+from app.parse_utils import reload_known_ingredients
+
+# Seconds between checks of the catalog files; 0 disables the watcher.
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", "0"))
+WATCHED_FILES = (recommend.CATALOG_PATH, recommend.KNOWN_INGREDIENTS_PATH)
+
+_reload_lock = threading.Lock()
+
+
+def reload_catalog(rebuild=False):
+    """
+    Reloads the known ingredient list and the recommender from disk and
+    swaps both in. Requests already running keep the snapshots they
+    started with.
+    """
+    with _reload_lock:
+        start = time.perf_counter()
+        ingredients = reload_known_ingredients()
+        recommender = recommend.reload_recommender(rebuild=rebuild)
+        seconds = time.perf_counter() - start
+
+    print(f"[INFO] Catalog reloaded in {seconds:.2f} s")
+    return {
+        "known_ingredients": len(ingredients),
+        "recommender": recommender.describe(),
+        "seconds": round(seconds, 3)
+    }
+
+
+def _file_state(paths):
+    state = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            state.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            state.append(None)
+    return tuple(state)
+
+
+class CatalogWatcher:
+    """
+    Polls the catalog files and reloads the catalog when their mtime or
+    size changes. A change is only acted on once it is unchanged for one
+    more interval, so a file still being written is not loaded.
+    """
+
+    def __init__(self, interval=CATALOG_WATCH_INTERVAL, paths=WATCHED_FILES, on_change=reload_catalog):
+        self.interval = interval
+        self.paths = paths
+        self.on_change = on_change
+        self.reloads = 0
+        self._state = _file_state(paths)
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def check(self):
+        state = _file_state(self.paths)
+        if state == self._state:
+            self._pending = None
+            return False
+        if state != self._pending:
+            self._pending = state
+            return False
+        self._state, self._pending = state, None
+        try:
+            self.on_change()
+            self.reloads += 1
+        except Exception as e:
+            print(f"[ERROR] Catalog reload failed, keeping the current snapshot: {e}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+
+_watcher = None
+
+
+def start_catalog_watcher(interval=CATALOG_WATCH_INTERVAL):
+    global _watcher
+    if interval > 0 and _watcher is None:
+        _watcher = CatalogWatcher(interval).start()
+        print(f"[INFO] Watching the product catalog every {interval:g} s")
+    return _watcher
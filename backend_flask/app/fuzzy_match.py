@@ -0,0 +1,150 @@
+# fuzzy_match.py
+import difflib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class FuzzyIndex:
+    """
+    Prebuilt index answering difflib.get_close_matches(word, words, n=1, cutoff)
+    without scanning the whole word list.
+
+    Candidates are narrowed with two upper bounds on SequenceMatcher.ratio():
+    the length bound (real_quick_ratio) selects a contiguous slice of the
+    length-sorted entries, and the character multiset bound (quick_ratio) is
+    computed for that slice in one vectorized step. Only the survivors are
+    scored with SequenceMatcher, best bound first, stopping as soon as no
+    remaining candidate can beat the current match. The result is identical
+    to difflib, including its tie-break on the larger string.
+    """
+
+    def __init__(self, words):
+        unique = list(OrderedDict.fromkeys(w for w in words if isinstance(w, str)))
+        unique.sort(key=len)
+
+        self.words = unique
+        self._exact = set(unique)
+        self._lengths = np.array([len(w) for w in unique], dtype=np.int64)
+
+        alphabet = sorted({ch for w in unique for ch in w})
+        self._char_to_col = {ch: i for i, ch in enumerate(alphabet)}
+
+        counts = np.zeros((len(unique), len(alphabet)), dtype=np.uint16)
+        for row, w in enumerate(unique):
+            for ch in w:
+                counts[row, self._char_to_col[ch]] += 1
+        self._counts = counts
+
+    def __len__(self):
+        return len(self.words)
+
+    def best_match(self, word, cutoff=0.8):
+        """
+        Returns the closest word with ratio >= cutoff, or None.
+        """
+        if not 0.0 <= cutoff <= 1.0:
+            raise ValueError("cutoff must be in [0.0, 1.0]: %r" % (cutoff,))
+
+        if word in self._exact:
+            return word
+
+        if not self.words:
+            return None
+
+        start, stop = self._length_window(len(word), cutoff)
+        if start >= stop:
+            return None
+
+        query = np.zeros(self._counts.shape[1], dtype=np.uint16)
+        for ch in word:
+            col = self._char_to_col.get(ch)
+            if col is not None:
+                query[col] += 1
+
+        lengths = self._lengths[start:stop]
+        common = np.minimum(self._counts[start:stop], query).sum(axis=1)
+        bounds = 2.0 * common / (lengths + len(word))
+        bounds[lengths + len(word) == 0] = 1.0
+
+        candidates = np.flatnonzero(bounds >= cutoff)
+        if candidates.size == 0:
+            return None
+        candidates = candidates[np.argsort(-bounds[candidates], kind="stable")]
+
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(word)
+
+        best_score, best_word = -1.0, None
+        for i in candidates:
+            if bounds[i] < best_score:
+                break
+            candidate = self.words[start + i]
+            matcher.set_seq1(candidate)
+            score = matcher.ratio()
+            if score >= cutoff and (score, candidate) > (best_score, best_word or ""):
+                best_score, best_word = score, candidate
+
+        return best_word
+
+    def correct(self, word, cutoff=0.8):
+        match = self.best_match(word, cutoff=cutoff)
+        return match if match is not None else word
+
+    def _length_window(self, query_len, cutoff):
+        # ratio <= 2 * min(la, lb) / (la + lb), so only lengths in
+        # [lq * c / (2 - c), lq * (2 - c) / c] can reach the cutoff.
+        # The window is widened by one on each side and the exact float
+        # bound is applied afterwards.
+        if cutoff <= 0.0:
+            return 0, len(self.words)
+        low = int(query_len * cutoff / (2.0 - cutoff)) - 1
+        high = int(query_len * (2.0 - cutoff) / cutoff) + 1
+        start = int(np.searchsorted(self._lengths, max(low, 0), side="left"))
+        stop = int(np.searchsorted(self._lengths, high, side="right"))
+        return start, stop
+
+
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+_INDEX_CACHE_SIZE = 8
+
+
+def get_fuzzy_index(words):
+    """
+    Returns the FuzzyIndex for a word list, building it on first use.
+    Indexes are cached by the list's contents, so a list changed in place
+    gets a fresh index; hashing the names costs ~35 us for the ~5k known
+    ingredients, far less than a scan.
+    """
+    if isinstance(words, FuzzyIndex):
+        return words
+
+    snapshot = tuple(words)
+    key = hash(snapshot)
+    with _index_cache_lock:
+        cached = _index_cache.get(key)
+        if cached is not None and cached[0] == snapshot:
+            _index_cache.move_to_end(key)
+            return cached[1]
+
+    index = FuzzyIndex(snapshot)
+
+    with _index_cache_lock:
+        _index_cache[key] = (snapshot, index)
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > _INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+
+    return index
+
+
+def fuzzy_best_match(word, known_words, cutoff=0.8):
+    """
+    Drop-in replacement for get_close_matches(word, known_words, n=1, cutoff)[0].
+    Returns None when nothing reaches the cutoff.
+    """
+    if not known_words:
+        return None
+    return get_fuzzy_index(known_words).best_match(word, cutoff=cutoff)
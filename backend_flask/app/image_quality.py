@@ -1,4 +1,6 @@
 #image_quality.py
+import time
+
 import cv2
 import numpy as np
 
@@ -106,4 +108,168 @@ def is_low_contrast(image, std_threshold=15, patch_size=50, percent=0.6):
     return ratio_low >= percent
 
 
+# Order in which issues are reported; the first one found blocks the scan.
+PRIORITY_MAP = {
+    "blurry": 1,
+    "dark": 2,
+    "low_contrast": 3,
+    "skewed": 4
+}
+
+ERROR_MESSAGES = {
+    "blurry": "The image is too blurry. Please retake with better focus.",
+    "dark": "The image is too dark. Please retake it in better lighting.",
+    "low_contrast": "The image has low contrast. Please retake it with clearer lighting and better background separation.",
+    "skewed": "The image is skewed. Please take the photo straight-on."
+}
+
+# Longest side of the grayscale image the quality checks run on.
+WORKING_MAX_SIDE = 1600
+
+
+class QualityReport:
+    """
+    Single-pass image quality analyzer.
+
+    The image is converted to grayscale once and reduced by an integer factor
+    so its longest side is at most max_side; the darkness, contrast and skew
+    checks reuse that image. Pixel-sized parameters (patch size, morphology
+    kernel, contour area) are scaled with it; intensity thresholds are
+    unchanged. The blur check runs on the native grayscale image: area
+    downscaling averages blur away, and the Laplacian variance thresholds
+    were tuned at the photo's own resolution. Checks run in PRIORITY_MAP order and,
+    with stop_early, stop at the first blocking issue.
+    """
 
+    def __init__(self, image, max_side=WORKING_MAX_SIDE):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        self.native_gray = gray
+        h, w = gray.shape
+        self.scale = 1.0
+        if max_side and max(h, w) > max_side:
+            # Integer factors keep INTER_AREA on its fast path.
+            factor = -(-max(h, w) // max_side)
+            self.scale = 1.0 / factor
+            gray = cv2.resize(gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+
+        self.gray = gray
+        self.issues = []
+        self.metrics = {}
+        self.timings = {}
+
+    @property
+    def top_issue(self):
+        return min(self.issues, key=lambda x: PRIORITY_MAP[x]) if self.issues else None
+
+    @property
+    def message(self):
+        return ERROR_MESSAGES.get(self.top_issue)
+
+    def analyze(self, stop_early=True):
+        checks = {
+            "blurry": self.check_blurry,
+            "dark": self.check_dark,
+            "low_contrast": self.check_low_contrast,
+            "skewed": self.check_skewed,
+        }
+        for issue in sorted(checks, key=lambda x: PRIORITY_MAP[x]):
+            start = time.perf_counter()
+            found = checks[issue]()
+            self.timings[issue] = time.perf_counter() - start
+            if found:
+                self.issues.append(issue)
+                if stop_early:
+                    break
+
+        print(f"[DEBUG] Quality metrics: {self.metrics} | issues: {self.issues}")
+        return self
+
+    def _px(self, size):
+        return max(1, int(round(size * self.scale)))
+
+    def _center(self):
+        h, w = self.gray.shape
+        return self.gray[h//4:h*3//4, w//4:w*3//4]
+
+    def check_blurry(self, avg_threshold=100.0, min_patch_threshold=30.0, allowed_bad_patches=1):
+        gray = self.native_gray
+        h, w = gray.shape
+        patches = [
+            gray[h//4:h//2, w//4:w//2],
+            gray[0:h//3, 0:w//3],
+            gray[0:h//3, -w//3:],
+            gray[-h//3:, 0:w//3],
+            gray[-h//3:, -w//3:]
+        ]
+        variances = [cv2.Laplacian(p, cv2.CV_64F).var() for p in patches]
+        avg_var = float(np.mean(variances))
+        low_patch_count = sum(v < min_patch_threshold for v in variances)
+
+        self.metrics["blur_variance"] = round(avg_var, 2)
+        self.metrics["blur_bad_patches"] = int(low_patch_count)
+        return avg_var < avg_threshold or low_patch_count > allowed_bad_patches
+
+    def check_dark(self, brightness_threshold=50, dark_pixel_ratio=0.6):
+        center = self._center()
+        median_brightness = float(np.median(center))
+        std_brightness = float(center.std())
+        ratio_dark = float(np.count_nonzero(center < 40)) / center.size
+
+        self.metrics["median_brightness"] = round(median_brightness, 2)
+        self.metrics["dark_pixel_ratio"] = round(ratio_dark, 2)
+        if median_brightness < brightness_threshold and ratio_dark > dark_pixel_ratio:
+            return True
+        return median_brightness < brightness_threshold and std_brightness < 15
+
+    def patch_stds(self, patch_size=50):
+        """
+        Standard deviation of every patch_size x patch_size tile of the
+        center region, computed in one reshape instead of a Python loop.
+        Tiles match is_low_contrast: the last full tile is never included.
+        """
+        center = self._center()
+        ps = self._px(patch_size)
+        ny = max(0, -(-(center.shape[0] - ps) // ps))
+        nx = max(0, -(-(center.shape[1] - ps) // ps))
+        if ny == 0 or nx == 0:
+            return np.empty(0)
+
+        tiles = center[:ny * ps, :nx * ps].astype(np.float64).reshape(ny, ps, nx, ps)
+        return tiles.std(axis=(1, 3))
+
+    def check_low_contrast(self, std_threshold=15, patch_size=50, percent=0.6):
+        stds = self.patch_stds(patch_size)
+        if stds.size == 0:
+            return False
+        ratio_low = float(np.count_nonzero(stds < std_threshold)) / stds.size
+        self.metrics["low_contrast_ratio"] = round(ratio_low, 2)
+        return ratio_low >= percent
+
+    def check_skewed(self, angle_threshold=6):
+        _, bin_img = cv2.threshold(self.gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (self._px(30), self._px(5)))
+        connected = cv2.morphologyEx(bin_img, cv2.MORPH_CLOSE, kernel)
+        contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        min_area = 100 * self.scale * self.scale
+        angles = []
+        for cnt in contours:
+            if cv2.contourArea(cnt) < min_area:
+                continue
+            angle = cv2.minAreaRect(cnt)[-1]
+            if angle < -45:
+                angle = 90 + angle
+            elif angle > 45:
+                angle = angle - 90
+            angles.append(angle)
+
+        if not angles:
+            return False
+
+        avg_angle = float(np.mean(angles))
+        self.metrics["text_angle"] = round(avg_angle, 2)
+        return abs(avg_angle) > angle_threshold
+
+
+def analyze_image_quality(image, stop_early=True, max_side=WORKING_MAX_SIDE):
+    return QualityReport(image, max_side=max_side).analyze(stop_early=stop_early)
@@ -0,0 +1,230 @@
+# ingredient_info.py
+import argparse
+import os
+import json
+import threading
+import time
+import openai
+
+from dotenv import load_dotenv
+load_dotenv()
+openai.api_key = os.getenv("OPENAI_API_KEY")
+
+from app.llm_cache import IngredientCache, canonical_name, empty_cache_stats
+from app.metrics import registry, cache_metrics, record_llm_call, LLM_FAILURES
+from app.skincare import safety_level
+
+DESCRIPTION_MODEL = "gpt-4o"
+# Bump when the prompt or model changes so cached answers are not reused.
+DESCRIPTION_PROMPT_VERSION = f"{DESCRIPTION_MODEL}/descriptions-v1"
+# Ingredients per GPT call when pre-warming the cache.
+DESCRIPTION_BATCH_SIZE = int(os.getenv("DESCRIPTION_BATCH_SIZE", "40"))
+
+KNOWN_INGREDIENTS_PATH = os.path.join(os.path.dirname(__file__), "data", "known_ingredients.json")
+
+_cache = None
+_cache_lock = threading.Lock()
+llm_stats = {"calls": 0, "ingredients_requested": 0, "failures": 0}
+# fetch_descriptions runs on StageGraph worker threads.
+_llm_stats_lock = threading.Lock()
+
+
+def get_description_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = IngredientCache()
+        return _cache
+
+
+def set_description_cache(cache):
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def _count_llm(**amounts):
+    with _llm_stats_lock:
+        for key, amount in amounts.items():
+            llm_stats[key] += amount
+
+
+def description_cache_stats():
+    with _llm_stats_lock:
+        llm = dict(llm_stats)
+    return {**get_description_cache().stats(), "llm": llm}
+
+
+def _description_cache_metrics():
+    # Scraping /metrics must not open (and create) the SQLite file.
+    with _cache_lock:
+        cache = _cache
+    return cache_metrics("descriptions", cache.stats() if cache is not None else empty_cache_stats())
+
+
+registry.register_collector(_description_cache_metrics)
+
+
+def fetch_descriptions(ingredient_names):
+    """
+    Asks GPT-4o to describe the given ingredients and returns
+    {canonical name: {"name", "description", "safety"}}. Ingredients
+    missing from the answer are left out. Raises on API or parse errors.
+    """
+    final_ingredient_string = ", ".join(ingredient_names)
+
+    prompt = f"""
+You are given a list of skincare ingredients. For each ingredient:
+1. Provide a short description.
+2. Mention if it's safe or if it may cause irritation/risk.
+
+Return a valid JSON **object**, not markdown. Keep each "name" exactly as
+written in the list. Use this format:
+{{
+  "ingredients": [
+    {{
+      "name": "Ingredient Name",
+      "description": "Short description.",
+      "safety": "Safety note."
+    }},
+    ...
+  ]
+}}
+
+Ingredient list: {final_ingredient_string}
+    """
+
+    _count_llm(calls=1, ingredients_requested=len(ingredient_names))
+    start = time.perf_counter()
+    completion = openai.ChatCompletion.create(
+        model=DESCRIPTION_MODEL,
+        messages=[
+            {"role": "system", "content": "You're a cosmetic ingredient safety assistant. Only respond with valid JSON."},
+            {"role": "user", "content": prompt.strip()}
+        ]
+    )
+    record_llm_call("descriptions", time.perf_counter() - start, completion)
+
+    response_content = completion.choices[0].message['content'].strip()
+
+    print("[DEBUG] Raw OpenAI response:", response_content[:300])
+
+    if response_content.startswith("```json"):
+        response_content = response_content.strip("```json").strip("```").strip()
+
+    items = json.loads(response_content).get("ingredients", [])
+
+    requested = [canonical_name(name) for name in ingredient_names]
+    descriptions = {}
+    for i, item in enumerate(items):
+        key = canonical_name(item.get("name", ""))
+        if key not in requested and len(items) == len(requested):
+            # GPT renamed the ingredient; fall back to the list position.
+            key = requested[i]
+        if key in requested:
+            descriptions[key] = {
+                "name": item.get("name", key),
+                "description": item.get("description", ""),
+                "safety": item.get("safety", "")
+            }
+    return descriptions
+
+
+def build_summary(ingredients):
+    """
+    Overall product safety summary assembled from the per-ingredient notes.
+    """
+    if not ingredients:
+        return "No ingredients could be described for this product."
+
+    levels = {"safe": [], "harmful": [], "neutral": [], "unknown": []}
+    for item in ingredients:
+        levels[safety_level(item.get("safety", ""))].append(item["name"])
+
+    parts = [f"{len(levels['safe'])} of {len(ingredients)} ingredients are generally considered safe."]
+    if levels["harmful"]:
+        parts.append(f"May cause irritation or other risks: {', '.join(levels['harmful'])}.")
+    if levels["neutral"]:
+        parts.append(f"Worth a patch test on sensitive skin: {', '.join(levels['neutral'])}.")
+    if not levels["harmful"] and not levels["neutral"]:
+        parts.append("No ingredients were flagged as a concern.")
+    return " ".join(parts)
+
+
+def get_ingredient_descriptions(final_ingredient_list):
+    """
+    Generate descriptions and safety warnings for the ingredients and
+    return {"ingredients": [...], "summary": "..."}. Descriptions come from
+    the persistent cache; only unseen ingredients are sent to GPT-4o.
+    Returns None if the GPT call fails.
+    """
+    cache = get_description_cache()
+    names = {}
+    for ingredient in final_ingredient_list:
+        names.setdefault(canonical_name(ingredient), ingredient)
+    names.pop("", None)
+
+    descriptions = cache.get_many(names, DESCRIPTION_PROMPT_VERSION)
+    missing = [name for key, name in names.items() if key not in descriptions]
+    print(f"[INFO] Ingredient descriptions: {len(descriptions)} cached, {len(missing)} sent to GPT")
+
+    if missing:
+        try:
+            fetched = fetch_descriptions(missing)
+        except Exception as e:
+            _count_llm(failures=1)
+            LLM_FAILURES.inc(purpose="descriptions")
+            print(f"[ERROR] Failed to parse OpenAI response: {e}")
+            return None
+        cache.put_many(fetched, DESCRIPTION_PROMPT_VERSION)
+        descriptions.update(fetched)
+
+    ingredients = [descriptions[key] for key in names if key in descriptions]
+    return {"ingredients": ingredients, "summary": build_summary(ingredients)}
+
+
+def prewarm_description_cache(ingredient_names=None, batch_size=DESCRIPTION_BATCH_SIZE, limit=None):
+    """
+    Describes every ingredient not cached yet, in batches of batch_size.
+    Defaults to the known ingredients list. Returns the number newly cached.
+    """
+    if ingredient_names is None:
+        with open(KNOWN_INGREDIENTS_PATH, "r") as f:
+            ingredient_names = json.load(f)
+
+    cache = get_description_cache()
+    names = {}
+    for ingredient in ingredient_names:
+        names.setdefault(canonical_name(ingredient), ingredient)
+    names.pop("", None)
+
+    cached = cache.get_many(names, DESCRIPTION_PROMPT_VERSION)
+    missing = [name for key, name in names.items() if key not in cached]
+    if limit is not None:
+        missing = missing[:limit]
+    print(f"[INFO] Pre-warming {len(missing)} of {len(names)} ingredients")
+
+    added = 0
+    for i in range(0, len(missing), batch_size):
+        batch = missing[i:i + batch_size]
+        try:
+            fetched = fetch_descriptions(batch)
+        except Exception as e:
+            _count_llm(failures=1)
+            LLM_FAILURES.inc(purpose="descriptions")
+            print(f"[WARN] Batch {i // batch_size + 1} failed: {e}")
+            continue
+        cache.put_many(fetched, DESCRIPTION_PROMPT_VERSION)
+        added += len(fetched)
+        print(f"[INFO] Cached {added}/{len(missing)}")
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-warm the ingredient description cache.")
+    parser.add_argument("--batch-size", type=int, default=DESCRIPTION_BATCH_SIZE)
+    parser.add_argument("--limit", type=int, default=None, help="Describe at most this many new ingredients")
+    args = parser.parse_args()
+
+    prewarm_description_cache(batch_size=args.batch_size, limit=args.limit)
+    print(json.dumps(description_cache_stats(), indent=2))
@@ -0,0 +1,139 @@
+# inverted_index.py
+import numpy as np
+
+# Relative slack on pruning comparisons so float rounding never drops a
+# product that belongs in the top k.
+_PRUNE_SLACK = 1e-9
+
+
+class InvertedIndex:
+    """
+    Ingredient -> product posting lists for exact top-k cosine similarity
+    over binary ingredient vectors.
+
+    For a query q and product d, cos(q, d) = |q & d| / sqrt(|q| * |d|), so
+    products are ranked by |q & d| / sqrt(|d|): each shared ingredient adds
+    w(d) = 1 / sqrt(|d|). Query terms are accumulated rarest first; once the
+    largest score the remaining (common) terms could still give a new
+    product (bounded by their largest weights and by sqrt of their count)
+    is below the current k-th best, no new candidates are admitted
+    and the long posting lists are only probed for the surviving candidates,
+    which are themselves dropped as soon as they can no longer reach the
+    top k (MaxScore-style pruning). Results are identical to scoring every
+    product, with ties broken by row order.
+    """
+
+    def __init__(self, matrix):
+        matrix = matrix.tocsr()
+        self.num_docs, self.num_terms = matrix.shape
+        self.doc_lengths = np.diff(matrix.indptr).astype(np.int64)
+        self.doc_weights = np.where(self.doc_lengths > 0, 1.0 / np.sqrt(np.maximum(self.doc_lengths, 1)), 0.0)
+
+        csc = matrix.tocsc()
+        csc.sort_indices()
+        self.indptr = csc.indptr.astype(np.int64)
+        self.postings_ids = csc.indices.astype(np.int32)
+        self.posting_lengths = np.diff(self.indptr)
+
+        # Largest weight any product in a posting list can add.
+        self.term_max_weight = np.zeros(self.num_terms)
+        nonempty = np.flatnonzero(self.posting_lengths)
+        if len(nonempty):
+            self.term_max_weight[nonempty] = np.maximum.reduceat(
+                self.doc_weights[self.postings_ids], self.indptr[nonempty]
+            )
+
+    def _kth_score(self, ids, counts, k):
+        partial = counts * self.doc_weights[ids]
+        return np.partition(partial, len(partial) - k)[len(partial) - k]
+
+    def postings(self, term):
+        return self.postings_ids[self.indptr[term]:self.indptr[term + 1]]
+
+    def top_k(self, query_terms, k, allowed=None, ties=False):
+        """
+        Returns (rows, similarities) of the k products most similar to the
+        binary query, best first. allowed is an optional boolean mask of
+        products that may be returned. Products sharing no ingredient with
+        the query fill the remaining places in row order. With ties=True,
+        every product as similar as the k-th is returned too, so callers
+        can reorder ties by another key.
+        """
+        terms = np.unique(np.asarray(query_terms, dtype=np.int64))
+        query_norm = np.sqrt(len(terms))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        terms = terms[self.posting_lengths[terms] > 0]
+        terms = terms[np.argsort(self.posting_lengths[terms], kind="stable")]
+        remaining_bound = np.cumsum(self.term_max_weight[terms][::-1])[::-1]
+
+        def new_doc_bound(start):
+            # A product seen in none of terms[:start] shares at most
+            # r = len(terms) - start of the rest, and at most |d| in total,
+            # so it scores at most min(r, |d|) / sqrt(|d|) <= sqrt(r).
+            return min(remaining_bound[start], np.sqrt(len(terms) - start))
+
+        accumulator = np.zeros(self.num_docs, dtype=np.int32)
+        ids = np.empty(0, dtype=np.int64)
+        counts = None
+        threshold = 0.0
+        admitting = True
+
+        for i, term in enumerate(terms):
+            posting = self.postings(term)
+            later_terms = len(terms) - i - 1
+
+            if admitting:
+                if allowed is not None:
+                    posting = posting[allowed[posting]]
+                ids = np.concatenate([ids, posting[accumulator[posting] == 0]])
+                accumulator[posting] += 1
+
+                # Partial scores are at most sqrt(i + 1), so the k-th best
+                # can only exceed the bound for new products from here on.
+                bound = new_doc_bound(i + 1) if later_terms else None
+                if bound is not None and len(ids) >= k and bound < np.sqrt(i + 1):
+                    counts = accumulator[ids].astype(np.int64)
+                    threshold = self._kth_score(ids, counts, k)
+                    if bound * (1 + _PRUNE_SLACK) < threshold:
+                        admitting = False
+            else:
+                # Drop candidates that cannot reach the k-th best even if
+                # they contain every remaining query term.
+                lengths = self.doc_lengths[ids]
+                best_possible = (counts + np.minimum(later_terms + 1, lengths - counts)) * self.doc_weights[ids]
+                keep = best_possible * (1 + _PRUNE_SLACK) >= threshold
+                ids, counts = ids[keep], counts[keep]
+
+                pos = np.minimum(np.searchsorted(posting, ids), len(posting) - 1)
+                counts = counts + (posting[pos] == ids)
+                threshold = self._kth_score(ids, counts, k)
+
+        if admitting:
+            counts = accumulator[ids].astype(np.int64)
+
+        # Rank by |q & d|^2 / |d|: exact for equal cosines, unlike the
+        # rounded square roots.
+        keys = np.where(self.doc_lengths[ids] > 0, counts ** 2 / np.maximum(self.doc_lengths[ids], 1), 0.0)
+        order = np.lexsort((ids, -keys))
+        if ties and len(order) > k:
+            # Pruning only drops products scoring below the k-th, so all
+            # products tied with it are among ids.
+            k = int(np.count_nonzero(keys >= keys[order[k - 1]]))
+        order = order[:k]
+        rows, counts = ids[order], counts[order]
+
+        if len(rows) < k:
+            fill = np.ones(self.num_docs, dtype=bool) if allowed is None else allowed.copy()
+            fill[ids] = False
+            # The fill products all score 0, so they all tie.
+            extra = np.flatnonzero(fill)
+            if not ties:
+                extra = extra[:k - len(rows)]
+            rows = np.concatenate([rows, extra])
+            counts = np.concatenate([counts, np.zeros(len(extra), dtype=np.int64)])
+
+        if query_norm == 0:
+            return rows, np.zeros(len(rows))
+        return rows, counts * self.doc_weights[rows] / query_norm
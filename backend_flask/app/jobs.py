@@ -0,0 +1,278 @@
+# jobs.py
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from app.metrics import registry, Family, JOB_SECONDS, JOBS_FINISHED
+from app.pipeline import AnalysisError
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# Jobs allowed to wait for a worker before submissions are rejected.
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "16"))
+# Seconds a finished job's result is kept for polling.
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "600"))
+JOB_CALLBACK_TIMEOUT = float(os.getenv("JOB_CALLBACK_TIMEOUT", "5"))
+# Comma-separated hosts callback_url may point at; "*" allows any public
+# host. Empty (the default) turns callbacks off.
+JOB_CALLBACK_HOSTS = [host.strip().lower() for host in os.getenv("JOB_CALLBACK_HOSTS", "").split(",") if host.strip()]
+JOB_CALLBACK_WORKERS = int(os.getenv("JOB_CALLBACK_WORKERS", "2"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class CallbackError(Exception):
+    pass
+
+
+def check_callback_url(url, allowed_hosts=None):
+    """
+    Raises CallbackError unless url is an http(s) URL on an allowed host
+    whose addresses all resolve to public IPs (no loopback, link-local,
+    private or reserved ranges).
+    """
+    allowed_hosts = JOB_CALLBACK_HOSTS if allowed_hosts is None else allowed_hosts
+    if not allowed_hosts:
+        raise CallbackError("Job callbacks are disabled on this server.")
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise CallbackError("callback_url must be an http(s) URL")
+    host = parsed.hostname.lower()
+    if "*" not in allowed_hosts and host not in allowed_hosts:
+        raise CallbackError(f"callback_url host {host} is not allowed")
+
+    try:
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)}
+    except (OSError, ValueError) as e:
+        raise CallbackError(f"callback_url host {host} could not be resolved: {e}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise CallbackError(f"callback_url host {host} resolves to a non-public address")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect could point the callback at an address check_callback_url
+    # never saw.
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirect)
+
+
+class Job:
+    def __init__(self, stages, callback_url=None):
+        self.id = uuid.uuid4().hex
+        self.state = QUEUED
+        self.stages = list(stages)
+        self.completed_stages = []
+        self.stage_times = {}
+        self.events = []
+        self.result = None
+        self.error = None
+        self.status_code = None
+        self.callback_url = callback_url
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def report(self, stage, data=None):
+        with self._changed:
+            if stage not in self.completed_stages:
+                self.completed_stages.append(stage)
+            self.stage_times[stage] = round(time.time() - (self.started_at or self.created_at), 3)
+            self.events.append((stage, data))
+            self._changed.notify_all()
+
+    def finish(self):
+        with self._changed:
+            self.finished_at = time.time()
+            self._done.set()
+            self._changed.notify_all()
+
+    def iter_events(self, keepalive=15.0):
+        """
+        Yields (stage, data) for every reported stage, including those
+        reported before the call, until the job finishes. Yields None when
+        nothing happened for keepalive seconds.
+        """
+        sent = 0
+        while True:
+            with self._changed:
+                if sent >= len(self.events) and not self.done:
+                    self._changed.wait(keepalive)
+                pending = self.events[sent:]
+                finished = self.done
+            sent += len(pending)
+
+            if not pending and not finished:
+                yield None
+            for event in pending:
+                yield event
+            if finished and sent >= len(self.events):
+                return
+
+    def to_dict(self, include_result=True):
+        total = len(self.stages)
+        finished = len([s for s in self.completed_stages if s in self.stages])
+        body = {
+            "job_id": self.id,
+            "state": self.state,
+            "progress": {
+                "completed_stages": list(self.completed_stages),
+                "stage_seconds": dict(self.stage_times),
+                "current_stage": self.stages[finished] if self.state == RUNNING and finished < total else None,
+                "fraction": round(finished / total, 2) if total else 0.0
+            },
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if include_result and self.state == SUCCEEDED:
+            body["result"] = self.result
+        if self.state == FAILED:
+            body["error"] = self.error
+            body["status_code"] = self.status_code
+        return body
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded worker pool. At most max_workers jobs run and
+    max_queued wait; further submissions raise QueueFullError. Finished
+    jobs are dropped result_ttl seconds after they complete. Callbacks are
+    sent from their own small pool so a slow receiver never holds an
+    analysis worker.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE, result_ttl=JOB_RESULT_TTL,
+                 callback_workers=JOB_CALLBACK_WORKERS, callback_hosts=None):
+        self.max_pending = max_workers + max_queued
+        self.result_ttl = result_ttl
+        self.callback_hosts = callback_hosts
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job")
+        self._callback_executor = ThreadPoolExecutor(max_workers=callback_workers, thread_name_prefix="job-callback")
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, stages=(), callback_url=None, **kwargs):
+        """
+        Schedules fn(*args, progress=job.report, **kwargs) and returns the Job.
+        Raises CallbackError for a callback_url check_callback_url rejects.
+        """
+        if callback_url:
+            check_callback_url(callback_url, self.callback_hosts)
+        self.expire()
+        job = Job(stages, callback_url=callback_url)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError("Analysis queue is full, try again later.")
+            self._pending += 1
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        self.expire()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def expire(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            states = {}
+            for job in self._jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            return {"pending": self._pending, "max_pending": self.max_pending, "jobs": states}
+
+    def _run(self, job, fn, args, kwargs):
+        job.state = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = fn(*args, progress=job.report, **kwargs)
+            job.state = SUCCEEDED
+        except AnalysisError as e:
+            job.error = e.payload
+            job.status_code = e.status
+            job.state = FAILED
+        except Exception as e:
+            traceback.print_exc()
+            job.error = {"error": f"Analysis failed: {e}"}
+            job.status_code = 500
+            job.state = FAILED
+        finally:
+            with self._lock:
+                self._pending -= 1
+            job.finish()
+            JOBS_FINISHED.inc(state=job.state)
+            JOB_SECONDS.observe(job.finished_at - job.started_at, state=job.state)
+
+        if job.callback_url:
+            self._callback_executor.submit(self._send_callback, job)
+
+    def _send_callback(self, job):
+        try:
+            # Resolved again: DNS may have changed since the job was accepted.
+            check_callback_url(job.callback_url, self.callback_hosts)
+            body = json.dumps(job.to_dict()).encode()
+            req = urllib.request.Request(
+                job.callback_url, data=body, method="POST",
+                headers={"Content-Type": "application/json"}
+            )
+            with _callback_opener.open(req, timeout=JOB_CALLBACK_TIMEOUT) as resp:
+                print(f"[INFO] Job {job.id} callback answered {resp.status}")
+        except Exception as e:
+            print(f"[WARN] Job {job.id} callback to {job.callback_url} failed: {e}")
+
+
+job_manager = JobManager()
+
+
+def _job_metrics():
+    stats = job_manager.stats()
+    jobs = Family("jobs", "gauge", "Analysis jobs kept by the job manager, by state.")
+    for state in (QUEUED, RUNNING, SUCCEEDED, FAILED):
+        jobs.add(stats["jobs"].get(state, 0), state=state)
+    return [
+        Family("jobs_pending", "gauge", "Jobs queued or running.").add(stats["pending"]),
+        Family("jobs_max_pending", "gauge", "Jobs accepted before submissions are rejected.").add(stats["max_pending"]),
+        jobs,
+    ]
+
+
+registry.register_collector(_job_metrics)
@@ -0,0 +1,156 @@
+# llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache", "llm_cache.sqlite")
+)
+
+
+def canonical_name(name):
+    return " ".join(str(name).lower().replace("‑", "-").split()).strip(" .,;:")
+
+
+def empty_cache_stats():
+    """
+    stats() of a cache that has not been opened yet.
+    """
+    return {"hits": 0, "misses": 0, "hit_rate": 0.0, "entries": 0}
+
+
+class _SQLiteCache(ABC):
+    """
+    One SQLite table shared between threads, with hit/miss counters.
+    Subclasses provide the schema and count().
+    """
+    schema = ""
+
+    def __init__(self, path=None):
+        path = path or LLM_CACHE_PATH
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(self.schema)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def count(self):
+        """
+        Rows stored, across all prompt versions.
+        """
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": self.count()
+        }
+
+
+class IngredientCache(_SQLiteCache):
+    """
+    Persistent per-ingredient store of LLM answers, keyed by canonical
+    ingredient name and prompt version so a prompt change never serves
+    stale answers. Safe to share between threads.
+    """
+    schema = (
+        "CREATE TABLE IF NOT EXISTS ingredient_descriptions ("
+        " name TEXT NOT NULL,"
+        " prompt_version TEXT NOT NULL,"
+        " data TEXT NOT NULL,"
+        " created_at REAL NOT NULL,"
+        " PRIMARY KEY (name, prompt_version))"
+    )
+
+    def get_many(self, names, prompt_version):
+        """
+        Returns {canonical name: cached entry} for the names found.
+        """
+        keys = list(dict.fromkeys(canonical_name(n) for n in names))
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    "SELECT name, data FROM ingredient_descriptions "
+                    f"WHERE prompt_version = ? AND name IN ({','.join('?' * len(chunk))})",
+                    [prompt_version, *chunk]
+                ).fetchall()
+                found.update((name, json.loads(data)) for name, data in rows)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries, prompt_version):
+        """
+        entries: {canonical name: JSON-serializable entry}
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ingredient_descriptions (name, prompt_version, data, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(canonical_name(name), prompt_version, json.dumps(entry), now) for name, entry in entries.items()]
+            )
+            self._conn.commit()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ingredient_descriptions").fetchone()[0]
+
+
+class TranslationCache(_SQLiteCache):
+    """
+    LLM translations keyed by the SHA-256 of the whitespace-normalized
+    source text and the prompt version.
+    """
+    schema = (
+        "CREATE TABLE IF NOT EXISTS translations ("
+        " text_hash TEXT NOT NULL,"
+        " prompt_version TEXT NOT NULL,"
+        " translation TEXT NOT NULL,"
+        " created_at REAL NOT NULL,"
+        " PRIMARY KEY (text_hash, prompt_version))"
+    )
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+    def get(self, text, prompt_version):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation FROM translations WHERE text_hash = ? AND prompt_version = ?",
+                (self.text_hash(text), prompt_version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, text, translation, prompt_version):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations (text_hash, prompt_version, translation, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (self.text_hash(text), prompt_version, translation, time.time())
+            )
+            self._conn.commit()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
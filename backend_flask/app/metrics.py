@@ -0,0 +1,239 @@
+# metrics.py
+import bisect
+import math
+import threading
+
+PREFIX = "beautylens_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers a 2 ms parse step up to a slow GPT call.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class Family:
+    """
+    One metric family as rendered at scrape time: a name, a type
+    (counter, gauge or histogram), a help line and its samples.
+    """
+
+    def __init__(self, name, kind, help_text):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.samples = []
+
+    def add(self, value, suffix="", **labels):
+        self.samples.append((suffix, tuple(labels.items()), value))
+        return self
+
+    def add_histogram(self, buckets, counts, total, **labels):
+        """
+        Adds the samples of one histogram series; counts holds the
+        non-cumulative count of each bucket plus the +Inf overflow.
+        """
+        cumulative = 0
+        for bound, count in zip([*buckets, math.inf], counts):
+            cumulative += count
+            self.add(cumulative, "_bucket", **labels, le=_format_value(bound))
+        self.add(total, "_sum", **labels)
+        self.add(cumulative, "_count", **labels)
+        return self
+
+    def render(self):
+        name = PREFIX + self.name
+        lines = [f"# HELP {name} {self.help}", f"# TYPE {name} {self.kind}"]
+        lines.extend(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+                     for suffix, labels, value in self.samples)
+        return "\n".join(lines)
+
+
+def histogram_from_counts(name, help_text, value_counts, buckets=BATCH_SIZE_BUCKETS, **labels):
+    """
+    Histogram family of observations already tallied as {value: count},
+    such as MicroBatcher.batch_sizes.
+    """
+    counts = [0] * (len(buckets) + 1)
+    total = 0
+    for value, count in value_counts.items():
+        counts[bisect.bisect_left(buckets, value)] += count
+        total += value * count
+    return Family(name, "histogram", help_text).add_histogram(buckets, counts, total, **labels)
+
+
+def cache_metrics(cache, stats):
+    """
+    Hit, miss and entry families of one cache from its stats() dict.
+    """
+    return [
+        Family("cache_hits_total", "counter", "Cache lookups answered from the cache.").add(stats["hits"], cache=cache),
+        Family("cache_misses_total", "counter", "Cache lookups that missed.").add(stats["misses"], cache=cache),
+        Family("cache_entries", "gauge", "Entries held by the cache.").add(stats["entries"], cache=cache),
+    ]
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._series.get(self._key(labels), 0)
+
+    def collect(self):
+        family = Family(self.name, self.kind, self.help)
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                family.add(value, **dict(zip(self.labelnames, key)))
+        return [family]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, **labels):
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def collect(self):
+        family = Family(self.name, self.kind, self.help)
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                family.add_histogram(self.buckets, counts, total, **dict(zip(self.labelnames, key)))
+        return [family]
+
+
+class Registry:
+    """
+    Metrics recorded on the hot path (counters and histograms, one lock
+    and a bisect per observation) plus collectors that turn the stats the
+    caches, job queue and batchers already keep into families at scrape
+    time.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """
+        collector() returns a list of Family; it is called on every scrape.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+        return collector
+
+    def collect(self):
+        with self._lock:
+            sources = [metric.collect for metric in self._metrics] + list(self._collectors)
+        families = {}
+        for source in sources:
+            try:
+                collected = source()
+            except Exception as e:
+                print(f"[WARN] Metrics collector {getattr(source, '__name__', source)} failed: {e}")
+                continue
+            for family in collected:
+                # Series of the same family may come from several collectors
+                # (e.g. one per batcher).
+                merged = families.setdefault(family.name, Family(family.name, family.kind, family.help))
+                merged.samples.extend(family.samples)
+        return list(families.values())
+
+    def render(self):
+        return "\n".join(family.render() for family in self.collect()) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "stage_seconds", "Seconds spent in each stage of a label analysis.", ["stage"])
+OCR_STEP_SECONDS = registry.histogram(
+    "ocr_step_seconds", "Seconds spent in each step of staged OCR (recognition passes, language detection).", ["step"])
+JOB_SECONDS = registry.histogram(
+    "job_seconds", "Seconds from starting an analysis job to its result.", ["state"])
+JOBS_FINISHED = registry.counter(
+    "jobs_finished_total", "Analysis jobs finished, by final state.", ["state"])
+LLM_REQUEST_SECONDS = registry.histogram(
+    "llm_request_seconds", "Seconds per OpenAI chat completion call.", ["purpose"])
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "OpenAI tokens used, by purpose and prompt/completion.", ["purpose", "type"])
+LLM_FAILURES = registry.counter(
+    "llm_failures_total", "OpenAI calls that failed or returned unusable output.", ["purpose"])
+
+
+def record_llm_call(purpose, seconds, completion=None):
+    """
+    Records the latency and token usage of one chat completion.
+    """
+    LLM_REQUEST_SECONDS.observe(seconds, purpose=purpose)
+    usage = getattr(completion, "usage", None) or {}
+    for kind in ("prompt_tokens", "completion_tokens"):
+        tokens = usage.get(kind) if isinstance(usage, dict) else getattr(usage, kind, None)
+        if tokens:
+            LLM_TOKENS.inc(tokens, purpose=purpose, type=kind.split("_")[0])
@@ -1,11 +1,16 @@
 # model.py
+import glob
 import os
+import time
 import torch
 import torch.nn as nn 
 import torchvision.models as models
 import torchvision.transforms as T
 import cv2
 from PIL import Image
+from app.batching import MicroBatcher
+from app.metrics import registry, histogram_from_counts
+from app.model_backends import build_backend
 
 LABEL_TO_IDX = {"dry": 0, "normal": 1, "oily": 2}
 IDX_TO_LABEL = {v: k for k, v in LABEL_TO_IDX.items()}
@@ -22,36 +27,148 @@ device = "cuda" if torch.cuda.is_available() else "cpu"
 
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "weights", "skin_type_model2.pth")
 
-def load_model():
-    try:
-        resnet = models.resnet50(weights=models.ResNet50_Weights.IMAGENET1K_V1)
-        
-        num_features = resnet.fc.in_features
-        
+# Concurrent /classify_skin requests are grouped into one forward pass.
+# A max batch size of 1 disables batching.
+BATCH_MAX_SIZE = int(os.getenv("SKIN_BATCH_MAX_SIZE", "8"))
+BATCH_WINDOW_MS = float(os.getenv("SKIN_BATCH_WINDOW_MS", "5"))
+# Seconds a /classify_skin request waits for its batch before giving up.
+BATCH_TIMEOUT = float(os.getenv("SKIN_BATCH_TIMEOUT", "30"))
+
+# eager | torchscript | int8_dynamic | int8_static | onnx (see model_backends.py)
+SKIN_MODEL_BACKEND = os.getenv("SKIN_MODEL_BACKEND", "eager")
+MODEL_LOAD_SECONDS = None
+
+_SAMPLE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# int8_static calibration photos. The defaults are kept apart from the
+# labelled sample photos (dry.jpeg, normal.jpg, oily.jpg), which are the
+# held-out set check_skin_backends.py compares the backends on.
+CALIBRATION_IMAGES = [
+    p for p in os.getenv("SKIN_CALIBRATION_IMAGES", "").split(",") if p
+] or sorted(glob.glob(os.path.join(_SAMPLE_DIR, "calibration", "*.jpg")))
+SAMPLE_IMAGES = [os.path.join(_SAMPLE_DIR, name) for name in ("dry.jpeg", "normal.jpg", "oily.jpg")]
+
+
+def build_architecture(device_type=device):
+    """
+    ResNet-50 with our Dropout+Linear head and no pretrained weights;
+    everything is overwritten by the checkpoint.
+    """
+    with torch.device(device_type):
+        resnet = models.resnet50(weights=None)
         resnet.fc = nn.Sequential(
-    nn.Dropout(0.4),
-    nn.Linear(resnet.fc.in_features, len(LABEL_TO_IDX))
-)
+            nn.Dropout(0.4),
+            nn.Linear(resnet.fc.in_features, len(LABEL_TO_IDX))
+        )
+    return resnet
 
-        
-        model = resnet.to(device)
 
-        state_dict = torch.load(MODEL_PATH, map_location=device)
-        
-        model.load_state_dict(state_dict, strict=False)  
+def load_state_dict_file(path):
+    try:
+        return torch.load(path, map_location=device, mmap=True, weights_only=True)
+    except RuntimeError as e:
+        # Legacy (non-zip) checkpoints cannot be memory-mapped.
+        print(f"[INFO] Checkpoint not mmap-able ({e}), loading into memory.")
+        return torch.load(path, map_location=device, weights_only=True)
 
-        model.eval()
 
-        print(f"Loaded model from: {MODEL_PATH}")
-        return model
+def load_model(path=MODEL_PATH):
+    """
+    Builds the architecture on the meta device and assigns the checkpoint
+    tensors directly, so no ImageNet download and no duplicate allocation.
+    A checkpoint that cannot be read returns None; a checkpoint whose keys
+    do not match the architecture raises.
+    """
+    global MODEL_LOAD_SECONDS
 
+    start = time.perf_counter()
+    try:
+        state_dict = load_state_dict_file(path)
     except Exception as e:
         print("Failed to load model.")
         print(e)
         return None
 
+    model = build_architecture("meta")
+    missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+    if missing or unexpected:
+        raise RuntimeError(
+            f"Checkpoint {path} does not match the skin-type model: "
+            f"missing keys {missing}, unexpected keys {unexpected}"
+        )
+
+    model = model.to(device)
+    model.eval()
+
+    MODEL_LOAD_SECONDS = time.perf_counter() - start
+    print(f"Loaded model from: {path} in {MODEL_LOAD_SECONDS * 1000:.0f} ms")
+    return model
+
+
 model_base = load_model()
 
+
+def preprocess_skin_image(image_bgr):
+    img_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+    pil_img = Image.fromarray(img_rgb)
+    return val_transform(pil_img)
+
+
+def load_calibration_batches(paths=None, batch_size=8):
+    tensors = []
+    for path in paths or CALIBRATION_IMAGES:
+        image_bgr = cv2.imread(path)
+        if image_bgr is None:
+            print(f"[WARN] Calibration image not found: {path}")
+            continue
+        tensors.append(preprocess_skin_image(image_bgr))
+    return [torch.stack(tensors[i:i + batch_size]) for i in range(0, len(tensors), batch_size)]
+
+
+def build_inference_model(model, backend=SKIN_MODEL_BACKEND):
+    """
+    Wraps the loaded fp32 model in the configured CPU inference backend,
+    falling back to eager mode if the backend cannot be built.
+    """
+    if model is None:
+        return None
+
+    try:
+        calibration = load_calibration_batches() if backend == "int8_static" else None
+        inference = build_backend(model, backend, calibration_batches=calibration, img_size=IMG_SIZE)
+    except Exception as e:
+        print(f"[WARN] Could not build '{backend}' skin model backend, using eager: {e}")
+        inference = build_backend(model, "eager", img_size=IMG_SIZE)
+
+    print(f"[INFO] Skin model backend: {inference.describe(include_size=False)}")
+    return inference
+
+
+inference_model = build_inference_model(model_base)
+
+
+def predict_batch(tensors):
+    """
+    Runs one forward pass over a list of preprocessed image tensors and
+    returns one label per tensor.
+    """
+    batch = torch.stack(tensors).to(device)
+
+    output = inference_model(batch)
+    _, preds = torch.max(output, 1)
+    return [IDX_TO_LABEL.get(idx, "unknown") for idx in preds.tolist()]
+
+
+skin_batcher = MicroBatcher(
+    predict_batch,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_WINDOW_MS,
+    name="skin-type-batcher",
+    timeout=BATCH_TIMEOUT
+)
+registry.register_collector(lambda: [histogram_from_counts(
+    "batch_size", "Items per batched forward pass.", dict(skin_batcher.batch_sizes), batcher=skin_batcher.name)])
+
+
 def predict_skin_type(image_bgr):
     """
     Takes a BGR image (as from OpenCV), returns predicted skin type: "dry", "normal", or "oily"
@@ -59,15 +176,11 @@ def predict_skin_type(image_bgr):
     if model_base is None:
         return "Model couldn't load"
 
-    img_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-    pil_img = Image.fromarray(img_rgb)
-    tensor_input = val_transform(pil_img).unsqueeze(0).to(device)
+    tensor_input = preprocess_skin_image(image_bgr)
 
-    with torch.no_grad():
-        output = model_base(tensor_input)
-        _, preds = torch.max(output, 1)
-        label_idx = preds.item()
-        return IDX_TO_LABEL.get(label_idx, "unknown")
+    if BATCH_MAX_SIZE > 1:
+        return skin_batcher(tensor_input)
+    return predict_batch([tensor_input])[0]
 '''
 # Optional test
 if __name__ == "__main__":
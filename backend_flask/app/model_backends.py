@@ -0,0 +1,165 @@
+# model_backends.py
+import copy
+import io
+import os
+import tempfile
+import time
+
+import torch
+import torch.nn as nn
+
+BACKENDS = ("eager", "torchscript", "int8_dynamic", "int8_static", "onnx")
+
+
+class InferenceBackend:
+    """
+    A callable wrapping an optimized copy of the skin-type model.
+    Takes a float batch (N, 3, H, W) and returns logits (N, num_classes).
+    size_bytes is an int or a callable computing it; a callable is only run
+    when the size is first asked for, since serializing ResNet-50 takes
+    ~100 MB and ~0.1 s.
+    """
+
+    def __init__(self, name, module, channels_last=True, build_seconds=0.0, size_bytes=None):
+        self.name = name
+        self.module = module
+        self.channels_last = channels_last
+        self.build_seconds = build_seconds
+        self._size_bytes = size_bytes
+
+    @property
+    def size_bytes(self):
+        if callable(self._size_bytes):
+            self._size_bytes = self._size_bytes()
+        return self._size_bytes
+
+    def __call__(self, batch):
+        if self.channels_last:
+            batch = batch.contiguous(memory_format=torch.channels_last)
+        with torch.inference_mode():
+            return self.module(batch)
+
+    def describe(self, include_size=True):
+        info = {"backend": self.name, "build_seconds": round(self.build_seconds, 3)}
+        if include_size:
+            size = self.size_bytes
+            info["size_mb"] = round(size / 2**20, 1) if size is not None else None
+        return info
+
+
+class _OnnxModule:
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        outputs = self.session.run(None, {self.input_name: batch.cpu().numpy()})
+        return torch.from_numpy(outputs[0])
+
+
+def _serialized_size(module):
+    buffer = io.BytesIO()
+    torch.save(module.state_dict(), buffer)
+    return buffer.tell()
+
+
+def _example_input(img_size):
+    return torch.randn(1, 3, img_size, img_size).contiguous(memory_format=torch.channels_last)
+
+
+def _trace(module, img_size):
+    with torch.inference_mode():
+        traced = torch.jit.trace(module, _example_input(img_size))
+    traced = torch.jit.freeze(traced.eval())
+    return torch.jit.optimize_for_inference(traced)
+
+
+def _build_int8_static(model, calibration_batches, img_size):
+    from torchvision.models.quantization import resnet50 as quantizable_resnet50
+
+    engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "fbgemm"
+    torch.backends.quantized.engine = engine
+
+    qmodel = quantizable_resnet50(weights=None, quantize=False)
+    qmodel.fc = copy.deepcopy(model.fc)
+    qmodel.load_state_dict(model.state_dict())
+    qmodel.eval()
+    qmodel.fuse_model()
+    qmodel.qconfig = torch.ao.quantization.get_default_qconfig(engine)
+    torch.ao.quantization.prepare(qmodel, inplace=True)
+
+    if not calibration_batches:
+        print("[WARN] No calibration images for int8_static, calibrating on random input.")
+        calibration_batches = [torch.randn(4, 3, img_size, img_size)]
+
+    with torch.inference_mode():
+        for batch in calibration_batches:
+            qmodel(batch)
+
+    torch.ao.quantization.convert(qmodel, inplace=True)
+    return qmodel
+
+
+def _build_onnx(model, img_size):
+    import onnxruntime as ort
+
+    path = os.path.join(tempfile.gettempdir(), f"skin_type_model_{os.getpid()}.onnx")
+    with torch.inference_mode():
+        torch.onnx.export(
+            model, torch.randn(1, 3, img_size, img_size), path,
+            input_names=["input"], output_names=["logits"],
+            dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+            dynamo=False
+        )
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+    size = os.path.getsize(path)
+    os.remove(path)
+    return _OnnxModule(session), size
+
+
+def build_backend(model, name="eager", calibration_batches=None, img_size=224):
+    """
+    Builds an inference backend for an fp32 eval-mode model.
+
+    - eager: the model itself, channels_last
+    - torchscript: traced, frozen and optimized for inference
+    - int8_dynamic: dynamic int8 quantization of the Linear head
+    - int8_static: post-training static int8 quantization (fused conv/bn/relu,
+      calibrated on calibration_batches), then traced
+    - onnx: ONNX export run by onnxruntime (optional dependency)
+    size_bytes is the serialized size of the model being served; for eager
+    and torchscript it is computed on first use.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown skin model backend '{name}', expected one of {BACKENDS}")
+
+    start = time.perf_counter()
+    model = model.eval()
+
+    if name == "eager":
+        module = model.to(memory_format=torch.channels_last)
+        return InferenceBackend(name, module, build_seconds=time.perf_counter() - start,
+                                size_bytes=lambda: _serialized_size(module))
+
+    if name == "onnx":
+        module, size = _build_onnx(model, img_size)
+        return InferenceBackend(name, module, channels_last=False,
+                                build_seconds=time.perf_counter() - start, size_bytes=size)
+
+    if name == "torchscript":
+        # The fp32 model stays loaded anyway, so its size can wait.
+        source = model.to(memory_format=torch.channels_last)
+        size = lambda: _serialized_size(source)
+    else:
+        # The quantized module is dropped once traced; measure it now, as
+        # part of a build that already takes seconds.
+        if name == "int8_dynamic":
+            source = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+        else:
+            source = _build_int8_static(model, calibration_batches, img_size)
+        size = _serialized_size(source)
+
+    module = _trace(source, img_size)
+    return InferenceBackend(name, module, build_seconds=time.perf_counter() - start, size_bytes=size)
@@ -1,13 +1,39 @@
 # ocr.py
 import cv2
-import easyocr
 import numpy as np
 import re
 from difflib import get_close_matches
-import difflib
 import json
+import os
+import time
+import unicodedata
+from difflib import SequenceMatcher
+from app.fuzzy_match import FuzzyIndex, fuzzy_best_match
+from app.ocr_readers import get_reader, DEFAULT_LANGUAGES
+from app.phrase_matcher import get_phrase_matcher
+from app.translation_utils import detect_language
+
+# "staged": English recognizer first, multilingual only when needed.
+# "full": always the combined en/fr/it/de/es recognizer.
+OCR_MODE = os.getenv("OCR_MODE", "staged")
+FAST_OCR_LANGUAGES = ("en",)
+STAGE1_MIN_CONFIDENCE = float(os.getenv("OCR_STAGE1_MIN_CONFIDENCE", "0.6"))
+# Two-phase OCR: find the ingredient header on a downscaled pass, then
+# recognize only the text block from the header on at full resolution.
+OCR_ROI = os.getenv("OCR_ROI", "0") == "1"
+ROI_LOCATE_MAX_SIDE = int(os.getenv("OCR_ROI_LOCATE_MAX_SIDE", "1280"))
+# A vertical gap of more than this many line heights ends the block.
+ROI_BLOCK_GAP = float(os.getenv("OCR_ROI_BLOCK_GAP", "2.0"))
+
+# Headers that open the ingredient list, compared without accents.
+INGREDIENT_KEYWORDS = (
+    "ingredients",    # en, fr "ingrédients"
+    "ingredienti",    # it
+    "ingredientes",   # es, pt
+    "inhaltsstoffe",  # de
+    "bestandteile",   # de
+)
 
-reader = easyocr.Reader(['en', 'fr', 'it', 'de', 'es'], gpu=False) 
 '''
 def preprocess_image_for_ocr(input_path, debug=False):
     # 1. Read the image in color
@@ -67,10 +93,11 @@ def preprocess_image_for_ocr(image_bgr, debug=False):
     return closed
 '''
 
-def preprocess_image_for_ocr(image_bgr, debug=False, save_path="preprocessed_image.jpg"):
+def preprocess_image_for_ocr(image_bgr, debug=False, save_path=None):
     """
     Preprocess the image for OCR using adaptive thresholding.
-    Accepts a NumPy array as input.
+    Accepts a NumPy array as input. The result is only written to disk
+    when save_path is given.
     """
     if image_bgr is None:
         raise ValueError("Input image is None. Check the image path or data.")
@@ -101,12 +128,158 @@ def preprocess_image_for_ocr(image_bgr, debug=False, save_path="preprocessed_ima
         cv2.waitKey(0)
         cv2.destroyAllWindows()
 
-    cv2.imwrite(save_path, closed)
-    print(f"[INFO] Preprocessed image saved to: {save_path}")
+    if save_path:
+        cv2.imwrite(save_path, closed)
+        print(f"[INFO] Preprocessed image saved to: {save_path}")
 
     return closed
 
 
+def ocr_text(ocr_results, min_confidence=0.5):
+    return " ".join(res[1] for res in ocr_results if res[2] > min_confidence)
+
+
+def _box_rect(bbox):
+    xs = [p[0] for p in bbox]
+    ys = [p[1] for p in bbox]
+    return min(xs), max(xs), min(ys), max(ys)
+
+
+def select_ingredient_block(ocr_results, keywords=INGREDIENT_KEYWORDS, cutoff=0.7, max_gap=None):
+    """
+    Returns the indexes of the OCR results that make up the ingredient
+    block: the box holding the best header match and every box below it
+    until a vertical gap of more than max_gap line heights, in reading
+    order. Returns None when no header is found.
+    """
+    max_gap = ROI_BLOCK_GAP if max_gap is None else max_gap
+    best = None
+    for i, (_, text, _) in enumerate(ocr_results):
+        for token in text.lower().split():
+            ratio = _keyword_ratio(token, keywords)
+            if ratio >= cutoff and (best is None or ratio > best[0]):
+                best = (ratio, i)
+    if best is None:
+        return None
+
+    rects = [_box_rect(bbox) for bbox, _, _ in ocr_results]
+    header = rects[best[1]]
+    line_height = max(header[3] - header[2], 1)
+    below = sorted((i for i, r in enumerate(rects) if (r[2] + r[3]) / 2 >= header[2]),
+                   key=lambda i: (rects[i][2], rects[i][0]))
+
+    block = []
+    bottom = header[3]
+    for i in below:
+        if rects[i][2] - bottom > max_gap * line_height:
+            break
+        block.append(i)
+        bottom = max(bottom, rects[i][3])
+    return block
+
+
+def read_ingredient_block(reader, image_rgb, max_side=None):
+    """
+    Two-phase OCR. The label is read at most max_side pixels wide or tall
+    to find the ingredient header; then only the boxes of the block from
+    the header on are recognized again at full resolution. Falls back to
+    reading the whole label when no header is found.
+    Returns (ocr_results, info).
+    """
+    max_side = max_side or ROI_LOCATE_MAX_SIDE
+    height, width = image_rgb.shape[:2]
+    scale = min(1.0, max_side / max(height, width))
+    small = image_rgb if scale == 1.0 else cv2.resize(
+        image_rgb, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+    located = reader.readtext(small, detail=1)
+    block = select_ingredient_block(located)
+    if block is None:
+        return reader.readtext(image_rgb, detail=1), {"header_found": False, "boxes": None}
+
+    info = {"header_found": True, "boxes": len(block), "located_boxes": len(located), "scale": round(scale, 3)}
+    if scale == 1.0:
+        return [located[i] for i in block], info
+
+    horizontal_list = []
+    for i in block:
+        x_min, x_max, y_min, y_max = _box_rect(located[i][0])
+        pad = (y_max - y_min) * 0.1
+        horizontal_list.append([
+            max(int((x_min - pad) / scale), 0), min(int((x_max + pad) / scale) + 1, width),
+            max(int((y_min - pad) / scale), 0), min(int((y_max + pad) / scale) + 1, height)
+        ])
+    return reader.recognize(image_rgb, horizontal_list=horizontal_list, free_list=[], detail=1), info
+
+
+def _read(languages, image_rgb, roi, info):
+    reader = get_reader(languages)
+    if not roi:
+        return reader.readtext(image_rgb, detail=1)
+    results, info["roi"] = read_ingredient_block(reader, image_rgb)
+    return results
+
+
+def run_staged_ocr(image_rgb, mode=None, roi=None):
+    """
+    Runs OCR and language detection on the preprocessed label.
+    In staged mode the English recognizer runs first; the multilingual
+    recognizer only runs when the first pass has low mean confidence or the
+    text is detected as one of the other supported languages.
+    With roi (default OCR_ROI) each pass reads only the ingredient block,
+    see read_ingredient_block.
+    Returns (ocr_results, info) where info holds the detected language and
+    per-stage timings in seconds.
+    """
+    mode = mode or OCR_MODE
+    roi = OCR_ROI if roi is None else roi
+    timings = {}
+    roi_info = {}
+
+    if mode == "full":
+        start = time.perf_counter()
+        results = _read(DEFAULT_LANGUAGES, image_rgb, roi, roi_info)
+        timings["ocr_multilingual"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        language = detect_language(ocr_text(results))
+        timings["language_detection"] = time.perf_counter() - start
+
+        return results, {"mode": mode, "escalated": False, "reasons": [],
+                         "language": language, "timings": timings, **roi_info}
+
+    start = time.perf_counter()
+    results = _read(FAST_OCR_LANGUAGES, image_rgb, roi, roi_info)
+    timings["ocr_fast"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    language = detect_language(ocr_text(results))
+    timings["language_detection"] = time.perf_counter() - start
+
+    mean_conf = float(np.mean([res[2] for res in results])) if results else 0.0
+
+    reasons = []
+    if mean_conf < STAGE1_MIN_CONFIDENCE:
+        reasons.append("low_confidence")
+    if language in DEFAULT_LANGUAGES and language not in FAST_OCR_LANGUAGES:
+        reasons.append("language")
+
+    if reasons:
+        print(f"[INFO] Escalating to multilingual OCR ({', '.join(reasons)}; "
+              f"mean confidence {mean_conf:.2f}, language {language})")
+        start = time.perf_counter()
+        results = _read(DEFAULT_LANGUAGES, image_rgb, roi, roi_info)
+        timings["ocr_multilingual"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        language = detect_language(ocr_text(results))
+        timings["language_detection"] += time.perf_counter() - start
+
+    return results, {"mode": mode, "escalated": bool(reasons), "reasons": reasons,
+                     "fast_pass_confidence": round(mean_conf, 3),
+                     "language": language, "timings": timings, **roi_info}
+
+
 def extract_ingredients(all_text, known_ingredients=None):
     """
     Extracts ingredients from OCR text by looking for the 'ingredients' keyword and then parsing.
@@ -133,6 +306,42 @@ def extract_ingredients(all_text, known_ingredients=None):
     parsed_ingredients = parse_ingredients_section(ingredient_section, known_ingredients=known_ingredients)
     return parsed_ingredients
 
+def _strip_accents(text):
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def _keyword_ratio(token, keywords):
+    folded = _strip_accents(token).strip(":;,.")
+    return max(SequenceMatcher(None, folded, keyword).ratio() for keyword in keywords)
+
+
+def locate_ingredient_section(all_text, keywords=INGREDIENT_KEYWORDS, cutoff=0.7):
+    """
+    Finds the ingredient list in multilingual OCR text: the text after the
+    best fuzzy match of any header in keywords, up to the first period.
+    Returns (header, section) or None when no header is found.
+    """
+    lower = all_text.lower()
+    best = None
+    for token in dict.fromkeys(lower.split()):
+        ratio = _keyword_ratio(token, keywords)
+        if ratio >= cutoff and (best is None or ratio > best[0]):
+            best = (ratio, token)
+    if best is None:
+        return None
+
+    header_idx = lower.find(best[1])
+    start_idx = header_idx + len(best[1])
+    header = all_text[header_idx:start_idx]
+    if start_idx < len(all_text) and all_text[start_idx] in [":", " ", ";"]:
+        start_idx += 1
+
+    section = all_text[start_idx:]
+    period_pos = section.find(".")
+    if period_pos != -1:
+        section = section[:period_pos]
+    return header, section.strip()
+
 def find_keyword_fuzzy(full_text, keyword="ingredients", cutoff=0.8):
     lower = full_text.lower()
     tokens = lower.split()
@@ -140,9 +349,28 @@ def find_keyword_fuzzy(full_text, keyword="ingredients", cutoff=0.8):
     return lower.find(best_match[0]) if best_match else -1
 
 def parse_ingredients_section(ingredient_section, known_ingredients=None):
+    """
+    Finds the known ingredient names in the section with the phrase
+    matcher, which needs no commas between them, and comma-splits and
+    fuzzy-corrects only the text between matches (OCR misreads and names
+    that are not in the list). Ingredients keep their order on the label.
+    """
     if known_ingredients is None:
         known_ingredients = []
-
+    if not known_ingredients:
+        return _parse_unmatched_text(ingredient_section, known_ingredients)
+
+    matcher = get_phrase_matcher(known_ingredients)
+    parsed = []
+    last = 0
+    for start, end, term in matcher.find(ingredient_section):
+        parsed.extend(_parse_unmatched_text(ingredient_section[last:start], known_ingredients))
+        parsed.append(matcher.vocabulary[term])
+        last = end
+    parsed.extend(_parse_unmatched_text(ingredient_section[last:], known_ingredients))
+    return parsed
+
+def _parse_unmatched_text(ingredient_section, known_ingredients):
     unified_delimiters_text = ingredient_section.replace(";", ",")
 
     no_parentheses_text = re.sub(r"\(.*?\)", "", unified_delimiters_text)
@@ -174,14 +402,15 @@ def parse_ingredients_section(ingredient_section, known_ingredients=None):
     return final_tokens
 
 def fuzzy_correct(word, known_words, cutoff=0.8):
-    matches = get_close_matches(word, known_words, n=1, cutoff=cutoff)
-    return matches[0] if matches else word
+    match = fuzzy_best_match(word, known_words, cutoff=cutoff)
+    return match if match is not None else word
 
 
-def visualize_ocr_results(image, ocr_results, save_path="annotated_output.jpg", min_confidence=0.5):
+def visualize_ocr_results(image, ocr_results, save_path=None, min_confidence=0.5):
     """
     Draw bounding boxes and OCR-detected text on the original image.
-    Filters out low-confidence results.
+    Filters out low-confidence results. Returns the annotated image and
+    writes it only when save_path is given.
     """
     annotated = image.copy()
 
@@ -198,9 +427,10 @@ def visualize_ocr_results(image, ocr_results, save_path="annotated_output.jpg",
             cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2
         )
 
-    cv2.imwrite(save_path, annotated)
-    print(f"[INFO] OCR annotated image saved to: {save_path}")
-    return save_path
+    if save_path:
+        cv2.imwrite(save_path, annotated)
+        print(f"[INFO] OCR annotated image saved to: {save_path}")
+    return annotated
 
 
 def visualize_extracted_ingredients_side_by_side(original_img, ingredients, save_path="clean_ingredients_output.jpg"):
@@ -227,21 +457,82 @@ def visualize_extracted_ingredients_side_by_side(original_img, ingredients, save
     print(f"[INFO] Side-by-side ingredient image saved to: {save_path}")
     return save_path
 
+
+class SafetyLookup:
+    """
+    Compiles an ingredient -> safety map once per request: a lowercase hash
+    lookup for single words, a phrase table for multi-word names and a fuzzy
+    index for misses. Matching a line costs O(words).
+    """
+
+    def __init__(self, ingredient_safety, fuzzy_cutoff=0.75):
+        self.ingredient_safety = ingredient_safety
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        self.exact = {}
+        self.phrases = {}
+        for ingr in ingredient_safety:
+            self.exact.setdefault(ingr.lower(), ingr)
+            phrase = tuple(re.sub(r"[^a-zA-Z0-9\s\-]", "", ingr).lower().split())
+            if len(phrase) > 1:
+                self.phrases.setdefault(phrase, ingr)
+
+        self.max_phrase_len = max((len(p) for p in self.phrases), default=1)
+        self.fuzzy_index = FuzzyIndex(list(ingredient_safety.keys()))
+        self._word_cache = {}
+
+    def match_word(self, word):
+        if word in self._word_cache:
+            return self._word_cache[word]
+
+        ingr = self.exact.get(word)
+        if ingr is None:
+            ingr = self.fuzzy_index.best_match(word, cutoff=self.fuzzy_cutoff)
+
+        match = (ingr, self.ingredient_safety[ingr]) if ingr is not None else None
+        self._word_cache[word] = match
+        return match
+
+    def match_words(self, words):
+        """
+        Returns (ingredient, safety) pairs for a line of words, preferring the
+        longest multi-word ingredient name starting at each position.
+        """
+        matches = []
+        i = 0
+        while i < len(words):
+            for n in range(min(self.max_phrase_len, len(words) - i), 1, -1):
+                ingr = self.phrases.get(tuple(words[i:i + n]))
+                if ingr is not None:
+                    matches.append((ingr, self.ingredient_safety[ingr]))
+                    i += n
+                    break
+            else:
+                match = self.match_word(words[i])
+                if match is not None:
+                    matches.append(match)
+                i += 1
+        return matches
+
+
 def visualize_classified_ingredients(
     image,
     ocr_results,
     ingredient_safety,
-    save_path="classified_output.jpg",
-    summary_path="classified_summary.json",
+    save_path=None,
+    summary_path=None,
     min_confidence=0.5,
-    fuzzy_cutoff=0.75
+    fuzzy_cutoff=0.75,
+    draw=True
 ):
     """
     Draw bounding boxes for OCR-detected ingredients with color-coded safety labels.
-    Supports multiple matches per line, fuzzy ingredient matching, sorted labels,
-    and saves a summary JSON with matched ingredients.
+    Supports multiple matches per line, fuzzy ingredient matching, sorted labels.
+    Returns (annotated image, summary of matched ingredients); each is written
+    to disk only when save_path / summary_path is given. With draw=False only
+    the summary is built and the image is None.
     """
-    annotated = image.copy()
+    annotated = image.copy() if draw else None
 
     color_map = {
         "safe": (0, 255, 0),        
@@ -252,7 +543,7 @@ def visualize_classified_ingredients(
 
     summary_matches = []
 
-    known_ingredients = list(ingredient_safety.keys()) 
+    lookup = SafetyLookup(ingredient_safety, fuzzy_cutoff=fuzzy_cutoff)
 
     for (bbox, text, conf) in ocr_results:
         if conf < min_confidence:
@@ -261,23 +552,18 @@ def visualize_classified_ingredients(
         text_clean = re.sub(r"[^a-zA-Z0-9\s\-]", "", text).lower()
         words = text_clean.split()
 
-        matches = []
-
-        for word in words:
-            for ingr, safety in ingredient_safety.items():
-                if word == ingr.lower():
-                    matches.append((ingr, safety))
-                    break
-            else:
-                close = difflib.get_close_matches(word, known_ingredients, n=1, cutoff=fuzzy_cutoff)
-                if close:
-                    matched_ingr = close[0]
-                    matches.append((matched_ingr, ingredient_safety[matched_ingr]))
+        matches = lookup.match_words(words)
 
         if matches:
             priority = {"harmful": 0, "neutral": 1, "safe": 2}
             matches.sort(key=lambda x: priority.get(x[1], 3))
 
+            for ingr, cls in matches:
+                summary_matches.append({"ingredient": ingr, "classification": cls})
+
+            if not draw:
+                continue
+
             label_text = ", ".join(f"{ingr} ({cls})" for ingr, cls in matches)
 
             top_class = matches[0][1]
@@ -291,17 +577,16 @@ def visualize_classified_ingredients(
                 cv2.FONT_HERSHEY_SIMPLEX, 0.45, box_color, 2
             )
 
-            for ingr, cls in matches:
-                summary_matches.append({"ingredient": ingr, "classification": cls})
-
-    cv2.imwrite(save_path, annotated)
-    print(f"[INFO] Classified ingredient image saved to: {save_path}")
+    if save_path and draw:
+        cv2.imwrite(save_path, annotated)
+        print(f"[INFO] Classified ingredient image saved to: {save_path}")
 
-    with open(summary_path, "w") as f:
-        json.dump(summary_matches, f, indent=2)
-    print(f"[INFO] Summary saved to: {summary_path}")
+    if summary_path:
+        with open(summary_path, "w") as f:
+            json.dump(summary_matches, f, indent=2)
+        print(f"[INFO] Summary saved to: {summary_path}")
 
-    return save_path
+    return annotated, summary_matches
 
 
 
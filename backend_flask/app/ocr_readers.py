@@ -0,0 +1,98 @@
+# ocr_readers.py
+import threading
+import time
+
+from app.metrics import registry, Family
+
+DEFAULT_LANGUAGES = ("en", "fr", "it", "de", "es")
+
+_readers = {}
+_reader_stats = {}
+_lock = threading.Lock()
+
+
+def _current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        import resource
+        return resident_pages * resource.getpagesize()
+    except (OSError, ImportError, ValueError, IndexError):
+        return None
+
+
+def _module_bytes(module):
+    if module is None:
+        return 0
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+    except AttributeError:
+        return 0
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def _key(languages, gpu):
+    return tuple(languages), bool(gpu)
+
+
+def get_reader(languages=DEFAULT_LANGUAGES, gpu=False):
+    """
+    Returns the process-wide EasyOCR reader for a language set, building it
+    on first use. Readers are cached per (languages, gpu), so every module
+    asking for the same languages shares one copy of the weights.
+    """
+    key = _key(languages, gpu)
+    reader = _readers.get(key)
+    if reader is not None:
+        return reader
+
+    with _lock:
+        reader = _readers.get(key)
+        if reader is not None:
+            return reader
+
+        import easyocr
+
+        rss_before = _current_rss_bytes()
+        start = time.perf_counter()
+        reader = easyocr.Reader(list(languages), gpu=gpu)
+        load_seconds = time.perf_counter() - start
+        rss_after = _current_rss_bytes()
+
+        weight_bytes = _module_bytes(getattr(reader, "detector", None)) + \
+            _module_bytes(getattr(reader, "recognizer", None))
+
+        _reader_stats[key] = {
+            "languages": list(languages),
+            "gpu": bool(gpu),
+            "load_seconds": round(load_seconds, 3),
+            "weights_mb": round(weight_bytes / 2**20, 1),
+            "rss_delta_mb": round((rss_after - rss_before) / 2**20, 1)
+            if rss_before is not None and rss_after is not None else None,
+        }
+        _readers[key] = reader
+
+        print(f"[INFO] EasyOCR reader {'+'.join(languages)} loaded in {load_seconds:.2f}s "
+              f"(weights {_reader_stats[key]['weights_mb']} MB, "
+              f"RSS +{_reader_stats[key]['rss_delta_mb']} MB)")
+        return reader
+
+
+def reader_stats():
+    """
+    Load time and memory footprint of every reader built so far.
+    """
+    return [{**stats, "languages": list(stats["languages"])} for stats in _reader_stats.values()]
+
+
+def _reader_metrics():
+    load = Family("ocr_reader_load_seconds", "gauge", "Seconds it took to build each EasyOCR reader.")
+    weights = Family("ocr_reader_weights_bytes", "gauge", "Weight memory of each EasyOCR reader.")
+    for stats in reader_stats():
+        languages = "+".join(stats["languages"])
+        load.add(stats["load_seconds"], languages=languages)
+        weights.add(stats["weights_mb"] * 2**20, languages=languages)
+    return [load, weights]
+
+
+registry.register_collector(_reader_metrics)
@@ -0,0 +1,105 @@
+# ocr_resolution.py
+import math
+import os
+
+import cv2
+import numpy as np
+
+# Glyph height in pixels the label is scaled to before OCR. EasyOCR reads
+# 15-30 px text reliably; detection cost grows with the pixel count.
+OCR_TARGET_TEXT_HEIGHT = float(os.getenv("OCR_TARGET_TEXT_HEIGHT", "20"))
+OCR_MIN_SCALE = float(os.getenv("OCR_MIN_SCALE", "0.25"))
+OCR_MAX_SCALE = float(os.getenv("OCR_MAX_SCALE", "2.0"))
+# EasyOCR's detector canvas; larger working images are shrunk by it anyway.
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "2560"))
+# Mean OCR confidence below which the next, larger rung is tried.
+OCR_LADDER_MIN_CONFIDENCE = float(os.getenv("OCR_LADDER_MIN_CONFIDENCE", "0.5"))
+LADDER_STEP = 1.5
+LADDER_RUNGS = 3
+
+ESTIMATE_MAX_SIDE = 1600
+MIN_GLYPHS = 15
+
+
+def estimate_text_height(image_bgr, max_side=ESTIMATE_MAX_SIDE):
+    """
+    Median height in pixels of the glyph-like connected components of an
+    adaptive threshold of the image (dark or light text), or None when too
+    few are found to tell.
+    """
+    gray = image_bgr if image_bgr.ndim == 2 else cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    factor = min(1.0, max_side / max(gray.shape))
+    if factor < 1.0:
+        gray = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+
+    binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 31, 10)
+    if np.mean(binary) > 127:
+        binary = cv2.bitwise_not(binary)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    widths, heights, areas = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT], stats[1:, cv2.CC_STAT_AREA]
+
+    # Letters: not specks or rules, not wider than a few of themselves, and
+    # neither a filled box nor a thin outline.
+    fill = areas / np.maximum(widths * heights, 1)
+    glyphs = (heights >= 4) & (heights <= gray.shape[0] / 5) & (widths >= 2) & \
+        (widths <= heights * 2.5) & (fill >= 0.15) & (fill <= 0.95)
+    if glyphs.sum() < MIN_GLYPHS:
+        return None
+    return float(np.median(heights[glyphs])) / factor
+
+
+def working_scale(image_bgr, target=None):
+    """
+    Returns (scale, text height) for OCR: the scale that brings the
+    estimated text height to target, clamped to [OCR_MIN_SCALE,
+    OCR_MAX_SCALE] and to OCR_MAX_SIDE. Without an estimate, small images
+    (under 500 px) are doubled and others left as they are.
+    """
+    target = target or OCR_TARGET_TEXT_HEIGHT
+    height, width = image_bgr.shape[:2]
+    text_height = estimate_text_height(image_bgr)
+    if text_height is None:
+        scale = 2.0 if height < 500 or width < 500 else 1.0
+    else:
+        scale = min(max(target / text_height, OCR_MIN_SCALE), OCR_MAX_SCALE)
+    return min(scale, OCR_MAX_SIDE / max(height, width)), text_height
+
+
+def working_side(preview_bgr, full_size, target=None):
+    """
+    Long side, in pixels, the full-size image needs for its working scale
+    (see working_scale), estimated on a reduced preview decode of it.
+    None when the preview holds too little legible text to tell.
+    """
+    target = target or OCR_TARGET_TEXT_HEIGHT
+    text_height = estimate_text_height(preview_bgr)
+    if text_height is None:
+        return None
+    long_side = max(full_size)
+    text_height *= long_side / max(preview_bgr.shape[:2])
+    scale = min(max(target / text_height, OCR_MIN_SCALE), OCR_MAX_SCALE, OCR_MAX_SIDE / long_side)
+    return int(math.ceil(long_side * scale))
+
+
+def resolution_ladder(image_bgr, target=None):
+    """
+    Returns (scales, text height): the working scale followed by up to
+    LADDER_RUNGS - 1 larger scales to retry at when OCR confidence is low.
+    """
+    scale, text_height = working_scale(image_bgr, target)
+    ceiling = min(max(OCR_MAX_SCALE, scale), OCR_MAX_SIDE / max(image_bgr.shape[:2]))
+    scales = [scale]
+    while len(scales) < LADDER_RUNGS and scales[-1] < ceiling:
+        scales.append(min(scales[-1] * LADDER_STEP, ceiling))
+    return scales, text_height
+
+
+def resize_to_scale(image_bgr, scale):
+    if abs(scale - 1.0) < 1e-3:
+        return image_bgr
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+    return cv2.resize(image_bgr, None, fx=scale, fy=scale, interpolation=interpolation)
+
+
+def mean_confidence(ocr_results):
+    return float(np.mean([res[2] for res in ocr_results])) if ocr_results else 0.0
@@ -3,6 +3,8 @@ import re
 from difflib import get_close_matches
 import json
 import os
+from app.fuzzy_match import fuzzy_best_match, get_fuzzy_index
+from app.phrase_matcher import get_phrase_matcher
 
 
 def load_known_ingredients():
@@ -19,9 +21,31 @@ def load_known_ingredients():
 
 my_known_ingredients = load_known_ingredients()
 
+
+def get_known_ingredients():
+    """
+    The current known ingredient list. Callers should fetch it once per
+    request so a reload never changes the list halfway through.
+    """
+    return my_known_ingredients
+
+
+def reload_known_ingredients():
+    """
+    Re-reads known_ingredients.json and swaps in the new list. Its fuzzy
+    index and phrase matcher are built before the swap so no request pays
+    for them.
+    """
+    global my_known_ingredients
+    ingredients = load_known_ingredients()
+    get_fuzzy_index(ingredients)
+    get_phrase_matcher(ingredients)
+    my_known_ingredients = ingredients
+    return ingredients
+
 def fuzzy_correct(word, known_words, cutoff=0.8):
-    matches = get_close_matches(word, known_words, n=1, cutoff=cutoff)
-    return matches[0] if matches else word
+    match = fuzzy_best_match(word, known_words, cutoff=cutoff)
+    return match if match is not None else word
 
 def find_keyword_fuzzy(full_text, keyword="ingredients", cutoff=0.8):
     lower = full_text.lower()
@@ -67,9 +91,9 @@ def parse_ingredients_section_v2(ingredient_section, known_ingredients=None, deb
 
         if token_clean:
             if known_ingredients:
-                best = get_close_matches(token_clean, known_ingredients, n=1, cutoff=0.75)
-                if best:
-                    token_clean = best[0]
+                best = fuzzy_best_match(token_clean, known_ingredients, cutoff=0.75)
+                if best is not None:
+                    token_clean = best
 
             if debug:
                 print(f"OCR token => {token} => matched => {token_clean}")
@@ -0,0 +1,253 @@
+# phrase_matcher.py
+import re
+import threading
+import unicodedata
+from collections import OrderedDict, deque
+
+import numpy as np
+import scipy.sparse as sp
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+WORD_RE = re.compile(r"[^\W_]+")
+# Separators between list entries; a match never crosses one. A period
+# only separates when followed by whitespace, so "1.2-hexanediol" and
+# "Alcohol Denat., BHT" both tokenize as expected.
+BOUNDARY_RE = re.compile(r"[,;·•|]|\.(?=\s|$)")
+# Longer names are sentences that leaked into the ingredient list.
+MAX_PHRASE_TOKENS = 8
+
+
+def normalize(text):
+    """
+    Lowercases, folds accents and compatibility characters and returns the
+    alphanumeric tokens of text.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_RE.findall(text)
+
+
+def phrase_key(name):
+    return " ".join(normalize(name))
+
+
+def _is_ingredient_name(name, tokens):
+    # Drops the scraper debris in known_ingredients.json (")", "1", "33)")
+    # and the "A & B & C" blends that would shadow their parts.
+    if not tokens or len(tokens) > MAX_PHRASE_TOKENS or "&" in name:
+        return False
+    return any(len(t) >= 2 and not t.isdigit() for t in tokens)
+
+
+def _aliases(name):
+    # "Simmondsia Chinensis (Jojoba) Seed Oil" is also printed without the
+    # common name, and "(Aqua) Water" as plain "Water" only when it has no
+    # other name, so single-token aliases are not generated.
+    stripped = re.sub(r"\([^)]*\)|\[[^\]]*\]", " ", name)
+    if stripped != name:
+        tokens = normalize(stripped)
+        if len(tokens) >= 2:
+            yield tokens
+
+
+class PhraseMatcher:
+    """
+    Token-level Aho-Corasick automaton over the known ingredient names and
+    their aliases. extract() finds every known ingredient in a text in one
+    pass over its tokens, preferring the leftmost and then the longest name
+    and never matching across list separators (commas, semicolons, bullets,
+    sentence periods).
+
+    Names are compared after normalize(), so "AQUA/WATER" and "Aqua / Water"
+    are one ingredient. Each ingredient is reported by its first spelling,
+    lowercased.
+    """
+
+    def __init__(self, names):
+        self.vocabulary = []
+        self._keys = {}
+        self._token_ids = {}
+        # Trie: goto[state] maps token id -> state. Per state: failure link,
+        # the id and length of the longest name ending there, and the next
+        # state on the failure chain that ends a name.
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [None]
+        self._dict_link = [0]
+
+        entries = []
+        for name in dict.fromkeys(n for n in names if isinstance(n, str)):
+            tokens = normalize(name)
+            if _is_ingredient_name(name, tokens):
+                entries.append((name, tokens))
+
+        for name, tokens in entries:
+            self._add(tokens, self._term_id(name, tokens))
+        # Aliases only fill gaps, so a name that is itself known keeps its
+        # own column.
+        for name, tokens in entries:
+            term = self._keys[" ".join(tokens)]
+            for alias in _aliases(name):
+                if " ".join(alias) not in self._keys:
+                    self._keys[" ".join(alias)] = term
+                    self._add(alias, term)
+
+        self._build_links()
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def lookup(self, name):
+        """
+        Returns the vocabulary index of a known name or alias, or None.
+        """
+        return self._keys.get(phrase_key(name))
+
+    def _term_id(self, name, tokens):
+        key = " ".join(tokens)
+        display = " ".join(name.lower().split())
+        term = self._keys.get(key)
+        if term is None:
+            term = self._keys[key] = len(self.vocabulary)
+            self.vocabulary.append(display)
+        elif not self.vocabulary[term][0].isalnum() and display[0].isalnum():
+            # Prefer "aqua (water)" over "(aqua) water".
+            self.vocabulary[term] = display
+        return term
+
+    def _add(self, tokens, term):
+        state = 0
+        for token in tokens:
+            token_id = self._token_ids.setdefault(token, len(self._token_ids))
+            nxt = self._goto[state].get(token_id)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token_id] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(None)
+                self._dict_link.append(0)
+            state = nxt
+        if self._out[state] is None:
+            self._out[state] = (term, len(tokens))
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token_id, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and token_id not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(token_id, 0)
+                target = self._fail[nxt]
+                self._dict_link[nxt] = target if self._out[target] is not None else self._dict_link[target]
+                queue.append(nxt)
+
+    @staticmethod
+    def _segments(text):
+        start = 0
+        for boundary in BOUNDARY_RE.finditer(text):
+            yield start, text[start:boundary.start()]
+            start = boundary.end()
+        yield start, text[start:]
+
+    def find(self, text):
+        """
+        Returns the non-overlapping matches in text as (start, end, term)
+        character spans in reading order; term indexes self.vocabulary.
+        """
+        if not isinstance(text, str) or not text:
+            return []
+
+        matches = []
+        for offset, segment in self._segments(text):
+            spans = []
+            starts = {}
+            state = 0
+            for word in WORD_RE.finditer(segment):
+                token = word.group().lower()
+                for piece in ([token] if token.isascii() else normalize(token)):
+                    spans.append((offset + word.start(), offset + word.end()))
+                    token_id = self._token_ids.get(piece)
+                    if token_id is None:
+                        state = 0
+                        continue
+                    while state and token_id not in self._goto[state]:
+                        state = self._fail[state]
+                    state = self._goto[state].get(token_id, 0)
+
+                    end = len(spans)
+                    hit = state if self._out[state] is not None else self._dict_link[state]
+                    while hit:
+                        term, length = self._out[hit]
+                        begin = end - length
+                        if length > starts.get(begin, (0, None))[0]:
+                            starts[begin] = (length, term)
+                        hit = self._dict_link[hit]
+
+            i = 0
+            while i < len(spans):
+                if i in starts:
+                    length, term = starts[i]
+                    matches.append((spans[i][0], spans[i + length - 1][1], term))
+                    i += length
+                else:
+                    i += 1
+        return matches
+
+    def extract(self, text):
+        """
+        Returns the known ingredients in text in reading order.
+        """
+        return [self.vocabulary[term] for _, _, term in self.find(text)]
+
+    def transform(self, texts):
+        """
+        Binary document-term matrix (CSR, one row per text, one column per
+        vocabulary entry), the drop-in for CountVectorizer(binary=True).
+        """
+        indptr = [0]
+        indices = []
+        for text in texts:
+            terms = sorted({term for _, _, term in self.find(text)})
+            indices.extend(terms)
+            indptr.append(len(indices))
+        return sp.csr_matrix(
+            (np.ones(len(indices), dtype=np.int64), np.array(indices, dtype=np.int64), np.array(indptr)),
+            shape=(len(indptr) - 1, len(self.vocabulary))
+        )
+
+    fit_transform = transform
+
+
+_matcher_cache = OrderedDict()
+_matcher_cache_lock = threading.Lock()
+_MATCHER_CACHE_SIZE = 4
+
+
+def get_phrase_matcher(names):
+    """
+    Returns the PhraseMatcher for a name list, compiling it on first use.
+    Cached by the list's contents, like get_fuzzy_index.
+    """
+    if isinstance(names, PhraseMatcher):
+        return names
+
+    snapshot = tuple(names)
+    key = hash(snapshot)
+    with _matcher_cache_lock:
+        cached = _matcher_cache.get(key)
+        if cached is not None and cached[0] == snapshot:
+            _matcher_cache.move_to_end(key)
+            return cached[1]
+
+    matcher = PhraseMatcher(snapshot)
+
+    with _matcher_cache_lock:
+        _matcher_cache[key] = (snapshot, matcher)
+        _matcher_cache.move_to_end(key)
+        while len(_matcher_cache) > _MATCHER_CACHE_SIZE:
+            _matcher_cache.popitem(last=False)
+
+    return matcher
@@ -0,0 +1,377 @@
+# pipeline.py
+import json
+import os
+import time
+
+import cv2
+
+from app.artifacts import RequestArtifacts
+from app.image_quality import analyze_image_quality
+from app.metrics import STAGE_SECONDS, OCR_STEP_SECONDS
+from app.ingredient_info import get_ingredient_descriptions
+from app.ocr import preprocess_image_for_ocr, extract_ingredients, locate_ingredient_section, run_staged_ocr
+from app.ocr import visualize_ocr_results, visualize_classified_ingredients
+from app.ocr_resolution import resolution_ladder, resize_to_scale, mean_confidence, working_side
+from app.ocr_resolution import OCR_LADDER_MIN_CONFIDENCE, OCR_MAX_SIDE
+from app.parse_utils import get_known_ingredients
+from app.recommend import recommend_products
+from app.result_cache import result_cache, dhash
+from app.skincare import analyze_product_for_skin_type, classify_ingredients_by_safety
+from app.skincare import count_safety_levels, compute_product_score, classify_product
+from app.stage_graph import StageGraph
+from app.translation_utils import translate_to_english
+from app.uploads import check_image, decode_image, reduced_decode_factor, UploadError
+
+# "parallel" overlaps the GPT descriptions with the local stages after
+# parsing; "sequential" runs them one after the other.
+PIPELINE_EXECUTOR = os.getenv("PIPELINE_EXECUTOR", "parallel")
+
+# Stages reported to progress callbacks. The last four run concurrently
+# in parallel mode, so they can be reported in any order.
+STAGES = [
+    "decode",
+    "quality",
+    "preprocess",
+    "ocr",
+    "translation",
+    "parse",
+    "classify",
+    "skin_analysis",
+    "recommend",
+    "descriptions",
+]
+
+# Photos under this size are upscaled for the quality gate, so JPEGs are
+# never decode-reduced below it.
+QUALITY_MIN_SIDE = 500
+PREVIEW_FACTOR = 8
+
+# Payload fields reported with each stage when an analysis is served from
+# the result cache.
+CACHED_STAGE_FIELDS = {
+    "ocr": ["detected_language"],
+    "parse": ["parsed_ingredients"],
+    "skin_analysis": ["analysis_summary"],
+    "recommend": ["recommendations"],
+    "descriptions": ["ingredient_info", "safety_counts", "product_score", "product_safety"],
+}
+
+
+class AnalysisError(Exception):
+    """
+    A request that cannot be analyzed. payload is the JSON error body and
+    status the HTTP status code to answer with.
+    """
+
+    def __init__(self, payload, status=400):
+        super().__init__(payload.get("error"))
+        self.payload = payload
+        self.status = status
+
+
+def _noop_progress(stage, data=None):
+    pass
+
+
+class StageTimer(dict):
+    """
+    Seconds spent in each stage; lap(stage) closes the stage that started
+    when the previous one finished.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self[stage] = now - self._last
+        self._last = now
+
+
+def _record_timings(timings, ocr_timings=None):
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    for step, seconds in (ocr_timings or {}).items():
+        OCR_STEP_SECONDS.observe(seconds, step=step)
+
+
+def _replay_cached_stages(payload, progress):
+    for stage in STAGES[1:]:
+        data = {"cached": True}
+        data.update({field: payload.get(field) for field in CACHED_STAGE_FIELDS.get(stage, [])})
+        progress(stage, data)
+
+
+def _decode_for_ocr(image_bytes):
+    """
+    Decodes the upload and returns (image, factor). JPEGs are decoded
+    reduced by the largest factor that still holds their OCR working
+    scale, estimated from the text height on a 1/8 preview decode; without
+    an estimate, only down to OCR_MAX_SIDE. Raises UploadError.
+    """
+    kind, size = check_image(image_bytes)
+    max_side = OCR_MAX_SIDE
+    if kind == "jpeg" and reduced_decode_factor(size, min_side=QUALITY_MIN_SIDE) > 1:
+        preview = decode_image(image_bytes, max_side=max(size) // PREVIEW_FACTOR)
+        max_side = working_side(preview, size) or OCR_MAX_SIDE
+    factor = reduced_decode_factor(size, max_side=max_side, min_side=QUALITY_MIN_SIDE) if kind == "jpeg" else 1
+    return decode_image(image_bytes, max_side=max_side, min_side=QUALITY_MIN_SIDE), factor
+
+
+def _read_at_scale(original_bgr, scale):
+    image_bgr = resize_to_scale(original_bgr, scale)
+    processed_image = preprocess_image_for_ocr(image_bgr)
+    ocr_results, ocr_info = run_staged_ocr(cv2.cvtColor(processed_image, cv2.COLOR_BGR2RGB))
+    return image_bgr, processed_image, ocr_results, ocr_info
+
+
+def analyze_label(image_bytes, skin_type, progress=None):
+    """
+    Runs the full product label analysis and returns the response payload.
+    progress(stage, data) is called when each stage in STAGES finishes.
+    Raises AnalysisError for images that cannot be analyzed.
+
+    A photo within the result cache's Hamming tolerance of an analyzed one,
+    for the same skin_type, is answered from the cache right after decoding.
+    """
+    progress = progress or _noop_progress
+    timings = StageTimer()
+
+    try:
+        image_bgr, decode_factor = _decode_for_ocr(image_bytes)
+    except UploadError as e:
+        raise AnalysisError(e.payload, e.status)
+    timings.lap("decode")
+    progress("decode")
+
+    image_hash = None
+    if result_cache.enabled:
+        image_hash = dhash(image_bgr)
+        cached = result_cache.get(image_hash, skin_type)
+        if cached is not None:
+            payload, distance, age = cached
+            print(f"[INFO] Result cache hit (distance {distance}, {age:.0f} s old)")
+            _replay_cached_stages(payload, progress)
+            payload["cache"] = {"hit": True, "distance": distance, "age_seconds": round(age, 1)}
+            payload["stage_timings"] = {"decode": round(timings["decode"], 3)}
+            _record_timings(timings)
+            return payload
+
+    # Quality is judged on the photo as decoded, not at the OCR working
+    # scale: resizing changes the blur measure its thresholds were tuned on.
+    quality_bgr = image_bgr
+    if image_bgr.shape[0] < QUALITY_MIN_SIDE or image_bgr.shape[1] < QUALITY_MIN_SIDE:
+        quality_bgr = cv2.resize(image_bgr, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    quality = analyze_image_quality(quality_bgr, stop_early=True)
+
+    if quality.issues:
+        top_message = quality.message
+        progress("quality", {"ok": False, "issues": quality.issues, "details": [top_message]})
+
+        print("Returning 400 with:", json.dumps({
+            "error": "Image quality issue detected.",
+            "details": [top_message]
+        }, indent=2))
+
+        raise AnalysisError({
+            "error": "Image quality issue detected.",
+            "details": [top_message]
+        }, 400)
+    timings.lap("quality")
+    progress("quality", {"ok": True, "issues": quality.issues})
+
+    # Work at the resolution that puts the text at the OCR target height;
+    # larger rungs of the ladder are only tried if OCR confidence is low.
+    original_bgr = image_bgr
+    scales, text_height = resolution_ladder(original_bgr)
+    image_bgr = resize_to_scale(original_bgr, scales[0])
+    print(f"[INFO] Text height ~{text_height or 0:.0f} px, OCR working scale {scales[0]:.2f} "
+          f"({image_bgr.shape[1]}x{image_bgr.shape[0]}, decoded at 1/{decode_factor})")
+
+    artifacts = RequestArtifacts()
+
+    processed_image = preprocess_image_for_ocr(image_bgr)
+    processed_rgb = cv2.cvtColor(processed_image, cv2.COLOR_BGR2RGB)
+    timings.lap("preprocess")
+    progress("preprocess")
+
+    ocr_results, ocr_info = run_staged_ocr(processed_rgb)
+    confidence = mean_confidence(ocr_results)
+    scale = scales[0]
+    tried = [scale]
+    full_bgr = None
+    for retry_scale in scales[1:]:
+        if confidence >= OCR_LADDER_MIN_CONFIDENCE:
+            break
+        print(f"[INFO] Mean OCR confidence {confidence:.2f}, retrying at scale {retry_scale:.2f}")
+        if retry_scale > 1.0 and decode_factor > 1:
+            # Past the reduced decode's resolution: read the full photo.
+            if full_bgr is None:
+                full_bgr = decode_image(image_bytes)
+            retry = _read_at_scale(full_bgr, retry_scale / decode_factor)
+        else:
+            retry = _read_at_scale(original_bgr, retry_scale)
+        tried.append(retry_scale)
+        retry_confidence = mean_confidence(retry[2])
+        if retry_confidence > confidence:
+            image_bgr, processed_image, ocr_results, ocr_info = retry
+            confidence, scale = retry_confidence, retry_scale
+    artifacts.add_image("preprocessed", processed_image)
+    print(f"[INFO] OCR stage timings: {ocr_info['timings']}")
+
+    if artifacts.enabled:
+        artifacts.add_image("annotated", visualize_ocr_results(image_bgr, ocr_results))
+
+    filtered_texts = [res[1] for res in ocr_results if res[2] > 0.5]  # Filter by confidence
+    all_text = " ".join(filtered_texts)
+    print(f"[INFO] Filtered OCR results (confidence > 0.5): {filtered_texts}")
+
+    if len(all_text.strip()) < 20:
+        artifacts.persist()
+        raise AnalysisError({"error": "Text could not be clearly extracted. Please retake the image with better focus."}, 400)
+
+    detected_lang = ocr_info["language"]
+    print(f"[INFO] Detected language: {detected_lang}")
+    timings.lap("ocr")
+    progress("ocr", {"text": all_text, "detected_language": detected_lang})
+
+    if detected_lang != "en":
+        located = locate_ingredient_section(all_text)
+        if located is not None:
+            # Only the ingredient list needs translating, not the marketing
+            # copy and directions around it.
+            header, section = located
+            print(f"[INFO] Translating the '{header}' section ({len(section)} of {len(all_text)} chars) using GPT-4o...")
+            all_text = "Ingredients: " + translate_to_english(section)
+        else:
+            print("[INFO] No ingredient header found, translating the whole text using GPT-4o...")
+            all_text = translate_to_english(all_text)
+        print("[INFO] Translation complete.")
+    timings.lap("translation")
+    progress("translation")
+
+    final_ingredient_list = extract_ingredients(all_text, known_ingredients=get_known_ingredients())
+    timings.lap("parse")
+    progress("parse", {"parsed_ingredients": final_ingredient_list})
+
+    def classify():
+        # Step 1: Extract & classify ingredients
+        ingredient_safety_map = classify_ingredients_by_safety(skin_type, final_ingredient_list)
+
+        # Step 2: Annotate image with safety color-coded boxes; the image is
+        # only drawn when artifact mode will keep it.
+        classified_image, classified_summary = visualize_classified_ingredients(
+            image_bgr,
+            ocr_results,
+            ingredient_safety_map,
+            draw=artifacts.enabled
+        )
+        if artifacts.enabled:
+            artifacts.add_image("classified", classified_image)
+        artifacts.add_json("classified_summary", classified_summary)
+
+    def skin_analysis():
+        # Analyze for user's skin type
+        return analyze_product_for_skin_type(skin_type, final_ingredient_list)
+
+    def recommend():
+        return recommend_products(final_ingredient_list, skin_type=skin_type)
+
+    def descriptions():
+        # Another photo of a product analyzed recently: same ingredients,
+        # same descriptions, no GPT call.
+        cached = result_cache.get_descriptions(final_ingredient_list)
+        if cached is not None:
+            print("[INFO] Ingredient set cached, skipping GPT descriptions")
+            return cached
+
+        # Generate ingredient descriptions using OpenAI GPT
+        ingredient_info = get_ingredient_descriptions(final_ingredient_list)
+
+        if ingredient_info is None:
+            raise AnalysisError({"error": "Failed to generate ingredient descriptions"}, 500)
+
+        safety_counts = count_safety_levels(ingredient_info)
+        product_score = compute_product_score(safety_counts)
+        product_safety = classify_product(product_score)
+
+        filtered_ingredients = []
+        for ing in ingredient_info["ingredients"]:
+            desc = ing.get("description", "").lower()
+            if "misspelling" not in desc and "confusion" not in desc:
+                filtered_ingredients.append(ing)
+
+        ingredient_info["ingredients"] = filtered_ingredients
+        return {
+            "ingredient_info": ingredient_info,
+            "safety_counts": safety_counts,
+            "product_score": product_score,
+            "product_safety": product_safety
+        }
+
+    # The stages below only depend on the parsed ingredients, so the GPT
+    # call runs while the local stages are computed.
+    graph = StageGraph()
+    graph.add("descriptions", descriptions)
+    graph.add("classify", classify)
+    graph.add("skin_analysis", skin_analysis)
+    graph.add("recommend", recommend)
+
+    stage_events = {
+        "classify": lambda result: None,
+        "skin_analysis": lambda result: {"analysis_summary": result},
+        "recommend": lambda result: {"recommendations": result},
+        "descriptions": lambda result: result,
+    }
+    results, graph_timings = graph.run(
+        parallel=PIPELINE_EXECUTOR == "parallel",
+        on_done=lambda name, result: progress(name, stage_events[name](result))
+    )
+    timings.update(graph_timings)
+    print(f"[INFO] Stage timings: { {k: round(v, 3) for k, v in timings.items()} }")
+    _record_timings(timings, ocr_info["timings"])
+
+    analysis_summary = results["skin_analysis"]
+    recommendations = results["recommend"]
+    ingredient_info = results["descriptions"]["ingredient_info"]
+    safety_counts = results["descriptions"]["safety_counts"]
+    product_score = results["descriptions"]["product_score"]
+    product_safety = results["descriptions"]["product_safety"]
+
+    saved_artifacts = artifacts.persist() or {}
+
+    response_payload = {
+        "parsed_ingredients": final_ingredient_list,
+        "ingredient_info": ingredient_info,
+        "analysis_summary": analysis_summary,
+        "detected_language": detected_lang,
+        "ingredient_image_url": "clean_ingredients_output.jpg",
+        "classified_image_url": saved_artifacts.get("classified"),
+        "recommendations": recommendations,
+        "safety_counts": safety_counts,
+        "product_score": product_score,
+        "product_safety": product_safety,
+        "ocr": {
+            "mode": ocr_info["mode"],
+            "escalated": ocr_info["escalated"],
+            "roi": ocr_info.get("roi"),
+            "resolution": {
+                "decode_factor": decode_factor,
+                "text_height": round(text_height, 1) if text_height else None,
+                "scale": round(scale, 3),
+                "scales_tried": [round(s, 3) for s in tried],
+                "mean_confidence": round(confidence, 3)
+            },
+            "stage_timings": {k: round(v, 3) for k, v in ocr_info["timings"].items()}
+        },
+        "stage_timings": {stage: round(timings[stage], 3) for stage in STAGES if stage in timings},
+        "cache": {"hit": False}
+    }
+
+    if image_hash is not None:
+        result_cache.put(image_hash, skin_type, response_payload, descriptions=results["descriptions"])
+
+    print("[DEBUG] Final response JSON:", json.dumps(response_payload, indent=2))
+
+    return response_payload
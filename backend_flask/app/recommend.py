@@ -1,60 +1,352 @@
 import pandas as pd
+import numpy as np
+import argparse
+import hashlib
 import json
+import os
 import re
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import CountVectorizer
+import shutil
+import threading
+import time
+import scipy.sparse as sp
 from collections import OrderedDict
+from app.inverted_index import InvertedIndex
+from app.phrase_matcher import get_phrase_matcher
+from app.skincare import SKIN_TYPE_RULES
 
-df = pd.read_csv("app/data/skincare_products.csv")
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+CATALOG_PATH = os.path.join(DATA_DIR, "skincare_products.csv")
+KNOWN_INGREDIENTS_PATH = os.path.join(DATA_DIR, "known_ingredients.json")
+# Prebuilt catalog written by `python -m app.recommend build`.
+ARTIFACT_DIR = os.getenv("RECOMMENDER_ARTIFACT_DIR", os.path.join(DATA_DIR, "recommender"))
+# Bump when the artifact layout or the catalog preprocessing changes.
+ARTIFACT_VERSION = 2
 
-with open("app/data/known_ingredients.json") as f:
-    raw_ingredients = json.load(f)
-    known_ingredients = list(OrderedDict.fromkeys([i.lower() for i in raw_ingredients]))
+METADATA_COLUMNS = ["product_name", "product_url", "product_type", "price"]
+
+
+class ArtifactError(Exception):
+    pass
+
+
+def load_known_ingredients(path=KNOWN_INGREDIENTS_PATH):
+    with open(path) as f:
+        raw_ingredients = json.load(f)
+    return list(OrderedDict.fromkeys([i.lower() for i in raw_ingredients]))
 
 def preprocess_ingredients(text):
     if not isinstance(text, str): return ""
     ingredients = re.split(r"[;,.]", text)
     cleaned = [i.strip().lower() for i in ingredients if i.strip()]
-    return " ".join(cleaned)
+    return ", ".join(cleaned)
 
-df["cleaned_ingredients"] = df["ingredients"].apply(preprocess_ingredients)
+def load_catalog(path=CATALOG_PATH):
+    df = pd.read_csv(path)
+    df["cleaned_ingredients"] = df["ingredients"].apply(preprocess_ingredients)
+    return df
 
-vectorizer = CountVectorizer(vocabulary=[i.lower() for i in known_ingredients], binary=True)
-ingredient_matrix = vectorizer.fit_transform(df["cleaned_ingredients"])
+def build_vectorizer(vocabulary):
+    # Multi-word names ("sodium hyaluronate") are single features; a
+    # word-level CountVectorizer never matched them.
+    return get_phrase_matcher(vocabulary)
 
 def simplify_name(name):
     return re.sub(r"\b\d+\s?(ml|g)\b", "", name.lower()).strip()
 
-def recommend_products(input_ingredients, input_product_type=None, top_n=5):
-    input_cleaned = " ".join([i.lower() for i in input_ingredients if i])
-    input_vector = vectorizer.transform([input_cleaned])
-    sims = cosine_similarity(input_vector, ingredient_matrix).flatten()
+def source_checksum(catalog_path=CATALOG_PATH, known_ingredients_path=KNOWN_INGREDIENTS_PATH):
+    digest = hashlib.sha256(f"recommender-v{ARTIFACT_VERSION}".encode())
+    for path in (catalog_path, known_ingredients_path):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_artifact(out_dir=ARTIFACT_DIR, catalog_path=CATALOG_PATH, known_ingredients_path=KNOWN_INGREDIENTS_PATH):
+    """
+    Vectorizes the catalog and writes the recommender artifact to out_dir:
+    the binary ingredient matrix as uncompressed CSR members
+    (indptr/indices/data .npy, memory-mappable), metadata.json with the
+    output columns and dedup keys, vocabulary.json, and manifest.json with
+    the format version and the checksum of the source files.
+    """
+    start = time.perf_counter()
+    vocabulary = load_known_ingredients(known_ingredients_path)
+    df = load_catalog(catalog_path)
+    matrix = build_vectorizer(vocabulary).fit_transform(df["cleaned_ingredients"]).tocsr()
+    matrix.sort_indices()
+
+    metadata = {column: df[column].tolist() for column in METADATA_COLUMNS}
+    metadata["dedup_key"] = [simplify_name(name) for name in df["product_name"]]
+
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    # scipy copies index arrays of mixed dtypes, which would defeat the mmap.
+    index_dtype = np.int32 if max(matrix.nnz, matrix.shape[1]) < 2**31 else np.int64
+    np.save(os.path.join(tmp_dir, "indptr.npy"), matrix.indptr.astype(index_dtype))
+    np.save(os.path.join(tmp_dir, "indices.npy"), matrix.indices.astype(index_dtype))
+    np.save(os.path.join(tmp_dir, "data.npy"), matrix.data.astype(np.int8))
+    with open(os.path.join(tmp_dir, "metadata.json"), "w") as f:
+        json.dump(metadata, f)
+    with open(os.path.join(tmp_dir, "vocabulary.json"), "w") as f:
+        json.dump(vocabulary, f)
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump({
+            "version": ARTIFACT_VERSION,
+            "source_sha256": source_checksum(catalog_path, known_ingredients_path),
+            "shape": list(matrix.shape),
+            "nnz": int(matrix.nnz),
+            "built_at": time.time()
+        }, f, indent=2)
+
+    # Swap the whole directory so readers never see a half-written artifact.
+    old_dir = f"{out_dir}.old-{os.getpid()}"
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    print(f"[INFO] Built recommender artifact for {matrix.shape[0]} products, "
+          f"{matrix.shape[1]} terms in {time.perf_counter() - start:.2f} s -> {out_dir}")
+    return out_dir
+
+
+def load_artifact(artifact_dir=ARTIFACT_DIR, catalog_path=CATALOG_PATH, known_ingredients_path=KNOWN_INGREDIENTS_PATH):
+    """
+    Loads an artifact written by build_artifact, memory-mapping the matrix.
+    Returns (matrix, metadata, vocabulary). Raises ArtifactError if it is
+    missing, has another format version or was built from other sources.
+    """
+    manifest_path = os.path.join(artifact_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        raise ArtifactError(f"No recommender artifact in {artifact_dir}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != ARTIFACT_VERSION:
+        raise ArtifactError(f"Artifact version {manifest.get('version')} != {ARTIFACT_VERSION}")
+    if os.path.exists(catalog_path) and os.path.exists(known_ingredients_path):
+        if manifest["source_sha256"] != source_checksum(catalog_path, known_ingredients_path):
+            raise ArtifactError("Artifact checksum does not match the source catalog")
+    else:
+        print("[WARN] Source catalog not found, skipping the recommender artifact checksum.")
+
+    arrays = [np.load(os.path.join(artifact_dir, f"{name}.npy"), mmap_mode="r")
+              for name in ("data", "indices", "indptr")]
+    matrix = sp.csr_matrix(tuple(arrays), shape=tuple(manifest["shape"]), copy=False)
+    with open(os.path.join(artifact_dir, "metadata.json")) as f:
+        metadata = json.load(f)
+    with open(os.path.join(artifact_dir, "vocabulary.json")) as f:
+        vocabulary = json.load(f)
+    return matrix, metadata, vocabulary
+
+
+class Recommender:
+    """
+    Catalog prepared once for cosine-similarity lookups: an inverted index
+    over the binary ingredient rows, a row mask per lowercased
+    product_type, and the simplified names used to drop size variants of
+    the same product. Ties in similarity are broken by catalog order.
+
+    skin_scores holds every product's skin-type compatibility (recommended
+    minus avoided ingredients per INGREDIENT_GUIDE), one column per skin
+    type, computed with a single sparse product when the snapshot is built.
+    """
+
+    def __init__(self, matrix, metadata, vocabulary, source="memory"):
+        self.source = source
+        self.loaded_at = time.time()
+        self.matrix = matrix
+        self.vocabulary = vocabulary
+        self.vectorizer = build_vectorizer(vocabulary)
+        self.index = InvertedIndex(matrix)
+        self.records = [dict(zip(METADATA_COLUMNS, values))
+                        for values in zip(*(metadata[column] for column in METADATA_COLUMNS))]
+        self.dedup_keys = metadata.get("dedup_key") or [simplify_name(name) for name in metadata["product_name"]]
+
+        types = np.array([t.lower() if isinstance(t, str) else "" for t in metadata["product_type"]])
+        self.type_masks = {product_type: types == product_type for product_type in np.unique(types) if product_type}
+
+        rules = SKIN_TYPE_RULES.project(self.vectorizer.lookup, len(self.vectorizer))
+        self.skin_scores = SKIN_TYPE_RULES.score_products(matrix, rules)
+        self.skin_masks = {skin_type: self.skin_scores[:, i] >= 0
+                           for skin_type, i in SKIN_TYPE_RULES.type_ids.items()}
+
+    @classmethod
+    def from_catalog(cls, df, vocabulary):
+        matrix = build_vectorizer(vocabulary).fit_transform(df["cleaned_ingredients"]).tocsr()
+        metadata = {column: df[column].tolist() for column in METADATA_COLUMNS}
+        return cls(matrix, metadata, vocabulary)
+
+    def _metadata(self):
+        metadata = {column: [record[column] for record in self.records] for column in METADATA_COLUMNS}
+        metadata["dedup_key"] = list(self.dedup_keys)
+        return metadata
+
+    def with_products(self, products):
+        """
+        Returns a new Recommender with products (dicts with the metadata
+        columns and "ingredients") appended. Only the new rows are
+        vectorized; this snapshot is left unchanged.
+        """
+        cleaned = [preprocess_ingredients(product.get("ingredients")) for product in products]
+        rows = self.vectorizer.transform(cleaned).tocsr()
+        matrix = sp.vstack([self.matrix, rows], format="csr")
+
+        metadata = self._metadata()
+        for product in products:
+            for column in METADATA_COLUMNS:
+                metadata[column].append(product.get(column))
+            metadata["dedup_key"].append(simplify_name(product["product_name"]))
+        return Recommender(matrix, metadata, self.vocabulary)
+
+    def without_products(self, product_urls):
+        """
+        Returns a new Recommender without the products whose product_url is
+        in product_urls, and the number of products removed.
+        """
+        product_urls = set(product_urls)
+        keep = np.array([record["product_url"] not in product_urls for record in self.records], dtype=bool)
+        metadata = {column: [value for value, kept in zip(values, keep) if kept]
+                    for column, values in self._metadata().items()}
+        return Recommender(self.matrix[keep], metadata, self.vocabulary), int((~keep).sum())
+
+    def describe(self):
+        return {"products": self.index.num_docs, "vocabulary": len(self.vectorizer),
+                "source": self.source, "loaded_at": self.loaded_at}
+
+    def query_terms(self, input_ingredients):
+        input_cleaned = ", ".join([i.lower() for i in input_ingredients if i])
+        return self.vectorizer.transform([input_cleaned]).indices
+
+    def recommend(self, input_ingredients, product_type=None, top_n=5, skin_type=None):
+        """
+        Returns up to top_n distinct products most similar to
+        input_ingredients. With a known skin_type, products with more
+        avoided than recommended ingredients for it are left out and equally
+        similar products are ordered by their compatibility score.
+        """
+        allowed = None
+        if product_type:
+            allowed = self.type_masks.get(product_type.lower())
+            if allowed is None:
+                return []
+        skin_column = SKIN_TYPE_RULES.type_ids.get(skin_type)
+        if skin_column is not None:
+            skin_mask = self.skin_masks[skin_type]
+            allowed = skin_mask if allowed is None else allowed & skin_mask
+        candidates = self.index.num_docs if allowed is None else int(allowed.sum())
+        if top_n <= 0 or candidates == 0:
+            return []
+
+        terms = self.query_terms(input_ingredients)
+
+        # Size variants share a dedup key, so widen k until enough distinct
+        # products are found or every candidate has been ranked.
+        k = min(candidates, top_n * 2)
+        while True:
+            # Compatibility reorders equally similar products, so every
+            # product tied with the k-th must be ranked too.
+            rows, sims = self.index.top_k(terms, k, allowed, ties=skin_column is not None)
+            if skin_column is not None:
+                compatibility = self.skin_scores[rows, skin_column]
+                rows = rows[np.lexsort((-compatibility, -np.round(sims, 12)))]
+            seen = set()
+            deduped = []
+            for row in rows:
+                key = self.dedup_keys[row]
+                if key not in seen:
+                    seen.add(key)
+                    deduped.append(dict(self.records[row]))
+                    if len(deduped) == top_n:
+                        return deduped
+            if k == candidates:
+                return deduped
+            k = min(candidates, k * 4)
+
+
+def load_recommender(artifact_dir=ARTIFACT_DIR):
+    """
+    Loads the prebuilt artifact, or vectorizes the CSV when the artifact is
+    missing or stale.
+    """
+    start = time.perf_counter()
+    try:
+        recommender = Recommender(*load_artifact(artifact_dir), source="artifact")
+    except ArtifactError as e:
+        print(f"[WARN] {e}; vectorizing {CATALOG_PATH}. Run `python -m app.recommend build` to prebuild it.")
+        recommender = Recommender.from_catalog(load_catalog(), load_known_ingredients())
+        recommender.source = "csv"
+    print(f"[INFO] Recommender loaded from {recommender.source} ({recommender.index.num_docs} products) "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return recommender
+
+
+_recommender = None
+_recommender_lock = threading.Lock()
+
+
+def get_recommender():
+    global _recommender
+    with _recommender_lock:
+        if _recommender is None:
+            _recommender = load_recommender()
+        return _recommender
+
+
+def set_recommender(recommender):
+    """
+    Atomically replaces the served snapshot. Requests that already called
+    get_recommender() finish on the snapshot they got.
+    """
+    global _recommender
+    with _recommender_lock:
+        previous, _recommender = _recommender, recommender
+    return previous
+
+
+def reload_recommender(rebuild=False):
+    """
+    Loads a fresh snapshot from disk (rebuilding the artifact first if
+    asked) and swaps it in. Products added or removed in memory are lost.
+    """
+    if rebuild:
+        build_artifact()
+    recommender = load_recommender()
+    set_recommender(recommender)
+    return recommender
+
+
+# Serializes add/remove so concurrent updates don't drop each other.
+_update_lock = threading.Lock()
+
+
+def add_products(products):
+    with _update_lock:
+        recommender = get_recommender().with_products(products)
+        set_recommender(recommender)
+    return recommender
 
-    df_copy = df.copy()
-    df_copy["similarity"] = sims
 
-    if input_product_type:
-        df_copy = df_copy[df_copy["product_type"].str.lower() == input_product_type.lower()]
+def remove_products(product_urls):
+    with _update_lock:
+        recommender, removed = get_recommender().without_products(product_urls)
+        set_recommender(recommender)
+    return recommender, removed
 
-    if df_copy.empty:
-        return []  
 
-    top_recs = df_copy.sort_values(by="similarity", ascending=False)
+def recommend_products(input_ingredients, input_product_type=None, top_n=5, skin_type=None):
+    return get_recommender().recommend(input_ingredients, input_product_type, top_n, skin_type)
 
-    seen = set()
-    deduped = []
 
-    for _, row in top_recs.iterrows():
-        simplified = simplify_name(row["product_name"])
-        if simplified not in seen:
-            seen.add(simplified)
-            deduped.append({
-                "product_name": row["product_name"],
-                "product_url": row["product_url"],
-                "product_type": row["product_type"],
-                "price": row["price"]
-            })
-        if len(deduped) == top_n:
-            break
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommender catalog artifact.")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("--out", default=ARTIFACT_DIR)
+    args = parser.parse_args()
 
-    return deduped
+    if args.command == "build":
+        build_artifact(args.out)
+    else:
+        load_recommender(args.out)
@@ -0,0 +1,182 @@
+# result_cache.py
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from app.llm_cache import canonical_name
+from app.metrics import registry, cache_metrics, Family
+
+# Analyses kept; 0 disables the cache.
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "512"))
+# Seconds an analysis is served from the cache.
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+# Differing hash bits (of HASH_SIZE * HASH_SIZE) still treated as the same
+# photo. Re-encoded, rescaled or re-exposed photos of a label differ in
+# fewer than ~15 bits; other labels in app/tests differ in 25 or more.
+RESULT_CACHE_MAX_DISTANCE = int(os.getenv("RESULT_CACHE_MAX_DISTANCE", "12"))
+HASH_SIZE = 16
+
+
+def dhash(image_bgr, hash_size=HASH_SIZE):
+    """
+    Difference hash of an image: the signs of the horizontal gradients of
+    a hash_size x hash_size grayscale thumbnail, as a hash_size**2-bit int.
+    Insensitive to scale, compression and uniform brightness changes.
+    """
+    gray = image_bgr if image_bgr.ndim == 2 else cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (thumb[:, 1:] > thumb[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+def ingredient_set_key(ingredients):
+    """
+    Order-insensitive key of a parsed ingredient list.
+    """
+    return tuple(sorted({canonical_name(name) for name in ingredients if canonical_name(name)}))
+
+
+class ResultCache:
+    """
+    Bounded LRU of finished analyses, looked up by perceptual hash and
+    skin_type. A lookup returns the nearest entry within max_distance bits
+    that is younger than ttl seconds.
+
+    The GPT descriptions of each cached analysis are also kept by ingredient
+    set, so a new photo of a cached product skips GPT once its ingredients
+    are parsed.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, max_distance=RESULT_CACHE_MAX_DISTANCE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()
+        self._descriptions = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+        self.description_hits = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _expire(self, now):
+        # Entries are kept in insertion/use order, not age order, so every
+        # entry is checked; the cache is small.
+        for store in (self._entries, self._descriptions):
+            for key in [key for key, entry in store.items() if now - entry["created_at"] > self.ttl]:
+                del store[key]
+
+    @staticmethod
+    def _bound(store, size):
+        while len(store) > size:
+            store.popitem(last=False)
+
+    def get(self, image_hash, skin_type):
+        """
+        Returns (payload copy, distance, age in seconds) of the nearest
+        cached analysis, or None.
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            best = None
+            for key, entry in self._entries.items():
+                if entry["skin_type"] != skin_type:
+                    continue
+                distance = hamming(image_hash, entry["hash"])
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, key)
+                    if distance == 0:
+                        break
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best[1])
+            entry = self._entries[best[1]]
+            return copy.deepcopy(entry["payload"]), best[0], now - entry["created_at"]
+
+    def put(self, image_hash, skin_type, payload, descriptions=None):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._entries[self._next_id] = {
+                "hash": image_hash,
+                "skin_type": skin_type,
+                "payload": copy.deepcopy(payload),
+                "created_at": now
+            }
+            self._next_id += 1
+            self._bound(self._entries, self.max_entries)
+            if descriptions is not None:
+                self._put_descriptions(ingredient_set_key(payload["parsed_ingredients"]), descriptions, now)
+
+    def _put_descriptions(self, key, descriptions, now):
+        self._descriptions[key] = {"result": copy.deepcopy(descriptions), "created_at": now}
+        self._descriptions.move_to_end(key)
+        self._bound(self._descriptions, self.max_entries)
+
+    def get_descriptions(self, ingredients):
+        """
+        Returns a copy of the cached descriptions stage result for the same
+        ingredient set, or None.
+        """
+        if not self.enabled:
+            return None
+        key = ingredient_set_key(ingredients)
+        with self._lock:
+            entry = self._descriptions.get(key)
+            if entry is None or time.time() - entry["created_at"] > self.ttl:
+                return None
+            self.description_hits += 1
+            self._descriptions.move_to_end(key)
+            return copy.deepcopy(entry["result"])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._descriptions.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "ingredient_sets": len(self._descriptions),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "description_hits": self.description_hits
+            }
+
+
+result_cache = ResultCache()
+
+
+def _result_cache_metrics():
+    stats = result_cache.stats()
+    return cache_metrics("results", stats) + [
+        Family("cache_hits_total", "counter", "Cache lookups answered from the cache.").add(
+            stats["description_hits"], cache="ingredient_sets"),
+        Family("cache_entries", "gauge", "Entries held by the cache.").add(stats["ingredient_sets"], cache="ingredient_sets"),
+    ]
+
+
+registry.register_collector(_result_cache_metrics)
@@ -1,25 +1,22 @@
 #routes.py
 import os
-import numpy as np
-import cv2
-import easyocr
 import json
+import hmac
 import openai
-from flask import Blueprint, request, jsonify
-from app.ocr import preprocess_image_for_ocr, extract_ingredients
-from app.parse_utils import my_known_ingredients
-from app.skincare import analyze_product_for_skin_type
-from app.image_quality import is_blurry, is_too_dark, is_skewed
-from app.translation_utils import detect_language, translate_to_english
-from app.image_quality import is_blurry, is_too_dark, is_skewed, is_low_contrast
-from app.ocr import visualize_ocr_results, visualize_extracted_ingredients_side_by_side, visualize_classified_ingredients
-from app.skincare import classify_ingredients_by_safety
-from app.recommend import recommend_products
-from app.skincare import count_safety_levels, compute_product_score, classify_product
+from flask import Blueprint, Response, request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from app import recommend
+from app.catalog import reload_catalog
+from app.ingredient_info import description_cache_stats
+from app.jobs import job_manager, CallbackError, QueueFullError
+from app.metrics import registry, CONTENT_TYPE
+from app.translation_utils import get_translation_cache
+from app.pipeline import analyze_label, AnalysisError, STAGES
+from app.uploads import read_upload, check_image, decode_image, UploadError, MAX_UPLOAD_BYTES
 
 
 main = Blueprint("main", __name__)
-from app.model import predict_skin_type
+from app.model import predict_skin_type, IMG_SIZE
 
 main = Blueprint("main", __name__)
 
@@ -28,7 +25,10 @@ from dotenv import load_dotenv
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-reader = easyocr.Reader(['en', 'fr', 'it', 'de', 'es'], gpu=False)
+# Seconds /analyze_product waits for its job before answering 504.
+ANALYZE_TIMEOUT = float(os.getenv("ANALYZE_TIMEOUT", "180"))
+# Bearer token for the /admin endpoints; they are disabled when unset.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
 '''
 def get_ingredient_descriptions(final_ingredient_list):
@@ -87,56 +87,9 @@ def get_ingredient_descriptions(final_ingredient_list):
         return None
 '''
 
-def get_ingredient_descriptions(final_ingredient_list):
-    """
-    Generate descriptions and safety warnings for the ingredients
-    using OpenAI GPT-4o, and return parsed JSON.
-    """
-    try:
-        final_ingredient_string = ", ".join(final_ingredient_list)
-
-        prompt = f"""
-You are given a list of skincare ingredients. For each ingredient:
-1. Provide a short description.
-2. Mention if it's safe or if it may cause irritation/risk.
-
-Return a valid JSON **object**, not markdown. Use this format:
-{{
-  "ingredients": [
-    {{
-      "name": "Ingredient Name",
-      "description": "Short description.",
-      "safety": "Safety note."
-    }},
-    ...
-  ],
-  "summary": "Overall product safety summary."
-}}
-
-Ingredient list: {final_ingredient_string}
-        """
-
-        completion = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You're a cosmetic ingredient safety assistant. Only respond with valid JSON."},
-                {"role": "user", "content": prompt.strip()}
-            ]
-        )
-
-        response_content = completion.choices[0].message['content'].strip()
-
-        print("[DEBUG] Raw OpenAI response:", response_content[:300])
-
-        if response_content.startswith("```json"):
-            response_content = response_content.strip("```json").strip("```").strip()
-
-        return json.loads(response_content)
-
-    except Exception as e:
-        print(f"[ERROR] Failed to parse OpenAI response: {e}")
-        return None
-
+@main.app_errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({"error": f"Request is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB."}), 413
 
 
 @main.route("/")
@@ -152,169 +105,209 @@ def classify_skin():
     if "file" not in request.files:
         return jsonify({"error": "No 'file' in request"}), 400
 
-    file = request.files["file"]
-    image_bytes = file.read()
-    np_array = np.frombuffer(image_bytes, np.uint8)
-    image_bgr = cv2.imdecode(np_array, cv2.IMREAD_COLOR)
+    # The model sees an IMG_SIZE square; decode at no less than twice that.
+    try:
+        image_bgr = decode_image(read_upload(request.files["file"]), min_side=2 * IMG_SIZE)
+    except UploadError as e:
+        return jsonify(e.payload), e.status
 
-    predicted_type = predict_skin_type(image_bgr)
+    try:
+        predicted_type = predict_skin_type(image_bgr)
+    except TimeoutError:
+        return jsonify({"error": "Skin type model is busy, try again later."}), 503
     return jsonify({"skin_type": predicted_type})
 
-@main.route("/analyze_product", methods=["POST"])
-def analyze_product():
+
+def _read_analysis_request():
     """
-    Expects:
-      - 'label_file': product label image (form-data)
-      - 'skin_type': (dry, normal, oily, etc.) in the form-data
-    Returns JSON with extracted ingredients and recommended/avoid info.
+    Validates the analyze_product form and returns (image_bytes, skin_type),
+    or raises AnalysisError.
     """
     if "label_file" not in request.files:
-        return jsonify({"error": "No 'label_file' in request"}), 400
+        raise AnalysisError({"error": "No 'label_file' in request"}, 400)
     if "skin_type" not in request.form:
-        return jsonify({"error": "No 'skin_type' in form data"}), 400
+        raise AnalysisError({"error": "No 'skin_type' in form data"}, 400)
 
     skin_type = request.form["skin_type"].lower().strip()
+    try:
+        image_bytes = read_upload(request.files["label_file"])
+        check_image(image_bytes)
+    except UploadError as e:
+        raise AnalysisError(e.payload, e.status)
+    return image_bytes, skin_type
 
-    file = request.files["label_file"]
-    image_bytes = file.read()
-    np_array = np.frombuffer(image_bytes, np.uint8)
-    image_bgr = cv2.imdecode(np_array, cv2.IMREAD_COLOR)
-
-    issues = []
-
-    if image_bgr.shape[0] < 500 or image_bgr.shape[1] < 500:
-        print("[INFO] Image too small. Upscaling for better OCR...")
-        image_bgr = cv2.resize(image_bgr, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
-
-    if is_too_dark(image_bgr):
-        issues.append("dark")
-
-    if is_blurry(image_bgr):
-        issues.append("blurry")
-
-    if is_skewed(image_bgr):
-        issues.append("skewed")
-    
-    if is_low_contrast(image_bgr):
-        issues.append("low_contrast")
-
-
-    if issues:
-        priority_map = {
-            "blurry": 1,
-            "dark": 2,
-            "low_contrast": 3,
-            "skewed": 4
-        }
-
-        error_messages = {
-            "blurry": "The image is too blurry. Please retake with better focus.",
-            "dark": "The image is too dark. Please retake it in better lighting.",
-            "low_contrast": "The image has low contrast. Please retake it with clearer lighting and better background separation.",
-            "skewed": "The image is skewed. Please take the photo straight-on."
-        }
-
-        top_issue = sorted(issues, key=lambda x: priority_map[x])[0]
-        top_message = error_messages[top_issue]
-
-        print("Returning 400 with:", json.dumps({
-            "error": "Image quality issue detected.",
-            "details": [top_message]
-        }, indent=2))
-
-        return jsonify({
-            "error": "Image quality issue detected.",
-            "details": [top_message]
-        }), 400
-
-    processed_image = preprocess_image_for_ocr(image_bgr)
-    processed_rgb = cv2.cvtColor(processed_image, cv2.COLOR_BGR2RGB)
-    ocr_results = reader.readtext(processed_rgb, detail=1)
-
-    #visualize_ocr_results(processed_rgb, ocr_results, save_path="annotated_output.jpg")
-    visualize_ocr_results(image_bgr, ocr_results, save_path="annotated_output.jpg")
-
-
-    filtered_texts = [res[1] for res in ocr_results if res[2] > 0.5]  # Filter by confidence
-    all_text = " ".join(filtered_texts)
-    print(f"[INFO] Filtered OCR results (confidence > 0.5): {filtered_texts}")
-
-    if len(all_text.strip()) < 20:
-        return jsonify({"error": "Text could not be clearly extracted. Please retake the image with better focus."}), 400
-
-
-    detected_lang = detect_language(all_text)
-    print(f"[INFO] Detected language: {detected_lang}")
-
-    original_text = all_text  
-
-    if detected_lang != "en":
-        print("[INFO] Translating text to English using GPT-4o...")
-        all_text = translate_to_english(all_text)
-        print("[INFO] Translation complete.")
-
-    final_ingredient_list = extract_ingredients(all_text, known_ingredients=my_known_ingredients)
 
-    # Save clean visual with ingredients listed on the side
-    #visualize_extracted_ingredients_side_by_side(image_bgr, final_ingredient_list)
+def _submit_analysis(callback_url=None):
+    image_bytes, skin_type = _read_analysis_request()
+    try:
+        return job_manager.submit(analyze_label, image_bytes, skin_type,
+                                  stages=STAGES, callback_url=callback_url)
+    except QueueFullError as e:
+        raise AnalysisError({"error": str(e)}, 503)
+    except CallbackError as e:
+        raise AnalysisError({"error": str(e)}, 400)
 
-    # Step 1: Extract & classify ingredients
-    ingredient_safety_map = classify_ingredients_by_safety(skin_type, final_ingredient_list)
 
-    # Step 2: Annotate image with safety color-coded boxes
-    visualize_classified_ingredients(
-    image_bgr,
-    ocr_results,
-    ingredient_safety_map,
-    save_path="classified_output.jpg",
-    summary_path="classified_summary.json"
-)
+@main.route("/analyze_product", methods=["POST"])
+def analyze_product():
+    """
+    Expects:
+      - 'label_file': product label image (form-data)
+      - 'skin_type': (dry, normal, oily, etc.) in the form-data
+    Returns JSON with extracted ingredients and recommended/avoid info.
+    Runs as a job on the analysis worker pool and waits for it.
+    """
+    try:
+        job = _submit_analysis()
+    except AnalysisError as e:
+        return jsonify(e.payload), e.status
 
+    if not job.wait(ANALYZE_TIMEOUT):
+        return jsonify({"error": "Analysis timed out.", "job_id": job.id}), 504
 
+    if job.state == "failed":
+        return jsonify(job.error), job.status_code
+    return jsonify(job.result)
 
-    # Generate ingredient descriptions using OpenAI GPT
-    ingredient_info = get_ingredient_descriptions(final_ingredient_list)
 
-    safety_counts = count_safety_levels(ingredient_info)
-    product_score = compute_product_score(safety_counts)
-    product_safety = classify_product(product_score)
+@main.route("/jobs/analyze_product", methods=["POST"])
+def submit_analyze_product_job():
+    """
+    Same form fields as /analyze_product, plus an optional 'callback_url'
+    that receives the finished job as a JSON POST. Callbacks are only sent
+    to hosts listed in JOB_CALLBACK_HOSTS that resolve to public addresses.
+    Returns 202 with the job id; poll /jobs/<job_id> for progress and result.
+    """
+    try:
+        job = _submit_analysis(callback_url=request.form.get("callback_url") or None)
+    except AnalysisError as e:
+        return jsonify(e.payload), e.status
 
+    body = job.to_dict()
+    body["status_url"] = f"/jobs/{job.id}"
+    return jsonify(body), 202
 
-    filtered_ingredients = []
-    for ing in ingredient_info["ingredients"]:
-        desc = ing.get("description", "").lower()
-        if "misspelling" not in desc and "confusion" not in desc:
-            filtered_ingredients.append(ing)
 
-    ingredient_info["ingredients"] = filtered_ingredients
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    if ingredient_info is None:
-        return jsonify({"error": "Failed to generate ingredient descriptions"}), 500
 
+def _stream_job(job):
+    """
+    Server-sent events for a job: one event per finished stage (quality,
+    ocr, parse, skin_analysis, recommend, descriptions, ...), then a final
+    'result' or 'error' event.
+    """
+    def generate():
+        yield _sse("job", {"job_id": job.id, "stages": job.stages})
+        for event in job.iter_events():
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            stage, data = event
+            yield _sse(stage, data or {})
+
+        if job.state == "failed":
+            yield _sse("error", {"status_code": job.status_code, **job.error})
+        else:
+            yield _sse("result", job.result)
+
+    return Response(generate(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@main.route("/analyze_product/stream", methods=["POST"])
+def analyze_product_stream():
+    """
+    Same form fields as /analyze_product. Streams each stage as a
+    server-sent event as soon as it finishes instead of waiting for the
+    whole payload.
+    """
+    try:
+        job = _submit_analysis()
+    except AnalysisError as e:
+        return jsonify(e.payload), e.status
+    return _stream_job(job)
 
 
-    # Analyze for user's skin type
-    analysis_summary = analyze_product_for_skin_type(skin_type, final_ingredient_list)
+@main.route("/jobs/<job_id>/events", methods=["GET"])
+def stream_job_events(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return _stream_job(job)
 
-    recommendations = recommend_products(final_ingredient_list)
 
+@main.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job.to_dict())
 
-    response_payload = {
-        "parsed_ingredients": final_ingredient_list,
-        "ingredient_info": ingredient_info,
-        "analysis_summary": analysis_summary,
-        "detected_language": detected_lang,
-        "ingredient_image_url": "clean_ingredients_output.jpg",
-        "classified_image_url": "classified_output.jpg",
-        "recommendations": recommendations,
-        "safety_counts": safety_counts,
-        "product_score": product_score,
-        "product_safety": product_safety
-    }
 
-    print("[DEBUG] Final response JSON:", json.dumps(response_payload, indent=2))
+@main.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Stage latency histograms, cache, batching, job queue and LLM usage
+    counters in the Prometheus text format.
+    """
+    return Response(registry.render(), content_type=CONTENT_TYPE)
 
-    return jsonify(response_payload)
 
+@main.route("/llm_cache/stats", methods=["GET"])
+def llm_cache_stats():
+    return jsonify({**description_cache_stats(), "translations": get_translation_cache().stats()})
 
 
+def _admin_error():
+    """
+    Returns an error response unless the request carries ADMIN_TOKEN as
+    "Authorization: Bearer <token>".
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled"}), 404
+    supplied = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {ADMIN_TOKEN}".encode()):
+        return jsonify({"error": "Unauthorized"}), 401
+    return None
+
+
+@main.route("/admin/catalog/reload", methods=["POST"])
+def admin_reload_catalog():
+    error = _admin_error()
+    if error:
+        return error
+    rebuild = request.args.get("rebuild", "").lower() in ("1", "true", "yes")
+    try:
+        return jsonify(reload_catalog(rebuild=rebuild))
+    except Exception as e:
+        return jsonify({"error": f"Catalog reload failed: {e}"}), 500
+
+
+@main.route("/admin/catalog/products", methods=["POST"])
+def admin_add_products():
+    error = _admin_error()
+    if error:
+        return error
+    products = (request.get_json(silent=True) or {}).get("products")
+    required = ["product_name", "product_url", "product_type", "ingredients"]
+    if not isinstance(products, list) or not all(
+            isinstance(p, dict) and all(isinstance(p.get(k), str) for k in required) for p in products):
+        return jsonify({"error": f"Expected 'products': a list of objects with {', '.join(required)}"}), 400
+
+    recommender = recommend.add_products(products)
+    return jsonify({"added": len(products), "recommender": recommender.describe()})
+
+
+@main.route("/admin/catalog/products", methods=["DELETE"])
+def admin_remove_products():
+    error = _admin_error()
+    if error:
+        return error
+    product_urls = (request.get_json(silent=True) or {}).get("product_urls")
+    if not isinstance(product_urls, list):
+        return jsonify({"error": "Expected 'product_urls': a list of product URLs"}), 400
+
+    recommender, removed = recommend.remove_products(product_urls)
+    return jsonify({"removed": removed, "recommender": recommender.describe()})
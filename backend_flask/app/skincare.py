@@ -1,4 +1,7 @@
 # app/skincare.py
+import re
+
+import numpy as np
 
 INGREDIENT_GUIDE = {
     "dry": {
@@ -59,17 +62,116 @@ INGREDIENT_GUIDE = {
 }
 
 
+# Class values in the compiled rule matrix.
+RECOMMENDED = 1
+AVOID = -1
+
+BRACKETED_RE = re.compile(r"\(([^)]*)\)|\[([^\]]*)\]")
+
+
+def _synonyms(name):
+    # Labels print one ingredient under several names ("fragrance (parfum)",
+    # "(aqua) water", "parfum / fragrance"); the guide lists only one.
+    parts = [BRACKETED_RE.sub(" ", name), *(a or b for a, b in BRACKETED_RE.findall(name))]
+    for part in parts:
+        yield " ".join(part.lower().split())
+        if "/" in part:
+            for side in part.split("/"):
+                yield " ".join(side.lower().split())
+
+
+class SkinTypeRules:
+    """
+    INGREDIENT_GUIDE compiled once into an ingredient-id x skin-type matrix
+    holding RECOMMENDED, AVOID or 0. Lookups are one dict probe per
+    ingredient, and a binary product x ingredient matrix times the rule
+    matrix scores any number of products for every skin type at once
+    (recommended minus avoided ingredients).
+    """
+
+    def __init__(self, guide):
+        self.skin_types = list(guide)
+        self.type_ids = {skin_type: i for i, skin_type in enumerate(self.skin_types)}
+        self.names = []
+        self.ids = {}
+        for skin_type in self.skin_types:
+            for key in ("recommended", "avoid"):
+                for name in guide[skin_type].get(key, []):
+                    if name.lower() not in self.ids:
+                        self.ids[name.lower()] = len(self.names)
+                        self.names.append(name.lower())
+
+        self.matrix = np.zeros((len(self.names), len(self.skin_types)), dtype=np.int8)
+        for skin_type, column in self.type_ids.items():
+            # "recommended" is checked first when classifying, so it wins.
+            for key, value in (("avoid", AVOID), ("recommended", RECOMMENDED)):
+                for name in guide[skin_type].get(key, []):
+                    self.matrix[self.ids[name.lower()], column] = value
+
+    def row(self, name):
+        """
+        Rule row of an ingredient name, or None. The name is looked up as
+        given, then, for names with a bracketed or slashed synonym, by each
+        of their parts, so "fragrance (parfum)" gets the "fragrance" rules.
+        """
+        row = self.ids.get(name)
+        if row is None and ("(" in name or "[" in name or "/" in name):
+            for synonym in _synonyms(name):
+                row = self.ids.get(synonym)
+                if row is not None:
+                    break
+        return row
+
+    def classes(self, skin_type, ingredient_list):
+        """
+        Rule class of each ingredient for skin_type (see row()).
+        """
+        column = self.type_ids[skin_type]
+        return [self.matrix[row, column] if row is not None else 0
+                for row in (self.row(ing) for ing in ingredient_list)]
+
+    def score(self, ingredient_list):
+        """
+        Scores one ingredient list for every skin type.
+        """
+        rows = [row for row in (self.row(ing.lower()) for ing in ingredient_list) if row is not None]
+        totals = self.matrix[rows].sum(axis=0, dtype=np.int64)
+        return dict(zip(self.skin_types, totals.tolist()))
+
+    def project(self, lookup, num_terms):
+        """
+        Re-indexes the rules onto another vocabulary: lookup(name) returns
+        the term id of a guide name or None. Returns a num_terms x skin-type
+        matrix; names outside the vocabulary are dropped.
+        """
+        projected = np.zeros((num_terms, len(self.skin_types)), dtype=np.int8)
+        for value in (AVOID, RECOMMENDED):
+            for row, name in enumerate(self.names):
+                term = lookup(name)
+                if term is not None:
+                    projected[term] = np.where(self.matrix[row] == value, value, projected[term])
+        return projected
+
+    def score_products(self, product_matrix, rules=None):
+        """
+        Scores every row of a binary product x term matrix for every skin
+        type in one sparse product. rules is the matching projection of the
+        rule matrix (default: product columns are this rule set's ids).
+        """
+        rules = self.matrix if rules is None else rules
+        return np.asarray(product_matrix @ rules.astype(np.int32))
+
+
+SKIN_TYPE_RULES = SkinTypeRules(INGREDIENT_GUIDE)
 
 
 def analyze_product_for_skin_type(skin_type, ingredient_list):
     if skin_type not in INGREDIENT_GUIDE:
         return f"No knowledge base for skin type {skin_type}"
 
-    recommended_list = INGREDIENT_GUIDE[skin_type]["recommended"]
-    avoid_list = INGREDIENT_GUIDE[skin_type]["avoid"]
-
-    present_recommended = [ing for ing in ingredient_list if ing in recommended_list]
-    present_avoid = [ing for ing in ingredient_list if ing in avoid_list]
+    classes = SKIN_TYPE_RULES.classes(skin_type, ingredient_list)
+    present_recommended = [ing for ing, cls in zip(ingredient_list, classes) if cls == RECOMMENDED]
+    present_avoid = [ing for ing, cls in zip(ingredient_list, classes) if cls == AVOID]
 
     summary = f"For {skin_type.upper()} skin:\n"
     if present_recommended:
@@ -83,36 +185,34 @@ def analyze_product_for_skin_type(skin_type, ingredient_list):
 
 
 def classify_ingredients_by_safety(skin_type, ingredient_list):
-    guide = INGREDIENT_GUIDE.get(skin_type, {})
-    safe = [x.lower() for x in guide.get("recommended", [])]
-    harmful = [x.lower() for x in guide.get("avoid", [])]
+    if skin_type not in INGREDIENT_GUIDE:
+        return {ingredient: "neutral" for ingredient in ingredient_list}
 
-    safety_map = {}
+    labels = {RECOMMENDED: "safe", AVOID: "harmful", 0: "neutral"}
+    classes = SKIN_TYPE_RULES.classes(skin_type, [ingredient.lower() for ingredient in ingredient_list])
 
-    for ingredient in ingredient_list:
-        ing_lower = ingredient.lower()
-        if ing_lower in safe:
-            safety_map[ingredient] = "safe"
-        elif ing_lower in harmful:
-            safety_map[ingredient] = "harmful"
-        else:
-            safety_map[ingredient] = "neutral"
+    safety_map = {}
+    for ingredient, cls in zip(ingredient_list, classes):
+        safety_map[ingredient] = labels[int(cls)]
 
     return safety_map
 
+def safety_level(safety_note):
+    safety_desc = safety_note.lower()
+
+    if "harmful" in safety_desc or "avoid" in safety_desc or "risk" in safety_desc or "irritation" in safety_desc:
+        return "harmful"
+    elif "safe" in safety_desc and "irritation" not in safety_desc:
+        return "safe"
+    elif "mild" in safety_desc or "sensitive" in safety_desc or "patch test" in safety_desc:
+        return "neutral"
+    return "unknown"
+
+
 def count_safety_levels(ingredient_info):
     counts = {"safe": 0, "harmful": 0, "neutral": 0, "unknown": 0}
     for item in ingredient_info.get("ingredients", []):
-        safety_desc = item.get("safety", "").lower()
-
-        if "harmful" in safety_desc or "avoid" in safety_desc or "risk" in safety_desc or "irritation" in safety_desc:
-            counts["harmful"] += 1
-        elif "safe" in safety_desc and "irritation" not in safety_desc:
-            counts["safe"] += 1
-        elif "mild" in safety_desc or "sensitive" in safety_desc or "patch test" in safety_desc:
-            counts["neutral"] += 1
-        else:
-            counts["unknown"] += 1
+        counts[safety_level(item.get("safety", ""))] += 1
 
     return counts
 
@@ -0,0 +1,88 @@
+# stage_graph.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline-stage")
+        return _executor
+
+
+class StageGraph:
+    """
+    Named stages with dependencies. Each stage function is called with the
+    results of its dependencies, in the order they were listed, and a stage
+    starts as soon as all of them have finished.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, fn, deps=()):
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = (fn, tuple(deps))
+
+    def run(self, parallel=True, on_done=None, executor=None):
+        """
+        Runs every stage and returns ({name: result}, {name: seconds}).
+        on_done(name, result) is called from the calling thread as each
+        stage finishes. The first exception raised by a stage is re-raised
+        once the stages already running have finished.
+        """
+        on_done = on_done or (lambda name, result: None)
+        results = {}
+        timings = {}
+
+        if not parallel:
+            for name, (fn, deps) in self.stages.items():
+                results[name], timings[name] = self._call(fn, [results[d] for d in deps])
+                on_done(name, results[name])
+            return results, timings
+
+        executor = executor or get_executor()
+        remaining = dict(self.stages)
+        running = {}
+        error = None
+
+        while remaining or running:
+            if error is None:
+                for name, (fn, deps) in list(remaining.items()):
+                    if all(d in results for d in deps):
+                        del remaining[name]
+                        future = executor.submit(self._call, fn, [results[d] for d in deps])
+                        running[future] = name
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], timings[name] = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if error is None:
+                    on_done(name, results[name])
+
+        if error is not None:
+            raise error
+        return results, timings
+
+    @staticmethod
+    def _call(fn, args):
+        start = time.perf_counter()
+        result = fn(*args)
+        return result, time.perf_counter() - start
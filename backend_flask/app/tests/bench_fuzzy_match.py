@@ -0,0 +1,73 @@
+#bench_fuzzy_match.py
+"""
+Benchmarks the FuzzyIndex against the difflib scan it replaces, using
+ingredient tokens from the product catalog with OCR-style noise.
+
+    python app/tests/bench_fuzzy_match.py
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import csv
+import random
+import time
+from difflib import get_close_matches
+
+from app.fuzzy_match import FuzzyIndex
+from app.parse_utils import my_known_ingredients
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "skincare_products.csv")
+
+
+def load_label_tokens(limit=2000, seed=13):
+    rng = random.Random(seed)
+    tokens = []
+    with open(CATALOG_PATH, encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            for part in row["ingredients"].split(","):
+                part = part.strip().strip(".").lower()
+                if part:
+                    tokens.append(part)
+    rng.shuffle(tokens)
+    tokens = tokens[:limit]
+
+    noisy = []
+    for token in tokens:
+        chars = list(token)
+        if chars and rng.random() < 0.5:
+            pos = rng.randrange(len(chars))
+            chars[pos] = rng.choice("ilo1 ")
+        noisy.append("".join(chars))
+    return noisy
+
+
+def main(cutoff=0.75):
+    tokens = load_label_tokens()
+    print(f"{len(tokens)} tokens against {len(my_known_ingredients)} known ingredients, cutoff={cutoff}")
+
+    start = time.perf_counter()
+    index = FuzzyIndex(my_known_ingredients)
+    build_s = time.perf_counter() - start
+    print(f"index build: {build_s * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    expected = []
+    for token in tokens:
+        matches = get_close_matches(token, my_known_ingredients, n=1, cutoff=cutoff)
+        expected.append(matches[0] if matches else None)
+    difflib_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [index.best_match(token, cutoff) for token in tokens]
+    index_s = time.perf_counter() - start
+
+    mismatches = sum(a != e for a, e in zip(actual, expected))
+    print(f"difflib scan: {difflib_s:.3f} s ({difflib_s / len(tokens) * 1000:.2f} ms/token)")
+    print(f"fuzzy index:  {index_s:.3f} s ({index_s / len(tokens) * 1000:.2f} ms/token)")
+    print(f"speedup: {difflib_s / index_s:.1f}x, mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
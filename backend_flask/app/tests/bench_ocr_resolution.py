@@ -0,0 +1,91 @@
+#bench_ocr_resolution.py
+"""
+Compares the adaptive OCR working resolution (text scaled to
+OCR_TARGET_TEXT_HEIGHT, larger rungs tried on low confidence) with the
+fixed policy it replaced (2x under 500 px, otherwise as photographed) on
+the sample labels in sample_labels.json. Reports the estimated text
+height, working scale, OCR time and ingredient recall per label.
+
+    python app/tests/bench_ocr_resolution.py
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import json
+import time
+
+import cv2
+
+from app.ocr import extract_ingredients, ocr_text, preprocess_image_for_ocr, run_staged_ocr
+from app.ocr_readers import get_reader, DEFAULT_LANGUAGES
+from app.ocr_resolution import resolution_ladder, resize_to_scale, mean_confidence, OCR_LADDER_MIN_CONFIDENCE
+from app.parse_utils import get_known_ingredients
+from app.phrase_matcher import get_phrase_matcher
+from app.tests.bench_phrase_matcher import LABELS_PATH, score
+
+TESTS_DIR = os.path.dirname(__file__)
+
+
+def read(image_bgr, scale):
+    processed = preprocess_image_for_ocr(resize_to_scale(image_bgr, scale))
+    results, _ = run_staged_ocr(cv2.cvtColor(processed, cv2.COLOR_GRAY2RGB), mode="full")
+    return results
+
+
+def fixed(image_bgr):
+    scale = 2.0 if image_bgr.shape[0] < 500 or image_bgr.shape[1] < 500 else 1.0
+    return read(image_bgr, scale), [scale]
+
+
+def adaptive(image_bgr):
+    scales, _ = resolution_ladder(image_bgr)
+    best, tried = None, []
+    for scale in scales:
+        results = read(image_bgr, scale)
+        tried.append(scale)
+        if best is None or mean_confidence(results) > mean_confidence(best):
+            best = results
+        if mean_confidence(best) >= OCR_LADDER_MIN_CONFIDENCE:
+            break
+    return best, tried
+
+
+def main():
+    known = get_known_ingredients()
+    matcher = get_phrase_matcher(known)
+    get_reader(DEFAULT_LANGUAGES)
+    with open(LABELS_PATH) as f:
+        labels = json.load(f)
+
+    print(f"{'image':<18} {'size':>10} {'text px':>8} {'fixed s':>8} {'recall':>7} "
+          f"{'adapt s':>8} {'recall':>7} {'scales':>16}")
+    totals = {"fixed": [0.0, 0.0], "adaptive": [0.0, 0.0]}
+    for name, label in labels.items():
+        image_bgr = cv2.imread(os.path.join(TESTS_DIR, name))
+        _, text_height = resolution_ladder(image_bgr)
+        row = {}
+        for policy, run in (("fixed", fixed), ("adaptive", adaptive)):
+            start = time.perf_counter()
+            results, tried = run(image_bgr)
+            elapsed = time.perf_counter() - start
+            found = extract_ingredients(ocr_text(results), known_ingredients=known)
+            recall, _ = score(found, label["ingredients"], matcher)
+            row[policy] = (elapsed, recall, tried)
+            totals[policy][0] += elapsed
+            totals[policy][1] += recall
+
+        size = f"{image_bgr.shape[1]}x{image_bgr.shape[0]}"
+        scales = ",".join(f"{s:.2f}" for s in row["adaptive"][2])
+        print(f"{name:<18} {size:>10} {text_height or 0:>8.1f} {row['fixed'][0]:>8.2f} {row['fixed'][1]:>7.1%} "
+              f"{row['adaptive'][0]:>8.2f} {row['adaptive'][1]:>7.1%} {scales:>16}")
+
+    count = len(labels)
+    print(f"{'total':<18} {'':>10} {'':>8} {totals['fixed'][0]:>8.2f} {totals['fixed'][1] / count:>7.1%} "
+          f"{totals['adaptive'][0]:>8.2f} {totals['adaptive'][1] / count:>7.1%}")
+    print(f"speedup: {totals['fixed'][0] / totals['adaptive'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
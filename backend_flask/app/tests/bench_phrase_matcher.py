@@ -0,0 +1,162 @@
+#bench_phrase_matcher.py
+"""
+Benchmarks the Aho-Corasick PhraseMatcher against the extractors it
+replaced, and compares ingredient recall on the sample labels.
+
+Catalog vectorization: the word-level CountVectorizer used before, a
+CountVectorizer over every 1-8 word n-gram (the library way to get
+multi-word names) and PhraseMatcher.transform.
+
+Label recall: extract_ingredients with the phrase matcher against the
+comma-split + difflib parser alone, scored against the hand transcribed
+ingredient lists in sample_labels.json. Without --ocr the transcriptions
+are run through a seeded OCR noise model (lost commas, confused
+characters); with --ocr the labels are read with EasyOCR.
+
+    python app/tests/bench_phrase_matcher.py [--ocr]
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import json
+import random
+import re
+import time
+from unittest import mock
+
+from sklearn.feature_extraction.text import CountVectorizer
+
+from app import ocr
+from app.parse_utils import get_known_ingredients
+from app.phrase_matcher import PhraseMatcher, get_phrase_matcher, phrase_key
+from app.recommend import load_catalog, load_known_ingredients
+
+TESTS_DIR = os.path.dirname(__file__)
+LABELS_PATH = os.path.join(TESTS_DIR, "sample_labels.json")
+NOISE_TRIALS = 20
+CONFUSIONS = {"l": "1", "i": "l", "o": "0", "e": "c", "n": "m", "u": "v", "s": "5"}
+
+
+def ocr_noise(text, rng, comma_loss=0.3, char_error=0.02):
+    text = re.sub(r",\s", lambda m: " " if rng.random() < comma_loss else m.group(), text)
+    return "".join(CONFUSIONS.get(c.lower(), c) if rng.random() < char_error else c for c in text)
+
+
+def legacy_extract(text, known_ingredients):
+    with mock.patch.object(ocr, "parse_ingredients_section", ocr._parse_unmatched_text):
+        return ocr.extract_ingredients(text, known_ingredients=known_ingredients)
+
+
+def score(found, expected, matcher):
+    def key(name):
+        term = matcher.lookup(name)
+        return term if term is not None else phrase_key(name)
+
+    found_keys = {key(name) for name in found}
+    expected_keys = [{key(alt) for alt in entry.split("|")} for entry in expected]
+    recalled = sum(1 for alts in expected_keys if alts & found_keys)
+    correct = sum(1 for k in found_keys if any(k in alts for alts in expected_keys))
+    return recalled / len(expected), correct / max(len(found_keys), 1)
+
+
+def bench_catalog():
+    vocabulary = load_known_ingredients()
+    catalog = load_catalog()
+    texts = catalog["cleaned_ingredients"].tolist()
+    entries = [[e for e in text.split(", ") if e] for text in texts]
+    total_entries = sum(len(e) for e in entries)
+
+    ngram_vocabulary = sorted({phrase_key(name) for name in vocabulary if phrase_key(name)})
+    vectorizers = {
+        "CountVectorizer (words)": CountVectorizer(vocabulary=vocabulary, binary=True),
+        "CountVectorizer (1-8 grams)": CountVectorizer(vocabulary=ngram_vocabulary, binary=True,
+                                                       ngram_range=(1, 8), token_pattern=r"[a-z0-9]+"),
+    }
+
+    print(f"\ncatalog: {len(texts)} products, {total_entries} listed ingredients")
+    print(f"{'vectorizer':<28} {'build ms':>9} {'transform ms':>13} {'listed ingredients matched':>27}")
+    for name, vectorizer in vectorizers.items():
+        start = time.perf_counter()
+        vectorizer.fit([])
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        matrix = vectorizer.transform(texts)
+        elapsed = time.perf_counter() - start
+        columns = vectorizer.vocabulary_
+        matched = sum(
+            1 for row, listed in enumerate(entries) for entry in listed
+            if columns.get(entry if name.endswith("(words)") else phrase_key(entry)) in
+            set(matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]])
+        )
+        print(f"{name:<28} {built * 1000:>9.1f} {elapsed * 1000:>13.1f} {matched / total_entries:>27.1%}")
+
+    start = time.perf_counter()
+    matcher = PhraseMatcher(vocabulary)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    matrix = matcher.transform(texts)
+    elapsed = time.perf_counter() - start
+    matched = sum(
+        1 for row, listed in enumerate(entries) for entry in listed
+        if matcher.lookup(entry) in set(matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]])
+    )
+    print(f"{'PhraseMatcher':<28} {built * 1000:>9.1f} {elapsed * 1000:>13.1f} {matched / total_entries:>27.1%}")
+
+
+def label_texts(use_ocr):
+    with open(LABELS_PATH) as f:
+        labels = json.load(f)
+    if not use_ocr:
+        for image, label in labels.items():
+            rng = random.Random(image)
+            yield image, label["ingredients"], [ocr_noise(label["text"], rng) for _ in range(NOISE_TRIALS)]
+        return
+
+    from app.tests.bench_staged_ocr import load_label
+    for image, label in labels.items():
+        results, _ = ocr.run_staged_ocr(load_label(os.path.join(TESTS_DIR, image)))
+        yield image, label["ingredients"], [ocr.ocr_text(results)]
+
+
+def bench_labels(use_ocr):
+    known = get_known_ingredients()
+    matcher = get_phrase_matcher(known)
+    source = "EasyOCR" if use_ocr else f"transcription + OCR noise, {NOISE_TRIALS} trials"
+    print(f"\nsample labels ({source})")
+    print(f"{'image':<18} {'n':>3} {'legacy recall':>14} {'precision':>10} {'ms':>7}"
+          f" {'phrase recall':>14} {'precision':>10} {'ms':>7}")
+
+    totals = {"legacy": [0.0, 0.0, 0.0], "phrase": [0.0, 0.0, 0.0]}
+    labels = 0
+    for image, expected, texts in label_texts(use_ocr):
+        row = {}
+        for name, extract in (("legacy", legacy_extract), ("phrase", ocr.extract_ingredients)):
+            recall = precision = elapsed = 0.0
+            for text in texts:
+                start = time.perf_counter()
+                found = extract(text, known)
+                elapsed += time.perf_counter() - start
+                r, p = score(found, expected, matcher)
+                recall += r
+                precision += p
+            row[name] = (recall / len(texts), precision / len(texts), elapsed / len(texts) * 1000)
+            for i, value in enumerate(row[name]):
+                totals[name][i] += value
+        labels += 1
+        print(f"{image:<18} {len(expected):>3} {row['legacy'][0]:>14.1%} {row['legacy'][1]:>10.1%} "
+              f"{row['legacy'][2]:>7.2f} {row['phrase'][0]:>14.1%} {row['phrase'][1]:>10.1%} {row['phrase'][2]:>7.2f}")
+
+    legacy, phrase = ([value / labels for value in totals[name]] for name in ("legacy", "phrase"))
+    print(f"{'mean':<18} {'':>3} {legacy[0]:>14.1%} {legacy[1]:>10.1%} {legacy[2]:>7.2f} "
+          f"{phrase[0]:>14.1%} {phrase[1]:>10.1%} {phrase[2]:>7.2f}")
+
+
+def main(use_ocr=False):
+    bench_catalog()
+    bench_labels(use_ocr)
+
+
+if __name__ == "__main__":
+    main(use_ocr="--ocr" in sys.argv[1:])
@@ -0,0 +1,100 @@
+#bench_recommend_index.py
+"""
+Benchmarks InvertedIndex.top_k against the scikit-learn path
+(cosine_similarity over every product, then a full sort) on synthetic
+catalogs whose ingredient frequencies and list lengths follow the bundled
+product catalog.
+
+    python app/tests/bench_recommend_index.py [sizes...]
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.inverted_index import InvertedIndex
+from app.recommend import get_recommender
+
+SIZES = (10_000, 100_000, 1_000_000)
+QUERIES = 50
+TOP_K = 10
+
+
+def synthetic_catalog(num_products, seed=0):
+    rng = np.random.default_rng(seed)
+    catalog = get_recommender().matrix
+    term_freq = np.asarray(catalog.sum(axis=0)).ravel() + 0.05
+    term_p = term_freq / term_freq.sum()
+    lengths = rng.choice(np.maximum(np.diff(catalog.indptr), 1), size=num_products)
+
+    rows = np.repeat(np.arange(num_products), lengths)
+    cols = rng.choice(len(term_p), size=len(rows), p=term_p)
+    matrix = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(num_products, len(term_p)))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1.0
+    return matrix
+
+
+def synthetic_queries(matrix, count=QUERIES, seed=1):
+    rng = np.random.default_rng(seed)
+    queries = []
+    for row in rng.integers(0, matrix.shape[0], size=count):
+        terms = matrix.indices[matrix.indptr[row]:matrix.indptr[row + 1]]
+        keep = rng.random(len(terms)) < 0.8
+        noise = rng.integers(0, matrix.shape[1], size=2)
+        queries.append(np.unique(np.concatenate([terms[keep], noise])))
+    return queries
+
+
+def exact_top_k(matrix, terms, k):
+    query = np.zeros(matrix.shape[1])
+    query[terms] = 1
+    overlap = matrix @ query
+    lengths = np.diff(matrix.indptr)
+    keys = np.where(lengths > 0, overlap ** 2 / np.maximum(lengths, 1), 0.0)
+    return np.lexsort((np.arange(len(keys)), -keys))[:k]
+
+
+def main(sizes=SIZES):
+    for num_products in sizes:
+        matrix = synthetic_catalog(num_products)
+        queries = synthetic_queries(matrix)
+        print(f"\n{num_products:,} products, {matrix.nnz:,} ingredient entries, {len(queries)} queries, k={TOP_K}")
+
+        start = time.perf_counter()
+        index = InvertedIndex(matrix)
+        print(f"index build: {time.perf_counter() - start:.2f} s")
+
+        query_vectors = []
+        for terms in queries:
+            vector = sp.csr_matrix((np.ones(len(terms)), (np.zeros(len(terms), dtype=int), terms)),
+                                   shape=(1, matrix.shape[1]))
+            query_vectors.append(vector)
+
+        start = time.perf_counter()
+        for vector in query_vectors:
+            sims = cosine_similarity(vector, matrix).ravel()
+            np.argsort(-sims, kind="stable")[:TOP_K]
+        sklearn_s = (time.perf_counter() - start) / len(queries)
+
+        start = time.perf_counter()
+        results = [index.top_k(terms, TOP_K)[0] for terms in queries]
+        index_s = (time.perf_counter() - start) / len(queries)
+
+        mismatches = sum(
+            rows.tolist() != exact_top_k(matrix, terms, TOP_K).tolist()
+            for rows, terms in zip(results, queries)
+        )
+        print(f"sklearn cosine + sort: {sklearn_s * 1000:8.2f} ms/query")
+        print(f"inverted index:        {index_s * 1000:8.2f} ms/query")
+        print(f"speedup: {sklearn_s / index_s:.1f}x, mismatches vs exact ranking: {mismatches}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,88 @@
+#bench_roi_ocr.py
+"""
+Compares two-phase region-of-interest OCR (downscaled pass to find the
+ingredient header, full-resolution recognition of the block below it) with
+reading the whole label, on the sample labels in sample_labels.json and on
+a busy composite made of several labels. Reports OCR time and ingredient
+recall against the hand transcriptions.
+
+    python app/tests/bench_roi_ocr.py
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import json
+import time
+
+import cv2
+import numpy as np
+
+from app.ocr import extract_ingredients, ocr_text, preprocess_image_for_ocr, run_staged_ocr
+from app.ocr_readers import get_reader, DEFAULT_LANGUAGES
+from app.parse_utils import get_known_ingredients
+from app.phrase_matcher import get_phrase_matcher
+from app.tests.bench_phrase_matcher import LABELS_PATH, score
+from app.tests.bench_staged_ocr import load_label
+
+TESTS_DIR = os.path.dirname(__file__)
+
+
+def busy_composite(main_image, others):
+    """
+    The label in the lower left of a 2x2 grid, the other cells filled with
+    unrelated packaging text.
+    """
+    cells = [cv2.imread(os.path.join(TESTS_DIR, name)) for name in others[:3]] + [main_image]
+    height = max(cell.shape[0] for cell in cells)
+    width = max(cell.shape[1] for cell in cells)
+    padded = [cv2.copyMakeBorder(cell, 0, height - cell.shape[0], 0, width - cell.shape[1],
+                                 cv2.BORDER_CONSTANT, value=(255, 255, 255)) for cell in cells]
+    return np.vstack([np.hstack(padded[:2]), np.hstack([padded[3], padded[2]])])
+
+
+def cases():
+    with open(LABELS_PATH) as f:
+        labels = json.load(f)
+    for image, label in labels.items():
+        yield image, load_label(os.path.join(TESTS_DIR, image)), label["ingredients"]
+
+    label = labels["ingredients1.jpg"]
+    composite = busy_composite(cv2.imread(os.path.join(TESTS_DIR, "ingredients1.jpg")),
+                               ["korean.jpg", "ingredients4.jpg", "low_contrast.jpg"])
+    processed = preprocess_image_for_ocr(composite)
+    yield "busy composite", cv2.cvtColor(processed, cv2.COLOR_GRAY2RGB), label["ingredients"]
+
+
+def main():
+    known = get_known_ingredients()
+    matcher = get_phrase_matcher(known)
+    get_reader(DEFAULT_LANGUAGES)
+
+    print(f"{'image':<18} {'whole s':>8} {'recall':>7} {'roi s':>7} {'recall':>7} {'boxes':>9}")
+    totals = {False: [0.0, 0.0], True: [0.0, 0.0]}
+    count = 0
+    for name, image_rgb, expected in cases():
+        row = {}
+        for roi in (False, True):
+            start = time.perf_counter()
+            results, info = run_staged_ocr(image_rgb, mode="full", roi=roi)
+            elapsed = time.perf_counter() - start
+            found = extract_ingredients(ocr_text(results), known_ingredients=known)
+            recall, _ = score(found, expected, matcher)
+            row[roi] = (elapsed, recall, info.get("roi"))
+            totals[roi][0] += elapsed
+            totals[roi][1] += recall
+        count += 1
+        roi_info = row[True][2] or {}
+        boxes = f"{roi_info.get('boxes')}/{roi_info.get('located_boxes')}" if roi_info.get("header_found") else "no header"
+        print(f"{name:<18} {row[False][0]:>8.2f} {row[False][1]:>7.1%} {row[True][0]:>7.2f} {row[True][1]:>7.1%} {boxes:>9}")
+
+    print(f"{'total':<18} {totals[False][0]:>8.2f} {totals[False][1] / count:>7.1%} "
+          f"{totals[True][0]:>7.2f} {totals[True][1] / count:>7.1%}")
+    print(f"speedup: {totals[False][0] / totals[True][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
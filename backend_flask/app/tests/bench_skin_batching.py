@@ -0,0 +1,88 @@
+#bench_skin_batching.py
+"""
+Throughput/latency of skin-type inference with and without micro-batching
+at several concurrency levels.
+
+    python app/tests/bench_skin_batching.py
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import statistics
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import app.model as skin_model
+from app.batching import MicroBatcher
+
+SAMPLE_IMAGE = os.path.join(os.path.dirname(__file__), "..", "..", "oily.jpg")
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16]
+REQUESTS_PER_WORKER = 8
+
+
+def ensure_model():
+    if skin_model.model_base is not None:
+        return
+    print("[INFO] Trained weights unavailable, benchmarking a randomly initialised model.")
+    skin_model.model_base = skin_model.build_architecture().eval()
+    skin_model.inference_model = skin_model.build_inference_model(skin_model.model_base)
+
+
+def run(concurrency, predict):
+    image_bgr = cv2.imread(SAMPLE_IMAGE)
+    if image_bgr is None:
+        image_bgr = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+    tensor = skin_model.preprocess_skin_image(image_bgr)
+
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(REQUESTS_PER_WORKER):
+            start = time.perf_counter()
+            predict(tensor)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / wall,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+def main(max_batch_size=skin_model.BATCH_MAX_SIZE, window_ms=skin_model.BATCH_WINDOW_MS):
+    ensure_model()
+    unbatched = lambda tensor: skin_model.predict_batch([tensor])[0]
+    batcher = MicroBatcher(skin_model.predict_batch, max_batch_size=max_batch_size, max_wait_ms=window_ms)
+
+    # Warm-up so the first measurement does not include allocator setup.
+    unbatched(skin_model.preprocess_skin_image(np.zeros((224, 224, 3), dtype=np.uint8)))
+
+    print(f"max_batch_size={max_batch_size}, window={window_ms} ms")
+    print(f"{'conc':>4} | {'unbatched req/s':>15} {'p50 ms':>8} {'p95 ms':>8} | {'batched req/s':>13} {'p50 ms':>8} {'p95 ms':>8}")
+    for concurrency in CONCURRENCY_LEVELS:
+        a = run(concurrency, unbatched)
+        b = run(concurrency, batcher)
+        print(f"{concurrency:>4} | {a['throughput']:>15.1f} {a['p50_ms']:>8.1f} {a['p95_ms']:>8.1f} | "
+              f"{b['throughput']:>13.1f} {b['p50_ms']:>8.1f} {b['p95_ms']:>8.1f}")
+    print("batch sizes:", batcher.stats())
+
+
+if __name__ == "__main__":
+    main()
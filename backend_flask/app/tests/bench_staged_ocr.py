@@ -0,0 +1,61 @@
+#bench_staged_ocr.py
+"""
+Compares staged OCR (English first, multilingual on demand) with the full
+five-language recognizer on the sample labels in app/tests.
+
+    python app/tests/bench_staged_ocr.py
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import glob
+import time
+
+import cv2
+
+from app.ocr import preprocess_image_for_ocr, run_staged_ocr, ocr_text, extract_ingredients, FAST_OCR_LANGUAGES
+from app.ocr_readers import get_reader, DEFAULT_LANGUAGES, reader_stats
+from app.parse_utils import my_known_ingredients
+
+TESTS_DIR = os.path.dirname(__file__)
+
+
+def load_label(path):
+    image_bgr = cv2.imread(path)
+    if image_bgr.shape[0] < 500 or image_bgr.shape[1] < 500:
+        image_bgr = cv2.resize(image_bgr, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    processed = preprocess_image_for_ocr(image_bgr)
+    return cv2.cvtColor(processed, cv2.COLOR_GRAY2RGB)
+
+
+def main():
+    # Build both readers up front so load time is not billed to the first image.
+    get_reader(FAST_OCR_LANGUAGES)
+    get_reader(DEFAULT_LANGUAGES)
+    for stats in reader_stats():
+        print(stats)
+
+    totals = {"full": 0.0, "staged": 0.0}
+    print(f"{'image':<20} {'full s':>8} {'staged s':>9} {'escalated':>10} {'ingr full':>10} {'ingr staged':>12}")
+    for path in sorted(glob.glob(os.path.join(TESTS_DIR, "*.jpg"))):
+        image_rgb = load_label(path)
+        row = {}
+        for mode in ("full", "staged"):
+            start = time.perf_counter()
+            results, info = run_staged_ocr(image_rgb, mode=mode)
+            elapsed = time.perf_counter() - start
+            totals[mode] += elapsed
+            ingredients = extract_ingredients(ocr_text(results), known_ingredients=my_known_ingredients)
+            row[mode] = (elapsed, info, len(ingredients))
+
+        print(f"{os.path.basename(path):<20} {row['full'][0]:>8.2f} {row['staged'][0]:>9.2f} "
+              f"{str(row['staged'][1]['escalated']):>10} {row['full'][2]:>10} {row['staged'][2]:>12}")
+
+    saved = totals["full"] - totals["staged"]
+    print(f"total full {totals['full']:.2f}s, staged {totals['staged']:.2f}s, saved {saved:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
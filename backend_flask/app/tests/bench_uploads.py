@@ -0,0 +1,50 @@
+#bench_uploads.py
+"""
+Decode time and decoded buffer size of a phone-sized label photo, decoded
+in full versus at the reduced scale decode_image picks for the OCR
+pipeline (OCR_MAX_SIDE) and for skin classification (2 * IMG_SIZE).
+
+    python app/tests/bench_uploads.py
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import time
+
+import cv2
+import numpy as np
+
+from app.ocr_resolution import OCR_MAX_SIDE
+from app.uploads import decode_image, image_size, reduced_decode_factor
+
+TESTS_DIR = os.path.dirname(__file__)
+SKIN_MIN_SIDE = 2 * 224
+RUNS = 10
+
+
+def timed(fn):
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        image = fn()
+    return (time.perf_counter() - start) / RUNS, image
+
+
+def main():
+    label = cv2.imread(os.path.join(TESTS_DIR, "ingredients.jpg"))
+    for target in (4000, 6000, 8000):
+        photo = cv2.resize(label, (target, target * 3 // 4), interpolation=cv2.INTER_LINEAR)
+        data = cv2.imencode(".jpg", photo, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+        size = image_size(data)
+
+        full_s, full = timed(lambda: cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
+        print(f"{size[0]}x{size[1]} ({len(data) / 1e6:.1f} MB): full {full_s * 1000:.0f} ms, {full.nbytes / 1e6:.0f} MB")
+        for name, kwargs in (("ocr", {"max_side": OCR_MAX_SIDE}), ("skin", {"min_side": SKIN_MIN_SIDE})):
+            elapsed, image = timed(lambda: decode_image(data, **kwargs))
+            print(f"  {name:<5} 1/{reduced_decode_factor(size, **kwargs)}: {elapsed * 1000:.0f} ms, "
+                  f"{image.nbytes / 1e6:.0f} MB ({full_s / elapsed:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#check_skin_backends.py
+"""
+Parity, latency and memory comparison of the skin-type inference backends
+against the fp32 eager model.
+
+    python app/tests/check_skin_backends.py [holdout images...]
+
+Labels from every backend must match the fp32 labels on the held-out images
+(by default the labelled sample photos). int8_static is calibrated on
+SKIN_CALIBRATION_IMAGES (by default backend_flask/calibration/); its parity
+is not reported if the two sets overlap.
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import time
+
+import cv2
+import torch
+
+import app.model as skin_model
+from app.model_backends import BACKENDS, build_backend
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return float("nan")
+
+
+def load_holdout(paths):
+    names, tensors = [], []
+    for path in paths:
+        image_bgr = cv2.imread(path)
+        if image_bgr is None:
+            print(f"[WARN] Skipping unreadable image: {path}")
+            continue
+        names.append(os.path.basename(path))
+        tensors.append(skin_model.preprocess_skin_image(image_bgr))
+    return names, torch.stack(tensors)
+
+
+def time_backend(backend, batch, repeats=10):
+    backend(batch[:1])
+    timings = {}
+    for size in (1, len(batch)):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            backend(batch[:size])
+        timings[size] = (time.perf_counter() - start) / repeats * 1000
+    return timings
+
+
+def main(holdout_paths):
+    model = skin_model.model_base
+    if model is None:
+        print("[WARN] Trained weights unavailable, comparing on a randomly initialised model.")
+        model = skin_model.build_architecture().eval()
+
+    overlap = {os.path.realpath(p) for p in skin_model.CALIBRATION_IMAGES} & \
+        {os.path.realpath(p) for p in holdout_paths}
+    if overlap:
+        print(f"[WARN] Calibration and held-out images overlap ({', '.join(sorted(map(os.path.basename, overlap)))}); "
+              "int8_static parity is not reported. Set SKIN_CALIBRATION_IMAGES to other images.")
+
+    names, batch = load_holdout(holdout_paths)
+    calibration = skin_model.load_calibration_batches()
+
+    with torch.inference_mode():
+        reference_logits = model(batch)
+    reference = reference_logits.argmax(1).tolist()
+    print("fp32 labels:", {n: skin_model.IDX_TO_LABEL[i] for n, i in zip(names, reference)})
+
+    print(f"{'backend':<13} {'match':>6} {'max |dlogit|':>13} {'1 img ms':>9} {f'{len(names)} img ms':>9} "
+          f"{'size MB':>8} {'RSS +MB':>8} {'build s':>8}")
+    for name in BACKENDS:
+        rss_before = rss_mb()
+        try:
+            backend = build_backend(model, name, calibration_batches=calibration, img_size=skin_model.IMG_SIZE)
+        except Exception as e:
+            print(f"{name:<13} unavailable: {e}")
+            continue
+        rss_delta = rss_mb() - rss_before
+
+        logits = backend(batch).float()
+        labels = logits.argmax(1).tolist()
+        matches = sum(a == b for a, b in zip(labels, reference))
+        max_diff = (logits - reference_logits).abs().max().item()
+        timings = time_backend(backend, batch)
+        info = backend.describe()
+
+        if name == "int8_static" and overlap:
+            # Validated on its own calibration data: says nothing.
+            match, diff = "n/a", "n/a"
+        else:
+            match, diff = f"{matches}/{len(names)}", f"{max_diff:.4f}"
+        print(f"{name:<13} {match:>6} {diff:>13} {timings[1]:>9.1f} "
+              f"{timings[len(names)]:>9.1f} {info['size_mb']:>8} {rss_delta:>8.1f} {info['build_seconds']:>8}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or skin_model.SAMPLE_IMAGES)
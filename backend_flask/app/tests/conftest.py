@@ -0,0 +1,119 @@
+#conftest.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import openai
+import pytest
+
+from app import ingredient_info, llm_cache, pipeline, translation_utils
+from app.result_cache import ResultCache
+
+TEST_IMAGE = os.path.join(os.path.dirname(__file__), "ingredients.jpg")
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    """
+    Answers /v1/chat/completions like the OpenAI API. The reply content is
+    server.answer(prompt) for the last message of each request.
+    """
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        self.server.prompts.append(prompt)
+
+        answer = json.dumps({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.server.answer(prompt)},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20}
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(answer)))
+        self.end_headers()
+        self.wfile.write(answer)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def llm_cache_path(tmp_path, monkeypatch):
+    """
+    Points the LLM caches at a file under tmp_path, so no test opens or
+    creates backend_flask/cache/llm_cache.sqlite. The caches are reopened
+    lazily there on first use.
+    """
+    path = tmp_path / "llm_cache.sqlite"
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_PATH", str(path))
+    monkeypatch.setattr(ingredient_info, "_cache", None)
+    monkeypatch.setattr(translation_utils, "_translation_cache", None)
+    return path
+
+
+@pytest.fixture
+def openai_server(monkeypatch):
+    """
+    Local stand-in for the OpenAI API. Set .answer to a function of the
+    prompt; .prompts records every prompt received.
+    """
+    server = HTTPServer(("127.0.0.1", 0), StubOpenAIHandler)
+    server.prompts = []
+    server.answer = lambda prompt: ""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.setattr(openai, "api_base", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setattr(openai, "api_key", "test-key")
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def label_path():
+    """
+    Path of the ingredient label photo the pipeline tests share.
+    """
+    return TEST_IMAGE
+
+
+@pytest.fixture
+def label_bytes():
+    with open(TEST_IMAGE, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def offline_pipeline(monkeypatch):
+    """
+    analyze_label with canned OCR results and ingredient descriptions (which
+    take 0.3 s, like a quick GPT call) and the result cache turned off.
+    """
+    monkeypatch.setattr(pipeline, "result_cache", ResultCache(max_entries=0))
+    ocr_results = [
+        ([[0, 0], [200, 0], [200, 40], [0, 40]], "Ingredients: Aqua, Glycerin, Niacinamide, Parfum, Alcohol", 0.95),
+        ([[0, 50], [200, 50], [200, 90], [0, 90]], "Directions: apply daily.", 0.9),
+    ]
+    info = {"mode": "staged", "escalated": False, "language": "en", "timings": {"ocr_fast": 0.1}}
+    monkeypatch.setattr(pipeline, "run_staged_ocr", lambda image: (ocr_results, info))
+
+    def fake_descriptions(ingredients):
+        time.sleep(0.3)
+        return {
+            "ingredients": [{"name": i.title(), "description": f"{i} description.", "safety": "Generally safe."}
+                            for i in ingredients],
+            "summary": "Safe."
+        }
+    monkeypatch.setattr(pipeline, "get_ingredient_descriptions", fake_descriptions)
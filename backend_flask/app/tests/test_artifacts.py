@@ -0,0 +1,139 @@
+#test_artifacts.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import json
+import time
+
+import numpy as np
+
+from app import artifacts
+from app.artifacts import ArtifactStore, RequestArtifacts
+
+IMAGE = np.full((32, 32, 3), 128, np.uint8)
+
+
+def files_under(root):
+    return sorted(os.path.relpath(os.path.join(dirpath, name), root)
+                  for dirpath, _, names in os.walk(root) for name in names)
+
+
+def make_request(store, request_id, image=IMAGE, summary=None):
+    request = RequestArtifacts(request_id, enabled=True, store=store)
+    request.add_image("preprocessed", image)
+    request.add_json("summary", summary or {"request": request_id})
+    return request.persist()
+
+
+def age(store, rel_path, seconds):
+    path = os.path.join(store.root, rel_path)
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_default_mode_keeps_artifacts_in_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "SAVE_ARTIFACTS", False)
+    request = RequestArtifacts(store=ArtifactStore(str(tmp_path)))
+    request.add_image("preprocessed", IMAGE)
+    request.add_json("summary", {"ok": True})
+
+    assert not request.enabled
+    assert request.images["preprocessed"] is IMAGE
+    assert request.data["summary"] == {"ok": True}
+    assert request.persist() is None
+    assert request.paths == {}
+    assert files_under(tmp_path) == []
+
+
+def test_save_artifacts_mode_writes_blobs_and_manifest(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "SAVE_ARTIFACTS", True)
+    request = RequestArtifacts("req1", store=ArtifactStore(str(tmp_path)))
+    request.add_image("preprocessed", IMAGE)
+    request.add_json("summary", {"ok": True})
+
+    paths = request.persist()
+
+    assert request.enabled
+    assert set(paths) == {"preprocessed", "summary"}
+    assert paths["preprocessed"].endswith(".jpg") and paths["summary"].endswith(".json")
+    for rel_path in paths.values():
+        assert rel_path.startswith("objects" + os.sep)
+        assert os.path.isfile(tmp_path / rel_path)
+    assert json.loads((tmp_path / paths["summary"]).read_text()) == {"ok": True}
+
+    manifest = json.loads((tmp_path / "requests" / "req1.json").read_text())
+    assert manifest["request_id"] == "req1"
+    assert manifest["artifacts"] == paths
+    assert not [name for name in files_under(tmp_path) if name.endswith(".tmp")]
+
+
+def test_identical_blobs_are_stored_once(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    first = make_request(store, "req1", summary={"same": 1})
+    second = make_request(store, "req2", summary={"same": 1})
+
+    assert first == second
+    assert len([name for name in files_under(tmp_path) if name.startswith("objects")]) == 2
+    assert len(os.listdir(tmp_path / "requests")) == 2
+
+
+def test_prune_evicts_oldest_requests_past_max_requests(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_requests=2, prune_every=1)
+    old = make_request(store, "old", image=np.zeros((32, 32, 3), np.uint8))
+    for rel_path in [os.path.join("requests", "old.json"), *old.values()]:
+        age(store, rel_path, 3600)
+    make_request(store, "mid")
+    age(store, os.path.join("requests", "mid.json"), 60)
+    new = make_request(store, "new")
+
+    assert sorted(os.listdir(tmp_path / "requests")) == ["mid.json", "new.json"]
+    # Blobs only the evicted request used are gone; shared ones stay.
+    assert not os.path.exists(tmp_path / old["preprocessed"])
+    assert not os.path.exists(tmp_path / old["summary"])
+    assert os.path.exists(tmp_path / new["preprocessed"])
+
+
+def test_persist_prunes_once_every_prune_every_requests(tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path), max_requests=1, prune_every=3)
+    runs = []
+    real = store.prune
+    monkeypatch.setattr(store, "prune", lambda: runs.append(1) or real())
+
+    for i in range(7):
+        make_request(store, f"req{i}", summary={"request": i})
+        age(store, os.path.join("requests", f"req{i}.json"), 60 - i)
+
+    assert len(runs) == 2
+    # The last prune ran after req5; req6 has not been pruned yet.
+    assert sorted(os.listdir(tmp_path / "requests")) == ["req5.json", "req6.json"]
+
+
+def test_requests_share_the_default_store():
+    assert RequestArtifacts().store is RequestArtifacts().store is artifacts.default_store
+
+
+def test_prune_evicts_requests_past_retention(tmp_path):
+    store = ArtifactStore(str(tmp_path), retention_seconds=600)
+    stale = make_request(store, "stale", summary={"stale": True})
+    for rel_path in [os.path.join("requests", "stale.json"), *stale.values()]:
+        age(store, rel_path, 3600)
+
+    assert store.prune() == (1, 2)
+    assert files_under(tmp_path) == []
+
+
+def test_prune_keeps_recent_orphans_and_reused_blobs(tmp_path):
+    store = ArtifactStore(str(tmp_path), retention_seconds=600)
+    stale = make_request(store, "stale")
+    for rel_path in [os.path.join("requests", "stale.json"), *stale.values()]:
+        age(store, rel_path, 3600)
+    # Another request reuses the stale blob before its manifest exists.
+    reused = store.put_bytes((tmp_path / stale["summary"]).read_bytes(), "json")
+    fresh_orphan = store.put_bytes(b"in flight", "json")
+
+    assert store.prune() == (1, 1)
+    assert os.path.exists(tmp_path / reused)
+    assert os.path.exists(tmp_path / fresh_orphan)
+    assert not os.path.exists(tmp_path / stale["preprocessed"])
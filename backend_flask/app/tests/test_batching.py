@@ -0,0 +1,133 @@
+#test_batching.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.batching import MicroBatcher
+
+
+class Recorder:
+    def __init__(self, fn=None):
+        self.batches = []
+        self.fn = fn or (lambda items: [item * 2 for item in items])
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        return self.fn(items)
+
+
+def submit_all(batcher, items):
+    futures = [batcher.submit(item) for item in items]
+    return [future.result(timeout=5) for future in futures]
+
+
+def test_each_caller_gets_its_own_result():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=8, max_wait_ms=50)
+    assert submit_all(batcher, range(5)) == [0, 2, 4, 6, 8]
+    assert recorder.batches == [[0, 1, 2, 3, 4]]
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        assert list(pool.map(batcher, range(6))) == [0, 2, 4, 6, 8, 10]
+    assert batcher.stats()["items"] == 11
+
+
+def test_batches_are_capped_at_max_batch_size():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=3, max_wait_ms=50)
+    assert submit_all(batcher, range(8)) == [i * 2 for i in range(8)]
+    assert [len(batch) for batch in recorder.batches] == [3, 3, 2]
+    assert batcher.stats()["batch_sizes"] == {2: 1, 3: 2}
+
+
+def test_wait_window_bounds_the_delay():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=8, max_wait_ms=100)
+    first = batcher.submit(1)
+    time.sleep(0.3)   # past the window: the first batch has already run
+    second = batcher.submit(2)
+    assert (first.result(timeout=5), second.result(timeout=5)) == (2, 4)
+    assert recorder.batches == [[1], [2]]
+
+    # A zero window does not wait for company.
+    lonely = MicroBatcher(Recorder(), max_batch_size=8, max_wait_ms=0)
+    start = time.perf_counter()
+    assert lonely(3) == 6
+    assert time.perf_counter() - start < 1.0
+
+
+def test_errors_reach_every_caller_and_the_worker_survives():
+    def fail(items):
+        if 0 in items:
+            raise ValueError("bad batch")
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(Recorder(fail), max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(item) for item in (0, 1, 2)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+    assert batcher(5) == 10
+
+
+def test_wrong_number_of_results_fails_the_batch():
+    batcher = MicroBatcher(Recorder(lambda items: items[:-1]), max_batch_size=4, max_wait_ms=50)
+    futures = [batcher.submit(item) for item in (1, 2, 3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="2 results for 3 items"):
+            future.result(timeout=5)
+
+
+def test_base_exceptions_do_not_kill_the_worker():
+    calls = []
+
+    def exit_once(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise SystemExit("model crashed")
+        return items
+
+    batcher = MicroBatcher(exit_once, max_batch_size=1, max_wait_ms=0)
+    with pytest.raises(SystemExit):
+        batcher.submit(1).result(timeout=5)
+    assert batcher(2, timeout=5) == 2
+    assert batcher._thread.is_alive()
+
+
+def test_calls_time_out():
+    release = threading.Event()
+    batcher = MicroBatcher(lambda items: release.wait(5) and items, max_wait_ms=0, timeout=0.2)
+    with pytest.raises(TimeoutError):
+        batcher(1)
+    release.set()
+
+
+def test_cancelled_and_timed_out_calls_are_skipped():
+    release = threading.Event()
+    recorder = Recorder(lambda items: release.wait(5) and [item * 2 for item in items])
+    batcher = MicroBatcher(recorder, max_batch_size=8, max_wait_ms=0, timeout=0.2)
+
+    first = batcher.submit(1)
+    while not recorder.batches:
+        time.sleep(0.01)
+    # Queued behind the running batch: one call times out, one is cancelled.
+    with ThreadPoolExecutor(2) as pool:
+        timed_out = pool.submit(batcher, 2)
+        cancelled = batcher.submit(3)
+        waiting = batcher.submit(4)
+        assert cancelled.cancel()
+        with pytest.raises(TimeoutError):
+            timed_out.result(timeout=5)
+    release.set()
+
+    assert first.result(timeout=5) == 2
+    assert waiting.result(timeout=5) == 8
+    assert recorder.batches == [[1], [4]]
+    assert batcher(5, timeout=5) == 10
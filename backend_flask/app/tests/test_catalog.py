@@ -0,0 +1,85 @@
+#test_catalog.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import pytest
+
+from app import recommend
+from app.catalog import CatalogWatcher
+
+NEW_PRODUCT = {
+    "product_name": "Test Bakuchiol Serum 30ml",
+    "product_url": "https://example.com/test-bakuchiol-serum",
+    "product_type": "Serum",
+    "ingredients": "Bakuchiol, Squalane, Tocopherol",
+    "price": "£9.99"
+}
+
+
+@pytest.fixture
+def snapshot():
+    recommender = recommend.Recommender.from_catalog(recommend.load_catalog(), recommend.load_known_ingredients())
+    previous = recommend.set_recommender(recommender)
+    yield recommender
+    recommend.set_recommender(previous)
+
+
+def test_add_and_remove_products_swap_snapshots(snapshot):
+    query = ["bakuchiol", "squalane", "tocopherol"]
+    size = snapshot.index.num_docs
+
+    updated = recommend.add_products([NEW_PRODUCT])
+    assert updated is recommend.get_recommender() and updated is not snapshot
+    assert updated.index.num_docs == size + 1
+    assert recommend.recommend_products(query, "serum", 1)[0]["product_url"] == NEW_PRODUCT["product_url"]
+
+    # A request still holding the old snapshot is unaffected.
+    assert snapshot.index.num_docs == size
+    assert NEW_PRODUCT["product_url"] not in [p["product_url"] for p in snapshot.recommend(query, "serum", 5)]
+
+    _, removed = recommend.remove_products([NEW_PRODUCT["product_url"]])
+    assert removed == 1
+    assert recommend.get_recommender().index.num_docs == size
+    assert recommend.recommend_products(query, "serum", 5) == snapshot.recommend(query, "serum", 5)
+
+
+def test_watcher_reloads_once_a_change_settles(tmp_path):
+    path = tmp_path / "products.csv"
+    path.write_text("v1")
+    reloads = []
+    watcher = CatalogWatcher(interval=0, paths=[str(path)], on_change=lambda: reloads.append(1))
+
+    assert not watcher.check()
+    path.write_text("version 2")
+    assert not watcher.check()
+    assert watcher.check()
+    assert not watcher.check()
+    assert len(reloads) == 1
+
+
+def test_admin_endpoints_require_token(snapshot, monkeypatch):
+    from app import create_app
+    from app import routes
+
+    client = create_app().test_client()
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", None)
+    assert client.post("/admin/catalog/products", json={"products": [NEW_PRODUCT]}).status_code == 404
+
+    monkeypatch.setattr(routes, "ADMIN_TOKEN", "secret")
+    headers = {"Authorization": "Bearer secret"}
+    assert client.post("/admin/catalog/products", json={"products": [NEW_PRODUCT]},
+                       headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.post("/admin/catalog/products", json={"products": [{}]}, headers=headers).status_code == 400
+
+    added = client.post("/admin/catalog/products", json={"products": [NEW_PRODUCT]}, headers=headers)
+    assert added.status_code == 200 and added.json["added"] == 1
+
+    removed = client.delete("/admin/catalog/products", json={"product_urls": [NEW_PRODUCT["product_url"]]},
+                            headers=headers)
+    assert removed.json["removed"] == 1
+
+    reloaded = client.post("/admin/catalog/reload", headers=headers)
+    assert reloaded.status_code == 200
+    assert reloaded.json["recommender"]["products"] == snapshot.index.num_docs
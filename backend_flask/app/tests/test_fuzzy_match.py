@@ -0,0 +1,67 @@
+#test_fuzzy_match.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import random
+from difflib import get_close_matches
+
+from app.fuzzy_match import FuzzyIndex, fuzzy_best_match, get_fuzzy_index
+from app.parse_utils import my_known_ingredients
+
+
+def ocr_noise(word, rng):
+    chars = list(word)
+    for _ in range(rng.randint(0, 3)):
+        if not chars:
+            break
+        pos = rng.randrange(len(chars))
+        op = rng.choice(["drop", "swap", "sub", "dup"])
+        if op == "drop":
+            chars.pop(pos)
+        elif op == "swap" and pos < len(chars) - 1:
+            chars[pos], chars[pos + 1] = chars[pos + 1], chars[pos]
+        elif op == "sub":
+            chars[pos] = rng.choice("abcdeilmnorstu1 -")
+        else:
+            chars.insert(pos, chars[pos])
+    return "".join(chars)
+
+
+def difflib_best(word, words, cutoff):
+    matches = get_close_matches(word, words, n=1, cutoff=cutoff)
+    return matches[0] if matches else None
+
+
+def test_matches_difflib_on_noisy_tokens():
+    rng = random.Random(7)
+    index = FuzzyIndex(my_known_ingredients)
+    sample = rng.sample(my_known_ingredients, 150)
+    queries = [ocr_noise(w.lower(), rng) for w in sample] + ["aqua", "glycerin", "xyz", ""]
+
+    for cutoff in (0.6, 0.75, 0.8):
+        for query in queries:
+            assert index.best_match(query, cutoff) == difflib_best(query, my_known_ingredients, cutoff), query
+
+
+def test_exact_hit_and_tie_break():
+    words = ["abcd", "abce", "abcf", "glycerin"]
+    index = FuzzyIndex(words)
+
+    assert index.best_match("glycerin", 0.9) == "glycerin"
+    # All three score the same, difflib keeps the larger string.
+    assert index.best_match("abcx", 0.7) == difflib_best("abcx", words, 0.7) == "abcf"
+    assert index.best_match("zzzz", 0.7) is None
+    assert index.correct("zzzz", 0.7) == "zzzz"
+
+
+def test_module_helper_reuses_index():
+    words = ["niacinamide", "panthenol"]
+    assert fuzzy_best_match("niacinamid", words, cutoff=0.75) == "niacinamide"
+    assert fuzzy_best_match("niacinamid", [], cutoff=0.75) is None
+    assert get_fuzzy_index(words) is get_fuzzy_index(list(words))
+
+    # Edited in place without changing length: the index is rebuilt.
+    words[1] = "tocopherol"
+    assert fuzzy_best_match("tocopheral", words, cutoff=0.75) == "tocopherol"
@@ -0,0 +1,39 @@
+#test_image_quality.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import glob
+
+import cv2
+import pytest
+
+from app.image_quality import QualityReport, is_blurry, is_too_dark, is_low_contrast, is_skewed
+
+TESTS_DIR = os.path.dirname(__file__)
+IMAGES = sorted(os.path.basename(p) for p in glob.glob(os.path.join(TESTS_DIR, "*.jpg")))
+LEGACY_CHECKS = [("blurry", is_blurry), ("dark", is_too_dark), ("low_contrast", is_low_contrast), ("skewed", is_skewed)]
+
+
+def legacy_issues(image):
+    return [issue for issue, check in LEGACY_CHECKS if check(image)]
+
+
+@pytest.mark.parametrize("scale", [1, 3])
+@pytest.mark.parametrize("name", IMAGES)
+def test_matches_legacy_checks(name, scale):
+    image = cv2.imread(os.path.join(TESTS_DIR, name))
+    if scale != 1:
+        # Phone-sized photos: most are past the 1600 px working size.
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    assert QualityReport(image).analyze(stop_early=False).issues == legacy_issues(image)
+
+
+def test_blur_is_measured_at_native_resolution():
+    image = cv2.imread(os.path.join(TESTS_DIR, "korean.jpg"))
+    image = cv2.resize(image, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
+    report = QualityReport(image)
+    assert report.scale < 1.0
+    assert report.check_blurry() is True
+    assert report.top_issue is None and report.analyze().top_issue == "blurry"
@@ -0,0 +1,75 @@
+#test_ingredient_info.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import json
+import re
+
+import pytest
+
+from app import ingredient_info
+from app.llm_cache import IngredientCache
+
+
+@pytest.fixture
+def stub_openai(openai_server, tmp_path):
+    """
+    Describes every ingredient listed in the prompt; yields the name lists
+    sent, one per request.
+    """
+    requests = []
+
+    def describe(prompt):
+        names = [n.strip() for n in re.search(r"Ingredient list: (.*)", prompt).group(1).split(",")]
+        requests.append(names)
+        return json.dumps({"ingredients": [
+            {
+                "name": name.title(),
+                "description": f"{name} description.",
+                "safety": "May cause irritation." if name == "fragrance" else "Generally safe."
+            }
+            for name in names
+        ]})
+
+    openai_server.answer = describe
+    ingredient_info.set_description_cache(IngredientCache(str(tmp_path / "llm_cache.sqlite")))
+    yield requests
+    ingredient_info.set_description_cache(None)
+
+
+def test_only_unseen_ingredients_are_sent(stub_openai):
+    first = ingredient_info.get_ingredient_descriptions(["glycerin", "fragrance"])
+    assert [i["name"] for i in first["ingredients"]] == ["Glycerin", "Fragrance"]
+    assert "Fragrance" in first["summary"]
+
+    second = ingredient_info.get_ingredient_descriptions(["Glycerin", "niacinamide", "fragrance"])
+    assert [i["name"] for i in second["ingredients"]] == ["Glycerin", "Niacinamide", "Fragrance"]
+    assert stub_openai == [["glycerin", "fragrance"], ["niacinamide"]]
+
+    ingredient_info.get_ingredient_descriptions(["niacinamide", "glycerin"])
+    assert len(stub_openai) == 2
+
+    stats = ingredient_info.description_cache_stats()
+    assert stats["hits"] == 4 and stats["misses"] == 3
+    assert stats["entries"] == 3
+    assert stats["llm"]["calls"] >= 2
+
+
+def test_cache_persists_and_respects_prompt_version(stub_openai, tmp_path):
+    ingredient_info.get_ingredient_descriptions(["glycerin"])
+
+    reopened = IngredientCache(str(tmp_path / "llm_cache.sqlite"))
+    assert "glycerin" in reopened.get_many(["Glycerin "], ingredient_info.DESCRIPTION_PROMPT_VERSION)
+    assert reopened.get_many(["glycerin"], "other-prompt") == {}
+
+
+def test_prewarm_batches_missing_ingredients(stub_openai):
+    ingredient_info.get_ingredient_descriptions(["glycerin"])
+
+    added = ingredient_info.prewarm_description_cache(
+        ["glycerin", "squalane", "panthenol", "allantoin"], batch_size=2
+    )
+    assert added == 3
+    assert stub_openai[1:] == [["squalane", "panthenol"], ["allantoin"]]
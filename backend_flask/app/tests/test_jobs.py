@@ -0,0 +1,200 @@
+#test_jobs.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from app import jobs
+from app.jobs import JobManager, QueueFullError, CallbackError, check_callback_url
+from app.pipeline import AnalysisError
+
+
+def fake_analysis(value, progress=None, release=None):
+    progress("decode")
+    if release is not None:
+        release.wait(5)
+    if value == "bad":
+        raise AnalysisError({"error": "Image quality issue detected."}, 400)
+    progress("ocr")
+    return {"value": value}
+
+
+def test_job_reports_progress_and_result():
+    manager = JobManager(max_workers=1, max_queued=1)
+    job = manager.submit(fake_analysis, "ok", stages=["decode", "ocr"])
+
+    assert job.wait(5)
+    body = manager.get(job.id).to_dict()
+    assert body["state"] == "succeeded"
+    assert body["result"] == {"value": "ok"}
+    assert body["progress"]["completed_stages"] == ["decode", "ocr"]
+    assert body["progress"]["fraction"] == 1.0
+
+
+def test_analysis_error_keeps_payload_and_status():
+    manager = JobManager(max_workers=1, max_queued=1)
+    job = manager.submit(fake_analysis, "bad", stages=["decode", "ocr"])
+
+    assert job.wait(5)
+    assert job.state == "failed"
+    assert job.status_code == 400
+    assert job.error == {"error": "Image quality issue detected."}
+
+
+def test_queue_is_bounded_and_results_expire():
+    manager = JobManager(max_workers=1, max_queued=1, result_ttl=0)
+    release = threading.Event()
+    first = manager.submit(fake_analysis, "a", release=release)
+    manager.submit(fake_analysis, "b", release=release)
+
+    with pytest.raises(QueueFullError):
+        manager.submit(fake_analysis, "c", release=release)
+
+    release.set()
+    assert first.wait(5)
+    manager.expire()
+    assert manager.get(first.id) is None
+
+
+def test_iter_events_replays_and_follows_stages():
+    manager = JobManager(max_workers=1, max_queued=1)
+    release = threading.Event()
+    job = manager.submit(fake_analysis, "ok", release=release)
+
+    events = job.iter_events(keepalive=0.05)
+    assert next(events) == ("decode", None)
+    release.set()
+
+    remaining = [event for event in events if event is not None]
+    assert remaining == [("ocr", None)]
+    assert job.state == "succeeded"
+
+
+@pytest.fixture
+def resolve(monkeypatch):
+    """
+    Maps host names to the addresses socket.getaddrinfo returns for them.
+    """
+    addresses = {}
+
+    def fake_getaddrinfo(host, port, *args, **kwargs):
+        if host not in addresses:
+            raise OSError("unknown host")
+        return [(None, None, None, "", (address, port)) for address in addresses[host]]
+
+    monkeypatch.setattr(jobs.socket, "getaddrinfo", fake_getaddrinfo)
+    return addresses
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent = SimpleNamespace(calls=[], done=threading.Event())
+
+    class FakeResponse:
+        status = 200
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    def fake_open(req, timeout=None):
+        sent.calls.append((req.full_url, threading.current_thread().name))
+        sent.done.set()
+        return FakeResponse()
+
+    monkeypatch.setattr(jobs._callback_opener, "open", fake_open)
+    return sent
+
+
+def test_callbacks_are_off_without_allowed_hosts(resolve, sent):
+    resolve["hooks.example.com"] = ["93.184.216.34"]
+    manager = JobManager(max_workers=1, max_queued=1, callback_hosts=[])
+
+    with pytest.raises(CallbackError, match="disabled"):
+        manager.submit(fake_analysis, "ok", callback_url="https://hooks.example.com/done")
+    assert manager.stats()["pending"] == 0
+    assert sent.calls == []
+
+
+@pytest.mark.parametrize("url", ["ftp://hooks.example.com/done", "https://other.example.com/done", "http:///done"])
+def test_callback_url_must_be_http_on_an_allowed_host(resolve, url):
+    resolve["hooks.example.com"] = ["93.184.216.34"]
+    resolve["other.example.com"] = ["93.184.216.35"]
+    with pytest.raises(CallbackError):
+        check_callback_url(url, ["hooks.example.com"])
+
+
+@pytest.mark.parametrize("address", [
+    "127.0.0.1", "10.1.2.3", "172.16.0.1", "192.168.1.1", "169.254.169.254", "0.0.0.0",
+    "224.0.0.1", "::1", "fe80::1", "fd00::1", "::ffff:127.0.0.1",
+])
+def test_callback_host_resolving_to_internal_address_is_rejected(resolve, address):
+    # One internal address among public ones is enough to reject the host.
+    resolve["hooks.example.com"] = ["93.184.216.34", address]
+    with pytest.raises(CallbackError, match="non-public"):
+        check_callback_url("https://hooks.example.com/done", ["*"])
+
+
+def test_unresolvable_callback_host_is_rejected(resolve):
+    with pytest.raises(CallbackError, match="resolved"):
+        check_callback_url("https://hooks.example.com/done", ["hooks.example.com"])
+
+
+def test_callback_is_sent_off_the_job_worker(resolve, sent):
+    resolve["hooks.example.com"] = ["93.184.216.34"]
+    manager = JobManager(max_workers=1, max_queued=1, callback_hosts=["hooks.example.com"])
+    job = manager.submit(fake_analysis, "ok", callback_url="https://hooks.example.com/done")
+
+    assert job.wait(5)
+    assert sent.done.wait(5)
+    url, thread_name = sent.calls[0]
+    assert url == "https://hooks.example.com/done"
+    assert thread_name.startswith("job-callback")
+
+
+def test_callback_host_is_checked_again_before_sending(resolve, sent):
+    resolve["hooks.example.com"] = ["93.184.216.34"]
+    manager = JobManager(max_workers=1, max_queued=1, callback_hosts=["hooks.example.com"])
+    release = threading.Event()
+    job = manager.submit(fake_analysis, "ok", release=release, callback_url="https://hooks.example.com/done")
+
+    # DNS now points the accepted host at the metadata service.
+    resolve["hooks.example.com"] = ["169.254.169.254"]
+    release.set()
+    assert job.wait(5)
+    manager._callback_executor.shutdown(wait=True)
+    assert sent.calls == []
+
+
+def test_callback_does_not_follow_redirects():
+    class RedirectHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.send_response(307)
+            self.send_header("Location", "http://169.254.169.254/latest/meta-data/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), RedirectHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        req = urllib.request.Request(f"http://127.0.0.1:{server.server_port}/done", data=b"{}", method="POST")
+        with pytest.raises(urllib.error.HTTPError) as e:
+            jobs._callback_opener.open(req, timeout=5)
+        assert e.value.code == 307
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,104 @@
+#test_metrics.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import re
+
+from app import pipeline
+from app.metrics import Registry, histogram_from_counts, STAGE_SECONDS, OCR_STEP_SECONDS
+
+
+def parse(text):
+    """
+    {(name, labels): value} of every sample in a Prometheus text page.
+    """
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = re.fullmatch(r'(\w+)(?:\{(.*)\})? (\S+)', line)
+        assert match, line
+        labels = tuple(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        samples[(match.group(1), labels)] = float(match.group(3))
+    return samples
+
+
+def test_counters_and_histograms_render():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ["route"])
+    latency = registry.histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1.0))
+    requests.inc(route="/a")
+    requests.inc(2, route='/"b"')
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, route="/a")
+    registry.register_collector(lambda: [histogram_from_counts("batch_size", "Batch sizes.", {1: 3, 3: 2}, buckets=(1, 2, 4))])
+
+    text = registry.render()
+    assert "# TYPE beautylens_latency_seconds histogram" in text
+    samples = parse(text)
+    assert samples[("beautylens_requests_total", (("route", "/a"),))] == 1
+    assert samples[("beautylens_requests_total", (("route", '/\\"b\\"'),))] == 2
+    buckets = [samples[("beautylens_latency_seconds_bucket", (("route", "/a"), ("le", le)))]
+               for le in ("0.1", "1", "+Inf")]
+    assert buckets == [1, 3, 4]
+    assert samples[("beautylens_latency_seconds_sum", (("route", "/a"),))] == 4.05
+    assert samples[("beautylens_batch_size_bucket", (("le", "2"),))] == 3
+    assert samples[("beautylens_batch_size_sum", ())] == 9
+
+
+def test_failing_collector_does_not_break_the_page():
+    registry = Registry()
+    registry.counter("ok_total", "Fine.").inc()
+    registry.register_collector(lambda: 1 / 0)
+    assert parse(registry.render()) == {("beautylens_ok_total", ()): 1}
+
+
+def test_analysis_stages_are_exported(offline_pipeline, label_bytes):
+    from app import create_app
+
+    before = {stage: STAGE_SECONDS.count(stage=stage) for stage in pipeline.STAGES}
+    pipeline.analyze_label(label_bytes, "dry")
+    for stage in pipeline.STAGES:
+        assert STAGE_SECONDS.count(stage=stage) == before[stage] + 1
+    assert OCR_STEP_SECONDS.count(step="ocr_fast") >= 1
+
+    response = create_app().test_client().get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    samples = parse(response.get_data(as_text=True))
+    assert samples[("beautylens_stage_seconds_count", (("stage", "descriptions"),))] >= 1
+    for cache in ("results", "descriptions", "translations"):
+        assert ("beautylens_cache_hits_total", (("cache", cache),)) in samples
+    assert ("beautylens_jobs_pending", ()) in samples
+    assert any(name == "beautylens_batch_size_count" for name, _ in samples)
+
+
+def test_scraping_does_not_open_the_llm_caches(llm_cache_path):
+    from app import create_app, ingredient_info, translation_utils
+
+    samples = parse(create_app().test_client().get("/metrics").get_data(as_text=True))
+
+    for cache in ("descriptions", "translations"):
+        assert samples[("beautylens_cache_entries", (("cache", cache),))] == 0
+    assert ingredient_info._cache is None and translation_utils._translation_cache is None
+    assert not llm_cache_path.exists()
+
+    ingredient_info.get_description_cache().put_many({"aqua": {"name": "Aqua"}}, "v1")
+    samples = parse(create_app().test_client().get("/metrics").get_data(as_text=True))
+    assert samples[("beautylens_cache_entries", (("cache", "descriptions"),))] == 1
+    assert llm_cache_path.exists()
+
+
+def test_llm_stats_are_counted_across_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    from app import ingredient_info
+
+    before = ingredient_info.description_cache_stats()["llm"]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: ingredient_info._count_llm(calls=1, ingredients_requested=2), range(4000)))
+    after = ingredient_info.description_cache_stats()["llm"]
+
+    assert after["calls"] - before["calls"] == 4000
+    assert after["ingredients_requested"] - before["ingredients_requested"] == 8000
@@ -0,0 +1,83 @@
+#test_model.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import pytest
+import torch
+
+from app import model as skin_model
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    """
+    A randomly initialised skin-type model and its saved state_dict.
+    """
+    torch.manual_seed(0)
+    source = skin_model.build_architecture("cpu").eval()
+    path = tmp_path / "skin_type_model.pth"
+    torch.save(source.state_dict(), path)
+    return source, path
+
+
+@pytest.fixture
+def torch_loads(monkeypatch):
+    calls = []
+    real = torch.load
+
+    def spy(*args, **kwargs):
+        calls.append(kwargs.get("mmap", False))
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(torch, "load", spy)
+    return calls
+
+
+def test_load_model_matches_the_saved_model(checkpoint, torch_loads, monkeypatch):
+    source, path = checkpoint
+    monkeypatch.setattr(skin_model, "device", "cpu")
+    monkeypatch.setattr(skin_model, "MODEL_LOAD_SECONDS", None)
+
+    loaded = skin_model.load_model(str(path))
+
+    assert torch_loads == [True]
+    assert not loaded.training
+    assert skin_model.MODEL_LOAD_SECONDS is not None and skin_model.MODEL_LOAD_SECONDS > 0
+    batch = torch.randn(2, 3, skin_model.IMG_SIZE, skin_model.IMG_SIZE)
+    with torch.inference_mode():
+        assert torch.equal(loaded(batch), source(batch))
+
+
+def test_legacy_checkpoints_load_without_mmap(checkpoint, torch_loads, monkeypatch):
+    source, path = checkpoint
+    monkeypatch.setattr(skin_model, "device", "cpu")
+    torch.save(source.state_dict(), path, _use_new_zipfile_serialization=False)
+
+    loaded = skin_model.load_model(str(path))
+
+    assert torch_loads == [True, False]
+    for name, tensor in source.state_dict().items():
+        assert torch.equal(loaded.state_dict()[name], tensor)
+
+
+@pytest.mark.parametrize("change", ["missing", "unexpected"])
+def test_mismatched_checkpoint_keys_raise(checkpoint, monkeypatch, change):
+    source, path = checkpoint
+    monkeypatch.setattr(skin_model, "device", "cpu")
+    state_dict = source.state_dict()
+    if change == "missing":
+        del state_dict["fc.1.weight"]
+    else:
+        state_dict["fc.2.weight"] = torch.zeros(3, 3)
+    torch.save(state_dict, path)
+
+    with pytest.raises(RuntimeError, match=f"{change} keys \\[.*fc"):
+        skin_model.load_model(str(path))
+
+
+def test_unreadable_checkpoint_returns_none(tmp_path):
+    path = tmp_path / "skin_type_model.pth"
+    path.write_bytes(b"version https://git-lfs.github.com/spec/v1\n")
+    assert skin_model.load_model(str(path)) is None
@@ -0,0 +1,49 @@
+#test_model_backends.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import cv2
+import pytest
+import torch
+import torch.nn as nn
+
+from app import model as skin_model
+from app import model_backends
+from app.model_backends import build_backend
+
+
+def test_model_size_is_measured_on_demand(monkeypatch):
+    calls = []
+    real = model_backends._serialized_size
+    monkeypatch.setattr(model_backends, "_serialized_size", lambda module: calls.append(module) or real(module))
+
+    model = nn.Sequential(nn.Conv2d(3, 4, 3), nn.Flatten(), nn.LazyLinear(2))
+    model(torch.randn(1, 3, 8, 8))
+    for name in ("eager", "torchscript"):
+        backend = build_backend(model, name, img_size=8)
+        assert "size_mb" not in backend.describe(include_size=False)
+        assert calls == []
+        assert backend.describe()["size_mb"] == 0.0 and backend.size_bytes > 0
+        assert len(calls) == 1
+        calls.clear()
+
+
+def test_default_calibration_images_are_not_the_holdout_images():
+    calibration = {os.path.realpath(p) for p in skin_model.CALIBRATION_IMAGES}
+    assert calibration and all(os.path.isfile(p) for p in calibration)
+    assert not calibration & {os.path.realpath(p) for p in skin_model.SAMPLE_IMAGES}
+
+
+@pytest.mark.parametrize("name", ["torchscript", "int8_dynamic"])
+def test_backends_agree_with_eager_on_the_sample_images(name):
+    torch.manual_seed(0)
+    model = skin_model.build_architecture("cpu").eval()
+    batch = torch.stack([skin_model.preprocess_skin_image(cv2.imread(path)) for path in skin_model.SAMPLE_IMAGES])
+
+    with torch.inference_mode():
+        expected = build_backend(model, "eager", img_size=skin_model.IMG_SIZE)(batch).argmax(1)
+        labels = build_backend(model, name, img_size=skin_model.IMG_SIZE)(batch).argmax(1)
+
+    assert torch.equal(labels, expected)
@@ -0,0 +1,67 @@
+#test_ocr_readers.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import easyocr
+import pytest
+import torch
+
+from app import ocr_readers
+
+
+class FakeReader:
+    built = []
+    lock = threading.Lock()
+
+    def __init__(self, languages, gpu=False):
+        with FakeReader.lock:
+            FakeReader.built.append(tuple(languages))
+        time.sleep(0.05)  # widen the window for racing callers
+        self.languages = languages
+        self.detector = torch.nn.Linear(256, 256)   # 256 KB of float32 weights
+        self.recognizer = None
+
+
+@pytest.fixture
+def fake_easyocr(monkeypatch):
+    FakeReader.built = []
+    monkeypatch.setattr(easyocr, "Reader", FakeReader)
+    monkeypatch.setattr(ocr_readers, "_readers", {})
+    monkeypatch.setattr(ocr_readers, "_reader_stats", {})
+
+
+def test_one_reader_per_language_set_under_concurrency(fake_easyocr):
+    language_sets = [("en",), ("en", "fr"), ("en",), ["en"], ("en", "fr")] * 4
+    with ThreadPoolExecutor(max_workers=len(language_sets)) as pool:
+        readers = list(pool.map(ocr_readers.get_reader, language_sets))
+
+    assert sorted(FakeReader.built) == [("en",), ("en", "fr")]
+    assert all(r is readers[0] for r in readers[0::5] + readers[2::5] + readers[3::5])
+    assert all(r is readers[1] for r in readers[1::5] + readers[4::5])
+    assert readers[0] is not readers[1]
+
+    # gpu is part of the key.
+    assert ocr_readers.get_reader(("en",), gpu=True) is not readers[0]
+    assert len(FakeReader.built) == 3
+
+
+def test_reader_stats(fake_easyocr):
+    assert ocr_readers.reader_stats() == []
+    ocr_readers.get_reader(("en", "de"))
+
+    stats = ocr_readers.reader_stats()
+    assert len(stats) == 1
+    assert stats[0]["languages"] == ["en", "de"]
+    assert stats[0]["gpu"] is False
+    assert stats[0]["load_seconds"] >= 0.05
+    assert stats[0]["weights_mb"] == round((256 * 256 + 256) * 4 / 2**20, 1)
+
+    # Copies: callers cannot alter the recorded stats.
+    stats[0]["languages"].append("xx")
+    assert ocr_readers.reader_stats()[0]["languages"] == ["en", "de"]
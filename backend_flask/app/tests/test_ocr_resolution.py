@@ -0,0 +1,92 @@
+#test_ocr_resolution.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import cv2
+import numpy as np
+
+from app import ocr_resolution, pipeline
+from app.ocr_resolution import estimate_text_height, resolution_ladder, working_scale
+from app.result_cache import ResultCache
+
+TESTS_DIR = os.path.dirname(__file__)
+
+
+def test_text_height_follows_image_scale(label_path):
+    image = cv2.imread(label_path)
+    full = estimate_text_height(image)
+    half = estimate_text_height(cv2.resize(image, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA))
+    assert 30 <= full <= 55
+    assert abs(half - full / 2) <= full * 0.15
+
+    # Blank images have no glyphs to measure.
+    assert estimate_text_height(np.full((400, 400, 3), 255, dtype=np.uint8)) is None
+
+
+def test_working_scale_targets_text_height(monkeypatch):
+    image = np.zeros((1000, 800, 3), dtype=np.uint8)
+    for text_height, expected in [(40, 0.5), (10, 2.0), (200, 0.25), (4, 2.0)]:
+        monkeypatch.setattr(ocr_resolution, "estimate_text_height", lambda _, h=text_height: h)
+        assert working_scale(image, target=20) == (expected, text_height)
+
+    # Large labels are kept within the detector canvas.
+    monkeypatch.setattr(ocr_resolution, "estimate_text_height", lambda _: 10)
+    assert working_scale(np.zeros((2000, 1600, 3), dtype=np.uint8), target=20)[0] == 2560 / 2000
+
+    # Without an estimate, small images are still doubled.
+    monkeypatch.setattr(ocr_resolution, "estimate_text_height", lambda _: None)
+    assert working_scale(np.zeros((300, 800, 3), dtype=np.uint8))[0] == 2.0
+    assert working_scale(image)[0] == 1.0
+
+
+def test_ladder_grows_up_to_the_ceiling(monkeypatch):
+    image = np.zeros((1000, 800, 3), dtype=np.uint8)
+    monkeypatch.setattr(ocr_resolution, "estimate_text_height", lambda _: 40)
+    scales, _ = resolution_ladder(image, target=20)
+    assert scales == [0.5, 0.75, 1.125]
+
+    monkeypatch.setattr(ocr_resolution, "estimate_text_height", lambda _: 12)
+    scales, _ = resolution_ladder(image, target=20)
+    assert scales[0] == 20 / 12 and scales[1:] == [2.0]
+
+
+def test_pipeline_retries_low_confidence_at_a_larger_scale(label_bytes, monkeypatch):
+    monkeypatch.setattr(pipeline, "result_cache", ResultCache(max_entries=0))
+    monkeypatch.setattr(pipeline, "get_ingredient_descriptions",
+                        lambda ingredients: {"ingredients": [], "summary": ""})
+    widths = []
+
+    def fake_ocr(image):
+        widths.append(image.shape[1])
+        confidence = 0.3 if len(widths) == 1 else 0.9
+        return [([[0, 0], [200, 0], [200, 40], [0, 40]], "Ingredients: Aqua, Glycerin", confidence)], \
+            {"mode": "staged", "escalated": False, "language": "en", "timings": {}}
+    monkeypatch.setattr(pipeline, "run_staged_ocr", fake_ocr)
+
+    payload = pipeline.analyze_label(label_bytes, "dry")
+
+    resolution = payload["ocr"]["resolution"]
+    assert len(widths) == 2 and widths[1] > widths[0]
+    assert resolution["scales_tried"][0] < resolution["scale"] == resolution["scales_tried"][1]
+    assert resolution["mean_confidence"] == 0.9
+
+
+def test_jpegs_are_decoded_at_the_working_scale(label_path):
+    label = cv2.imread(label_path)
+    # Text ~100 px tall: a fifth of the photo is enough for OCR, and the
+    # short side stays above the quality gate's 500 px.
+    big = cv2.resize(label, None, fx=2.5, fy=2.5, interpolation=cv2.INTER_CUBIC)
+    image, factor = pipeline._decode_for_ocr(cv2.imencode(".jpg", big)[1].tobytes())
+    assert factor == 2 and image.shape[:2] == (big.shape[0] // 2, big.shape[1] // 2)
+    assert working_scale(image)[0] <= 1.0
+
+    # No text to measure: decoded down to the detector canvas only.
+    blank = np.full((3000, 4000, 3), 255, dtype=np.uint8)
+    image, factor = pipeline._decode_for_ocr(cv2.imencode(".jpg", blank)[1].tobytes())
+    assert factor == 1 and image.shape == blank.shape
+
+    # Other formats are always decoded in full.
+    image, factor = pipeline._decode_for_ocr(cv2.imencode(".png", big)[1].tobytes())
+    assert factor == 1 and image.shape == big.shape
@@ -0,0 +1,73 @@
+#test_ocr_roi.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import numpy as np
+
+from app.ocr import read_ingredient_block, select_ingredient_block
+
+
+def box(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+
+
+# Busy packaging at half scale: marketing copy, the ingredient block and,
+# after a gap, the manufacturer address.
+LOCATED = [
+    (box(10, 10, 300, 30), "Hydrating Cream", 0.9),
+    (box(10, 40, 300, 55), "Apply daily to clean skin.", 0.9),
+    (box(10, 100, 120, 115), "INGREDlENTS: Aqua,", 0.8),
+    (box(125, 100, 300, 115), "Glycerin, Niacinamide,", 0.8),
+    (box(10, 120, 300, 135), "Sodium Hyaluronate, Parfum.", 0.8),
+    (box(10, 220, 300, 235), "Made in France, 75008 Paris", 0.9),
+]
+
+
+class FakeReader:
+    def __init__(self, located):
+        self.located = located
+        self.calls = []
+
+    def readtext(self, image, detail=1):
+        self.calls.append(("readtext", image.shape))
+        return self.located
+
+    def recognize(self, image, horizontal_list=None, free_list=None, detail=1):
+        self.calls.append(("recognize", image.shape, horizontal_list))
+        return [(box(x0, y0, x1, y1), "full resolution", 0.99) for x0, x1, y0, y1 in horizontal_list]
+
+
+def test_select_ingredient_block():
+    assert select_ingredient_block(LOCATED) == [2, 3, 4]
+    assert select_ingredient_block(LOCATED, max_gap=10) == [2, 3, 4, 5]
+    assert select_ingredient_block(LOCATED[:2]) is None
+
+
+def test_recognizes_only_the_block_at_full_resolution():
+    reader = FakeReader(LOCATED)
+    image = np.zeros((600, 800, 3), dtype=np.uint8)
+    results, info = read_ingredient_block(reader, image, max_side=400)
+
+    assert [call[0] for call in reader.calls] == ["readtext", "recognize"]
+    assert reader.calls[0][1] == (300, 400, 3)
+    assert info == {"header_found": True, "boxes": 3, "located_boxes": 6, "scale": 0.5}
+    # Boxes scaled back to the full image, padded by a tenth of their height.
+    assert reader.calls[1][2][0] == [17, 244, 197, 234]
+    assert len(results) == 3
+
+
+def test_falls_back_to_the_whole_label():
+    reader = FakeReader(LOCATED[:2])
+    image = np.zeros((600, 800, 3), dtype=np.uint8)
+    results, info = read_ingredient_block(reader, image, max_side=400)
+    assert [call[0] for call in reader.calls] == ["readtext", "readtext"]
+    assert reader.calls[1][1] == image.shape
+    assert info["header_found"] is False
+
+    # Small labels are located at full resolution, so nothing is read twice.
+    reader = FakeReader(LOCATED)
+    results, _ = read_ingredient_block(reader, image, max_side=1280)
+    assert [call[0] for call in reader.calls] == ["readtext"]
+    assert results == LOCATED[2:5]
@@ -9,7 +9,7 @@ import numpy as np
 from app.ocr import preprocess_image_for_ocr, extract_ingredients  
 from app.parse_utils import my_known_ingredients  
 from app.skincare import analyze_product_for_skin_type 
-import easyocr
+from app.ocr_readers import get_reader
 import openai 
 from app.image_quality import is_blurry, is_too_dark, is_skewed
 from app.translation_utils import detect_language, translate_to_english
@@ -123,7 +123,7 @@ def test_ocr_and_skin_analysis(image_path, skin_type):
     processed_rgb = cv2.cvtColor(processed_image, cv2.COLOR_BGR2RGB)
 
     print("Running OCR...")
-    reader = easyocr.Reader(['en', 'fr', 'it', 'de', 'es'], gpu=False)
+    reader = get_reader()
     ocr_results = reader.readtext(processed_rgb, detail=1)
 
     if ocr_results:
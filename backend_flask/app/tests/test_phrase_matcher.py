@@ -0,0 +1,89 @@
+#test_phrase_matcher.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import random
+
+from app import recommend
+from app.ocr import extract_ingredients
+from app.parse_utils import get_known_ingredients
+from app.phrase_matcher import BOUNDARY_RE, MAX_PHRASE_TOKENS, PhraseMatcher, get_phrase_matcher, normalize
+
+NAMES = ["Sodium Hyaluronate", "Sodium", "Hyaluronic Acid", "Caprylic/Capric Triglyceride", "Glycerin",
+         "Simmondsia Chinensis (Jojoba) Seed Oil", "Seed Oil", "Aqua/Water", "AQUA / WATER", "Ceteareth-20",
+         ")", "1", "33)", "Water & Glycerin"]
+
+
+def naive_extract(matcher, text):
+    """
+    Leftmost-longest lookup of every token n-gram, the result the automaton
+    has to reproduce.
+    """
+    found = []
+    for segment in BOUNDARY_RE.split(text):
+        tokens = normalize(segment)
+        i = 0
+        while i < len(tokens):
+            for n in range(min(MAX_PHRASE_TOKENS, len(tokens) - i), 0, -1):
+                term = matcher.lookup(" ".join(tokens[i:i + n]))
+                if term is not None:
+                    found.append(matcher.vocabulary[term])
+                    i += n
+                    break
+            else:
+                i += 1
+    return found
+
+
+def test_extracts_multi_word_names_leftmost_longest():
+    matcher = PhraseMatcher(NAMES)
+    text = "Aqua / Water, Sodium Hyaluronate, Caprylic/Capric Triglyceride; sodium chloride. Glycerin"
+    assert matcher.extract(text) == ["aqua/water", "sodium hyaluronate", "caprylic/capric triglyceride",
+                                     "sodium", "glycerin"]
+    # Without separators the longest name still wins.
+    assert matcher.extract("SODIUM HYALURONATE GLYCERIN CETEARETH 20") == \
+        ["sodium hyaluronate", "glycerin", "ceteareth-20"]
+
+
+def test_separators_aliases_and_debris():
+    matcher = PhraseMatcher(NAMES)
+    assert matcher.extract("Sodium, Hyaluronate") == ["sodium"]
+    assert matcher.extract("Simmondsia Chinensis Seed Oil") == ["simmondsia chinensis (jojoba) seed oil"]
+    assert matcher.extract("Simmondsia Chinensis (Jojoba) Seed Oil") == ["simmondsia chinensis (jojoba) seed oil"]
+    assert matcher.extract("Glycérin 1, 33)") == ["glycerin"]
+    assert "water & glycerin" not in matcher.vocabulary
+
+    spans = matcher.find("x Sodium Hyaluronate.")
+    assert [(s, e) for s, e, _ in spans] == [(2, 20)]
+
+
+def test_matches_naive_scan_on_catalog():
+    matcher = recommend.get_recommender().vectorizer
+    catalog = recommend.load_catalog()
+    rng = random.Random(0)
+    texts = catalog["ingredients"].dropna().tolist()
+    # OCR often loses the commas.
+    texts += [text.replace(",", " ") for text in rng.sample(texts, 50)]
+    for text in texts:
+        assert matcher.extract(text) == naive_extract(matcher, text)
+
+    matrix = matcher.transform(texts[:20])
+    assert matrix.shape == (20, len(matcher))
+    assert matrix.max() == 1
+
+
+def test_extract_ingredients_without_commas():
+    text = "Directions: rinse. INGREDIENTS: AQUA/WATER GLYCERIN SODIUM HYALURONATE, Xanthn Gum. Made in France"
+    assert extract_ingredients(text, known_ingredients=get_known_ingredients()) == \
+        ["aqua (water)", "glycerin", "sodium hyaluronate", "xanthan gum"]
+
+
+def test_matcher_cache_follows_list_contents():
+    names = ["Glycerin", "Niacinamide"]
+    assert get_phrase_matcher(names) is get_phrase_matcher(list(names))
+
+    # Edited in place without changing length: the matcher is rebuilt.
+    names[1] = "Tocopherol"
+    assert get_phrase_matcher(names).extract("glycerin, tocopherol") == ["glycerin", "tocopherol"]
@@ -0,0 +1,131 @@
+#test_pipeline.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import glob
+import time
+
+import cv2
+import pytest
+
+from app import pipeline
+from app.artifacts import ArtifactStore, RequestArtifacts
+from app.image_quality import is_blurry, is_too_dark, is_low_contrast, is_skewed
+from app.stage_graph import StageGraph
+
+
+def test_stage_graph_runs_dependencies_first():
+    graph = StageGraph()
+    graph.add("a", lambda: 2)
+    graph.add("b", lambda a: a * 3, deps=["a"])
+    graph.add("c", lambda a, b: a + b, deps=["a", "b"])
+
+    finished = []
+    results, timings = graph.run(on_done=lambda name, result: finished.append(name))
+    assert results == {"a": 2, "b": 6, "c": 8}
+    assert finished == ["a", "b", "c"]
+    assert set(timings) == {"a", "b", "c"}
+
+
+def test_stage_graph_overlaps_independent_stages():
+    graph = StageGraph()
+    for name in ("slow", "fast1", "fast2"):
+        graph.add(name, lambda: time.sleep(0.2))
+
+    start = time.perf_counter()
+    graph.run(parallel=True)
+    assert time.perf_counter() - start < 0.5
+
+    start = time.perf_counter()
+    graph.run(parallel=False)
+    assert time.perf_counter() - start >= 0.6
+
+
+def test_stage_graph_reraises_stage_errors():
+    def fail():
+        raise ValueError("boom")
+
+    graph = StageGraph()
+    graph.add("ok", lambda: 1)
+    graph.add("fail", fail)
+    graph.add("after", lambda value: value, deps=["fail"])
+
+    with pytest.raises(ValueError):
+        graph.run()
+
+
+def test_parallel_payload_matches_sequential(offline_pipeline, label_bytes, monkeypatch):
+    payloads = {}
+    events = {}
+    for mode in ("sequential", "parallel"):
+        monkeypatch.setattr(pipeline, "PIPELINE_EXECUTOR", mode)
+        reported = []
+        payloads[mode] = pipeline.analyze_label(label_bytes, "oily", progress=lambda s, d=None: reported.append(s))
+        events[mode] = reported
+
+    sequential, parallel = payloads["sequential"], payloads["parallel"]
+    assert set(sequential["stage_timings"]) == set(pipeline.STAGES)
+    assert set(parallel["stage_timings"]) == set(pipeline.STAGES)
+    del sequential["stage_timings"], parallel["stage_timings"]
+    assert parallel == sequential
+    assert sorted(events["parallel"]) == sorted(pipeline.STAGES)
+
+
+SAMPLE_IMAGES = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "*.jpg")))
+
+
+def legacy_quality_issue(image):
+    # The quality gate before the OCR ladder: small photos doubled, then
+    # the checks in priority order.
+    if image.shape[0] < 500 or image.shape[1] < 500:
+        image = cv2.resize(image, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+    for issue, check in [("blurry", is_blurry), ("dark", is_too_dark),
+                         ("low_contrast", is_low_contrast), ("skewed", is_skewed)]:
+        if check(image):
+            return [issue]
+    return []
+
+
+def quality_issues(image_bytes):
+    reported = {}
+    try:
+        pipeline.analyze_label(image_bytes, "dry",
+                               progress=lambda stage, data=None: reported.setdefault(stage, data))
+    except pipeline.AnalysisError:
+        pass
+    return reported["quality"]["issues"]
+
+
+@pytest.mark.parametrize("scale", [1, 3])
+@pytest.mark.parametrize("path", SAMPLE_IMAGES, ids=os.path.basename)
+def test_quality_gate_ignores_the_ocr_ladder(offline_pipeline, monkeypatch, path, scale):
+    monkeypatch.setattr(pipeline, "get_ingredient_descriptions", lambda ingredients: {"ingredients": [], "summary": ""})
+    image = cv2.imread(path)
+    if scale != 1:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    image_bytes = cv2.imencode(".png", image)[1].tobytes()
+
+    with_ladder = quality_issues(image_bytes)
+    monkeypatch.setattr(pipeline, "resolution_ladder", lambda image: ([1.0], None))
+    assert quality_issues(image_bytes) == with_ladder == legacy_quality_issue(image)
+
+
+@pytest.mark.parametrize("enabled", [False, True])
+def test_classified_image_is_drawn_only_when_kept(offline_pipeline, label_bytes, monkeypatch, tmp_path, enabled):
+    draws = []
+    real = pipeline.visualize_classified_ingredients
+
+    def spy(*args, **kwargs):
+        image, summary = real(*args, **kwargs)
+        draws.append(image is not None)
+        return image, summary
+    monkeypatch.setattr(pipeline, "visualize_classified_ingredients", spy)
+    monkeypatch.setattr(pipeline, "RequestArtifacts",
+                        lambda: RequestArtifacts(enabled=enabled, store=ArtifactStore(str(tmp_path))))
+
+    payload = pipeline.analyze_label(label_bytes, "oily")
+
+    assert draws == [enabled]
+    assert (payload["classified_image_url"] is not None) == enabled
@@ -0,0 +1,181 @@
+#test_recommend.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import random
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app import recommend
+from app.inverted_index import InvertedIndex
+
+catalog = recommend.load_catalog()
+known_ingredients = recommend.load_known_ingredients()
+vectorizer = recommend.build_vectorizer(known_ingredients)
+ingredient_matrix = vectorizer.fit_transform(catalog["cleaned_ingredients"])
+
+
+def legacy_recommend_products(input_ingredients, input_product_type=None, top_n=5):
+    """
+    The original DataFrame implementation, with a stable sort so ties keep
+    catalog order. Similarities are rounded so equal cosines computed with
+    different rounding errors count as ties.
+    """
+    input_cleaned = ", ".join([i.lower() for i in input_ingredients if i])
+    input_vector = vectorizer.transform([input_cleaned])
+    sims = cosine_similarity(input_vector, ingredient_matrix).flatten()
+
+    df_copy = catalog.copy()
+    df_copy["similarity"] = np.round(sims, 12)
+
+    if input_product_type:
+        df_copy = df_copy[df_copy["product_type"].str.lower() == input_product_type.lower()]
+
+    if df_copy.empty:
+        return []
+
+    top_recs = df_copy.sort_values(by="similarity", ascending=False, kind="stable")
+
+    seen = set()
+    deduped = []
+    for _, row in top_recs.iterrows():
+        simplified = recommend.simplify_name(row["product_name"])
+        if simplified not in seen:
+            seen.add(simplified)
+            deduped.append({
+                "product_name": row["product_name"],
+                "product_url": row["product_url"],
+                "product_type": row["product_type"],
+                "price": row["price"]
+            })
+        if len(deduped) == top_n:
+            break
+
+    return deduped
+
+
+def random_queries(count, seed=0):
+    rng = random.Random(seed)
+    cleaned = catalog["cleaned_ingredients"].tolist()
+    for _ in range(count):
+        names = rng.choice(cleaned).split(", ")
+        yield rng.sample(names, min(len(names), rng.randint(1, 15))) + rng.sample(known_ingredients, rng.randint(0, 3))
+
+
+@pytest.mark.parametrize("product_type", [None, "Serum", "moisturiser", "Bath Salts"])
+def test_matches_legacy_recommendations(product_type):
+    for query in random_queries(60):
+        for top_n in (1, 5, 20):
+            assert recommend.recommend_products(query, product_type, top_n) == \
+                legacy_recommend_products(query, product_type, top_n)
+
+
+def test_edge_cases():
+    assert recommend.recommend_products(["glycerin"], "no such type") == []
+    assert recommend.recommend_products([], None, 3) == legacy_recommend_products([], None, 3)
+    assert recommend.recommend_products(["glycerin"], None, 0) == []
+
+
+def test_multi_word_ingredients_are_features():
+    terms = recommend.get_recommender().query_terms(["Sodium Hyaluronate", "Caprylic/Capric Triglyceride"])
+    names = [recommend.get_recommender().vectorizer.vocabulary[t] for t in terms]
+    assert sorted(names) == ["caprylic/capric triglyceride", "sodium hyaluronate"]
+
+
+def test_inverted_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    matrix = sp.random(3000, 400, density=0.03, format="csr", random_state=1, data_rvs=np.ones)
+    index = InvertedIndex(matrix)
+    lengths = np.diff(matrix.indptr)
+    allowed = rng.random(3000) < 0.3
+
+    for _ in range(50):
+        terms = rng.choice(400, size=rng.integers(1, 40), replace=False)
+        query = np.zeros(400)
+        query[terms] = 1
+        overlap = matrix @ query
+        keys = np.where(lengths > 0, overlap ** 2 / np.maximum(lengths, 1), 0.0)
+
+        for k, mask in ((10, None), (50, allowed)):
+            candidates = np.arange(3000) if mask is None else np.flatnonzero(mask)
+            expected = candidates[np.lexsort((candidates, -keys[candidates]))][:k]
+            rows, sims = index.top_k(terms, k, mask)
+            assert rows.tolist() == expected.tolist()
+            assert np.allclose(sims, cosine_similarity(query[None, :], matrix[rows]).ravel())
+
+
+def test_artifact_round_trip_and_checksum(tmp_path):
+    catalog_path = tmp_path / "products.csv"
+    catalog_path.write_bytes(open(recommend.CATALOG_PATH, "rb").read())
+    paths = dict(catalog_path=str(catalog_path), known_ingredients_path=recommend.KNOWN_INGREDIENTS_PATH)
+    artifact_dir = str(tmp_path / "recommender")
+
+    recommend.build_artifact(artifact_dir, **paths)
+    matrix, metadata, vocabulary = recommend.load_artifact(artifact_dir, **paths)
+    for array in (matrix.data, matrix.indices, matrix.indptr):
+        while array is not None and not isinstance(array, np.memmap):
+            array = array.base
+        assert array is not None, "artifact arrays should be memory-mapped"
+    assert (matrix != ingredient_matrix).nnz == 0
+    assert vocabulary == known_ingredients
+
+    from_artifact = recommend.Recommender(matrix, metadata, vocabulary)
+    from_csv = recommend.Recommender.from_catalog(catalog, known_ingredients)
+    for query in random_queries(20, seed=3):
+        assert from_artifact.recommend(query, "Serum") == from_csv.recommend(query, "Serum")
+
+    with open(catalog_path, "a") as f:
+        f.write("New Serum 30ml,https://example.com/new,Serum,Aqua,£1.00\n")
+    with pytest.raises(recommend.ArtifactError):
+        recommend.load_artifact(artifact_dir, **paths)
+
+
+def test_skin_type_filters_and_orders_ties():
+    recommender = recommend.get_recommender()
+    dry = recommend.SKIN_TYPE_RULES.type_ids["dry"]
+    for query in random_queries(30, seed=5):
+        plain = recommender.recommend(query, "Moisturiser", 200)
+        filtered = recommender.recommend(query, "Moisturiser", 10, skin_type="dry")
+        rows = {record["product_url"]: row for row, record in enumerate(recommender.records)}
+        assert all(recommender.skin_scores[rows[p["product_url"]], dry] >= 0 for p in filtered)
+        # Same products as filtering the unfiltered ranking, up to the order of ties.
+        compatible = [p for p in plain if recommender.skin_scores[rows[p["product_url"]], dry] >= 0]
+        assert {p["product_url"] for p in filtered} <= {p["product_url"] for p in compatible}
+
+    assert recommender.recommend(["glycerin"], None, 5, skin_type="unknown") == recommender.recommend(["glycerin"])
+
+
+def brute_force_recommend(recommender, input_ingredients, product_type, top_n, skin_type):
+    """
+    Every allowed product sorted by (-similarity, -compatibility, row),
+    then deduplicated.
+    """
+    column = recommend.SKIN_TYPE_RULES.type_ids[skin_type]
+    query = np.zeros((1, recommender.matrix.shape[1]))
+    query[0, recommender.query_terms(input_ingredients)] = 1
+    sims = np.round(cosine_similarity(query, recommender.matrix).ravel(), 12)
+    compatibility = recommender.skin_scores[:, column]
+    allowed = recommender.type_masks[product_type.lower()] & (compatibility >= 0)
+
+    rows = np.flatnonzero(allowed)
+    rows = rows[np.lexsort((rows, -compatibility[rows], -sims[rows]))]
+    seen, deduped = set(), []
+    for row in rows:
+        if recommender.dedup_keys[row] not in seen:
+            seen.add(recommender.dedup_keys[row])
+            deduped.append(recommender.records[row])
+    return deduped[:top_n]
+
+
+@pytest.mark.parametrize("skin_type", ["dry", "oily"])
+def test_skin_type_order_matches_brute_force(skin_type):
+    recommender = recommend.get_recommender()
+    for query in [*random_queries(40, seed=7), [], ["glycerin"], ["aqua", "glycerin"]]:
+        for top_n in (1, 5, 20):
+            assert recommender.recommend(query, "Moisturiser", top_n, skin_type=skin_type) == \
+                brute_force_recommend(recommender, query, "Moisturiser", top_n, skin_type)
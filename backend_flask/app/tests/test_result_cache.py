@@ -0,0 +1,79 @@
+#test_result_cache.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import time
+
+import cv2
+import pytest
+
+from app import pipeline
+from app.result_cache import ResultCache, dhash, hamming
+
+LABELS = [os.path.join(os.path.dirname(__file__), name) for name in ("ingredients.jpg", "ingredients1.jpg")]
+
+
+def test_dhash_tolerates_recompression_and_scaling():
+    image = cv2.imread(LABELS[0])
+    other = cv2.imread(LABELS[1])
+    recompressed = cv2.imdecode(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 50])[1], cv2.IMREAD_COLOR)
+    smaller = cv2.resize(image, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+
+    cache = ResultCache()
+    assert hamming(dhash(image), dhash(recompressed)) <= cache.max_distance
+    assert hamming(dhash(image), dhash(smaller)) <= cache.max_distance
+    assert hamming(dhash(image), dhash(other)) > cache.max_distance
+
+
+def test_lookup_respects_skin_type_ttl_and_size():
+    cache = ResultCache(max_entries=2, ttl=60, max_distance=2)
+    payload = {"parsed_ingredients": ["Aqua", "Glycerin"], "analysis_summary": "x"}
+    cache.put(0b1111, "dry", payload, descriptions={"ingredient_info": {}})
+
+    assert cache.get(0b1110, "dry")[:2] == (payload, 1)
+    assert cache.get(0b1000, "dry") is None
+    assert cache.get(0b1111, "oily") is None
+    assert cache.get_descriptions(["glycerin", "aqua "]) == {"ingredient_info": {}}
+
+    cache.put(0b0, "dry", payload)
+    cache.put(0b1 << 40, "dry", payload)
+    assert cache.stats()["entries"] == 2
+    assert cache.get(0b1111, "dry") is None
+
+    cache.ttl = 0
+    time.sleep(0.01)
+    assert cache.get(0b0, "dry") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_repeat_scans_skip_the_pipeline(offline_pipeline, label_path, label_bytes, monkeypatch):
+    monkeypatch.setattr(pipeline, "result_cache", ResultCache())
+    gpt_calls = []
+    describe = pipeline.get_ingredient_descriptions
+    monkeypatch.setattr(pipeline, "get_ingredient_descriptions",
+                        lambda ingredients: gpt_calls.append(1) or describe(ingredients))
+
+    first = pipeline.analyze_label(label_bytes, "oily")
+    assert first["cache"] == {"hit": False}
+
+    rescan = cv2.imencode(".jpg", cv2.imread(label_path), [cv2.IMWRITE_JPEG_QUALITY, 70])[1].tobytes()
+    events = []
+
+    def not_called(*args):
+        raise AssertionError("a cache hit must not run OCR or GPT")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(pipeline, "run_staged_ocr", not_called)
+        patched.setattr(pipeline, "get_ingredient_descriptions", not_called)
+        second = pipeline.analyze_label(rescan, "oily", progress=lambda stage, data=None: events.append(stage))
+    assert second["cache"]["hit"] and events == pipeline.STAGES
+    for key in ("parsed_ingredients", "ingredient_info", "recommendations", "analysis_summary"):
+        assert second[key] == first[key]
+
+    # Another skin type runs the pipeline again but reuses the descriptions.
+    third = pipeline.analyze_label(label_bytes, "dry")
+    assert third["cache"] == {"hit": False}
+    assert third["ingredient_info"] == first["ingredient_info"]
+    assert len(gpt_calls) == 1
@@ -0,0 +1,120 @@
+#test_safety_lookup.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import difflib
+import re
+
+import numpy as np
+
+from app.ocr import SafetyLookup, visualize_classified_ingredients
+
+
+def box(y):
+    return [[0, y], [300, y], [300, y + 20], [0, y + 20]]
+
+
+SAFETY = {
+    "aqua": "neutral",
+    "glycerin": "safe",
+    "niacinamide": "safe",
+    "fragrance": "harmful",
+    "phenoxyethanol": "harmful",
+    "sodium hyaluronate": "safe",
+    "cetearyl alcohol": "safe",
+    "Tocopherol": "safe",
+}
+
+SINGLE_WORD_BOXES = [
+    (box(0), "Ingredients: Aqua, Glycerin, Niacinamide,", 0.9),
+    (box(30), "Glycerln, Phenoxyethanoi, FRAGRANCE.", 0.8),   # fuzzy hits
+    (box(60), "Tocopherol, Tocopherl", 0.9),                   # mixed-case key
+    (box(90), "Aqua Glycerin", 0.3),                           # below min_confidence
+    (box(120), "Made in France", 0.9),
+]
+MULTI_WORD_BOXES = [
+    (box(150), "Sodium Hyaluronate, Cetearyl Alcohol, Aqua", 0.9),
+    (box(180), "Hyaluronate, Cetearyl", 0.9),
+]
+
+
+def legacy_labels(ocr_results, ingredient_safety, phrases=False, min_confidence=0.5, fuzzy_cutoff=0.75):
+    """
+    The per-box scan SafetyLookup replaced: every word against every
+    ingredient, then difflib. With phrases, multi-word names are matched
+    first, longest at each position.
+    """
+    known = list(ingredient_safety.keys())
+    multi = {tuple(re.sub(r"[^a-zA-Z0-9\s\-]", "", k).lower().split()): k for k in known} if phrases else {}
+    multi = {p: k for p, k in multi.items() if len(p) > 1}
+    labels = []
+    for _, text, conf in ocr_results:
+        if conf < min_confidence:
+            continue
+        words = re.sub(r"[^a-zA-Z0-9\s\-]", "", text).lower().split()
+        matches = []
+        i = 0
+        while i < len(words):
+            phrase = next((multi[tuple(words[i:j])] for j in range(len(words), i + 1, -1)
+                           if tuple(words[i:j]) in multi), None)
+            if phrase is not None:
+                matches.append((phrase, ingredient_safety[phrase]))
+                i += len(phrase.split())
+                continue
+            word = words[i]
+            for ingr, safety in ingredient_safety.items():
+                if word == ingr.lower():
+                    matches.append((ingr, safety))
+                    break
+            else:
+                close = difflib.get_close_matches(word, known, n=1, cutoff=fuzzy_cutoff)
+                if close:
+                    matches.append((close[0], ingredient_safety[close[0]]))
+            i += 1
+        priority = {"harmful": 0, "neutral": 1, "safe": 2}
+        matches.sort(key=lambda x: priority.get(x[1], 3))
+        labels.extend({"ingredient": ingr, "classification": cls} for ingr, cls in matches)
+    return labels
+
+
+def classify(ocr_results):
+    image = np.zeros((220, 320, 3), dtype=np.uint8)
+    return visualize_classified_ingredients(image, ocr_results, SAFETY)[1]
+
+
+def test_summary_without_drawing_matches_drawn_summary():
+    image = np.zeros((220, 320, 3), dtype=np.uint8)
+    for boxes in (SINGLE_WORD_BOXES, MULTI_WORD_BOXES):
+        annotated, summary = visualize_classified_ingredients(image, boxes, SAFETY, draw=False)
+        assert annotated is None
+        assert summary == classify(boxes)
+
+
+def test_matches_legacy_scan_on_single_words():
+    summary = classify(SINGLE_WORD_BOXES)
+    assert summary == legacy_labels(SINGLE_WORD_BOXES, SAFETY)
+    assert {"ingredient": "phenoxyethanol", "classification": "harmful"} in summary
+    assert summary.count({"ingredient": "Tocopherol", "classification": "safe"}) == 2
+
+
+def test_multi_word_names_match_as_phrases():
+    summary = classify(MULTI_WORD_BOXES)
+    assert summary == legacy_labels(MULTI_WORD_BOXES, SAFETY, phrases=True)
+    # The word-by-word scan only found "sodium hyaluronate" through a fuzzy
+    # hit on "hyaluronate" and never found "cetearyl alcohol".
+    legacy = legacy_labels(MULTI_WORD_BOXES, SAFETY)
+    assert {"ingredient": "cetearyl alcohol", "classification": "safe"} not in legacy
+    assert summary[:3] == [
+        {"ingredient": "aqua", "classification": "neutral"},
+        {"ingredient": "sodium hyaluronate", "classification": "safe"},
+        {"ingredient": "cetearyl alcohol", "classification": "safe"},
+    ]
+    assert summary[3:] == legacy[len(legacy) - 1:] == [{"ingredient": "sodium hyaluronate", "classification": "safe"}]
+
+
+def test_word_results_are_memoized():
+    lookup = SafetyLookup(SAFETY)
+    assert lookup.match_words(["glycerln", "glycerln"]) == [("glycerin", "safe")] * 2
+    assert list(lookup._word_cache) == ["glycerln"]
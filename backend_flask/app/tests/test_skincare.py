@@ -0,0 +1,112 @@
+#test_skincare.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import random
+
+import numpy as np
+import scipy.sparse as sp
+
+import pytest
+
+from app import recommend
+from app.ocr import parse_ingredients_section
+from app.parse_utils import get_known_ingredients
+from app.skincare import INGREDIENT_GUIDE, SKIN_TYPE_RULES
+from app.skincare import analyze_product_for_skin_type, classify_ingredients_by_safety
+
+
+def legacy_analyze(skin_type, ingredient_list):
+    if skin_type not in INGREDIENT_GUIDE:
+        return f"No knowledge base for skin type {skin_type}"
+
+    recommended_list = INGREDIENT_GUIDE[skin_type]["recommended"]
+    avoid_list = INGREDIENT_GUIDE[skin_type]["avoid"]
+
+    present_recommended = [ing for ing in ingredient_list if ing in recommended_list]
+    present_avoid = [ing for ing in ingredient_list if ing in avoid_list]
+
+    summary = f"For {skin_type.upper()} skin:\n"
+    if present_recommended:
+        summary += f" - Good ingredients: {', '.join(present_recommended)}.\n"
+    if present_avoid:
+        summary += f" - Potentially problematic: {', '.join(present_avoid)}.\n"
+    if not present_recommended and not present_avoid:
+        summary += " - No major recommended or problematic ingredients detected.\n"
+    return summary
+
+
+def legacy_classify(skin_type, ingredient_list):
+    guide = INGREDIENT_GUIDE.get(skin_type, {})
+    safe = [x.lower() for x in guide.get("recommended", [])]
+    harmful = [x.lower() for x in guide.get("avoid", [])]
+    return {ing: "safe" if ing.lower() in safe else "harmful" if ing.lower() in harmful else "neutral"
+            for ing in ingredient_list}
+
+
+def random_lists(count, seed=0):
+    rng = random.Random(seed)
+    guide_names = [name for rules in INGREDIENT_GUIDE.values() for names in rules.values() for name in names]
+    others = ["aqua", "parfum", "Glycerin", "NIACINAMIDE", "xanthan gum"]
+    for _ in range(count):
+        yield rng.sample(guide_names, rng.randint(0, 12)) + rng.sample(others, rng.randint(0, 3))
+
+
+def test_matches_legacy_guide_lookups():
+    for ingredients in random_lists(200):
+        for skin_type in ("dry", "oily", "normal", "combination"):
+            assert analyze_product_for_skin_type(skin_type, ingredients) == legacy_analyze(skin_type, ingredients)
+            assert classify_ingredients_by_safety(skin_type, ingredients) == legacy_classify(skin_type, ingredients)
+
+
+@pytest.mark.parametrize("skin_type, expected", [
+    ("dry", {"fragrance (parfum)": "harmful", "glycerin": "safe", "alcohol denat": "neutral",
+             "aqua (water)": "neutral", "parfum / fragrance": "harmful"}),
+    ("oily", {"fragrance (parfum)": "neutral", "glycerin": "neutral", "alcohol denat": "neutral",
+              "aqua (water)": "neutral", "parfum / fragrance": "neutral"}),
+    ("normal", {"fragrance (parfum)": "neutral", "glycerin": "safe", "alcohol denat": "harmful",
+                "aqua (water)": "neutral", "parfum / fragrance": "neutral"}),
+])
+def test_parsed_synonym_names_get_guide_rules(skin_type, expected):
+    # The phrase matcher reports "Fragrance (Parfum)" by its catalog
+    # spelling; the guide lists only "fragrance".
+    ingredients = parse_ingredients_section(
+        "Fragrance (Parfum), Glycerin, Alcohol Denat., Aqua (Water), Parfum / Fragrance",
+        get_known_ingredients())
+    assert ingredients == list(expected)
+    assert classify_ingredients_by_safety(skin_type, ingredients) == expected
+
+    summary = analyze_product_for_skin_type(skin_type, ingredients)
+    for name, label in expected.items():
+        assert (name in summary) == (label != "neutral")
+
+
+def test_score_one_product_and_a_matrix():
+    lists = list(random_lists(50, seed=1))
+    rows, cols = [], []
+    for row, ingredients in enumerate(lists):
+        ids = {SKIN_TYPE_RULES.ids[i.lower()] for i in ingredients if i.lower() in SKIN_TYPE_RULES.ids}
+        rows.extend([row] * len(ids))
+        cols.extend(ids)
+    products = sp.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)),
+                             shape=(len(lists), len(SKIN_TYPE_RULES.names)))
+
+    scores = SKIN_TYPE_RULES.score_products(products)
+    for row, ingredients in enumerate(lists):
+        expected = SKIN_TYPE_RULES.score(list(dict.fromkeys(i.lower() for i in ingredients)))
+        assert dict(zip(SKIN_TYPE_RULES.skin_types, scores[row].tolist())) == expected
+
+    assert SKIN_TYPE_RULES.score(["Glycerin", "menthol", "camphor"]) == {"dry": -1, "oily": 1, "normal": 1}
+
+
+def test_catalog_skin_scores():
+    recommender = recommend.get_recommender()
+    catalog = recommend.load_catalog()
+    for row in random.Random(2).sample(range(len(catalog)), 40):
+        terms = recommender.vectorizer.transform([catalog["cleaned_ingredients"][row]]).indices
+        names = [recommender.vectorizer.vocabulary[t] for t in terms]
+        guide_names = [n for n in SKIN_TYPE_RULES.names if recommender.vectorizer.lookup(n) in set(terms)]
+        expected = SKIN_TYPE_RULES.score(guide_names)
+        assert dict(zip(SKIN_TYPE_RULES.skin_types, recommender.skin_scores[row].tolist())) == expected, names
@@ -0,0 +1,98 @@
+#test_staged_ocr.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import numpy as np
+import pytest
+
+from app import ocr
+from app.ocr import run_staged_ocr, DEFAULT_LANGUAGES, FAST_OCR_LANGUAGES
+
+BOX = [[0, 0], [100, 0], [100, 20], [0, 20]]
+IMAGE = np.zeros((40, 120, 3), dtype=np.uint8)
+
+
+class FakeReader:
+    def __init__(self, results):
+        self.results = results
+        self.calls = 0
+
+    def readtext(self, image, detail=1):
+        self.calls += 1
+        return self.results
+
+
+@pytest.fixture
+def readers(monkeypatch):
+    """
+    Installs one fake reader per language set; set .results on each, and
+    "language:<code>" as the first word of a text to have it detected as
+    that language.
+    """
+    readers = {FAST_OCR_LANGUAGES: FakeReader([]), DEFAULT_LANGUAGES: FakeReader([])}
+    monkeypatch.setattr(ocr, "get_reader", lambda languages: readers[tuple(languages)])
+    monkeypatch.setattr(ocr, "detect_language",
+                        lambda text: text.split()[0].split(":")[1] if text.startswith("language:") else "en")
+    return readers
+
+
+def results(text, confidence):
+    return [(BOX, word, confidence) for word in text.split()]
+
+
+def test_confident_english_is_not_escalated(readers):
+    readers[FAST_OCR_LANGUAGES].results = results("Ingredients: Aqua, Glycerin", 0.9)
+    found, info = run_staged_ocr(IMAGE, mode="staged", roi=False)
+
+    assert found == readers[FAST_OCR_LANGUAGES].results
+    assert info["escalated"] is False and info["reasons"] == []
+    assert info["language"] == "en" and info["fast_pass_confidence"] == 0.9
+    assert readers[DEFAULT_LANGUAGES].calls == 0
+    assert set(info["timings"]) == {"ocr_fast", "language_detection"}
+
+
+def test_low_confidence_escalates(readers):
+    readers[FAST_OCR_LANGUAGES].results = results("Ingredlents: Aqva", 0.4)
+    readers[DEFAULT_LANGUAGES].results = results("Ingredients: Aqua", 0.95)
+    found, info = run_staged_ocr(IMAGE, mode="staged", roi=False)
+
+    assert found == readers[DEFAULT_LANGUAGES].results
+    assert info["escalated"] is True and info["reasons"] == ["low_confidence"]
+    assert set(info["timings"]) == {"ocr_fast", "language_detection", "ocr_multilingual"}
+
+    # No text at all counts as zero confidence.
+    readers[FAST_OCR_LANGUAGES].results = []
+    assert run_staged_ocr(IMAGE, mode="staged", roi=False)[1]["reasons"] == ["low_confidence"]
+
+
+def test_other_supported_language_escalates(readers):
+    readers[FAST_OCR_LANGUAGES].results = results("language:fr Ingrédients: Eau", 0.9)
+    readers[DEFAULT_LANGUAGES].results = results("language:fr Ingrédients: Eau, Glycérine", 0.9)
+    found, info = run_staged_ocr(IMAGE, mode="staged", roi=False)
+
+    assert found == readers[DEFAULT_LANGUAGES].results
+    assert info["reasons"] == ["language"] and info["language"] == "fr"
+
+    # Both reasons at once.
+    readers[FAST_OCR_LANGUAGES].results = results("language:de Inhaltsstoffe", 0.55)
+    assert run_staged_ocr(IMAGE, mode="staged", roi=False)[1]["reasons"] == ["low_confidence", "language"]
+
+
+def test_unsupported_language_is_not_escalated(readers):
+    # The multilingual recognizer cannot read Korean either.
+    readers[FAST_OCR_LANGUAGES].results = results("language:ko 성분", 0.9)
+    _, info = run_staged_ocr(IMAGE, mode="staged", roi=False)
+    assert info["escalated"] is False and info["language"] == "ko"
+    assert readers[DEFAULT_LANGUAGES].calls == 0
+
+
+def test_full_mode_reads_once_with_every_language(readers):
+    readers[DEFAULT_LANGUAGES].results = results("Ingredients: Aqua", 0.3)
+    found, info = run_staged_ocr(IMAGE, mode="full", roi=False)
+
+    assert found == readers[DEFAULT_LANGUAGES].results
+    assert readers[FAST_OCR_LANGUAGES].calls == 0 and readers[DEFAULT_LANGUAGES].calls == 1
+    assert info["mode"] == "full" and info["escalated"] is False
+    assert set(info["timings"]) == {"ocr_multilingual", "language_detection"}
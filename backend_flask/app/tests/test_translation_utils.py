@@ -0,0 +1,47 @@
+#test_translation_utils.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import pytest
+
+from app import translation_utils
+from app.llm_cache import TranslationCache
+from app.ocr import locate_ingredient_section
+
+
+@pytest.fixture
+def stub_openai(openai_server, tmp_path):
+    """
+    Answers every translation with a fixed text; yields the prompts sent.
+    """
+    openai_server.answer = lambda prompt: "Water, Glycerin, Fragrance"
+    translation_utils.set_translation_cache(TranslationCache(str(tmp_path / "llm_cache.sqlite")))
+    yield openai_server.prompts
+    translation_utils.set_translation_cache(None)
+
+
+@pytest.mark.parametrize("text, header, section", [
+    ("Crème hydratante. INGRÉDIENTS: AQUA, GLYCÉRINE, PARFUM. Mode d'emploi", "INGRÉDIENTS:", "AQUA, GLYCÉRINE, PARFUM"),
+    ("Inhaltsstoffe: Aqua, Glycerin, Parfum. Anwendung", "Inhaltsstoffe:", "Aqua, Glycerin, Parfum"),
+    ("Ingredienti: Aqua, Glicerina", "Ingredienti:", "Aqua, Glicerina"),
+    ("Ingredientes Aqua, Glicerina. Modo de uso", "Ingredientes", "Aqua, Glicerina"),
+    ("Ingredients: Water, Glycerin. Directions", "Ingredients:", "Water, Glycerin"),
+])
+def test_locate_ingredient_section(text, header, section):
+    assert locate_ingredient_section(text) == (header, section)
+
+
+def test_locate_ingredient_section_without_header():
+    assert locate_ingredient_section("Crème hydratante pour peaux sèches") is None
+
+
+def test_identical_sections_are_translated_once(stub_openai):
+    assert translation_utils.translate_to_english("Aqua, Glycérine, Parfum") == "Water, Glycerin, Fragrance"
+    assert translation_utils.translate_to_english("Aqua,  Glycérine,\nParfum") == "Water, Glycerin, Fragrance"
+    assert len(stub_openai) == 1
+    assert "Aqua, Glycérine, Parfum" in stub_openai[0]
+
+    stats = translation_utils.get_translation_cache().stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 1
@@ -0,0 +1,135 @@
+#test_uploads.py
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import io
+
+import cv2
+import numpy as np
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app import uploads
+from app.uploads import UploadError, check_image, decode_image, image_size, read_upload, reduced_decode_factor
+
+
+def encode(image, ext=".jpg"):
+    return bytearray(cv2.imencode(ext, image)[1].tobytes())
+
+
+@pytest.fixture
+def label(label_path):
+    return cv2.imread(label_path)
+
+
+def test_header_size_matches_decoded_image(label, label_bytes):
+    height, width = label.shape[:2]
+    assert image_size(label_bytes) == (width, height)
+    assert image_size(encode(label, ".png")) == (width, height)
+    assert image_size(encode(label, ".bmp")) == (width, height)
+    assert image_size(b"GIF89a") is None
+
+
+@pytest.mark.parametrize("ext, params", [
+    (".png", []), (".bmp", []), (".tiff", []),
+    (".webp", [cv2.IMWRITE_WEBP_QUALITY, 80]), (".webp", [cv2.IMWRITE_WEBP_QUALITY, 101]),
+])
+def test_every_format_is_size_checked_before_decoding(label, monkeypatch, ext, params):
+    height, width = label.shape[:2]
+    data = bytearray(cv2.imencode(ext, label, params)[1].tobytes())
+    assert image_size(data) == (width, height)
+
+    with pytest.raises(UploadError) as e:
+        check_image(data[:12])
+    assert e.value.status == 400
+
+    monkeypatch.setattr(uploads, "MAX_IMAGE_PIXELS", width * height - 1)
+    with pytest.raises(UploadError) as e:
+        decode_image(data)
+    assert e.value.status == 413
+
+
+def test_extended_webp_and_top_down_bmp_headers():
+    vp8x = b"RIFF\x00\x00\x00\x00WEBPVP8X\x0a\x00\x00\x00\x10\x00\x00\x00" + \
+        (40000 - 1).to_bytes(3, "little") + (30000 - 1).to_bytes(3, "little")
+    assert image_size(vp8x) == (40000, 30000)
+    with pytest.raises(UploadError) as e:
+        check_image(vp8x)
+    assert e.value.status == 413
+
+    bmp = bytearray(cv2.imencode(".bmp", np.zeros((20, 30, 3), np.uint8))[1].tobytes())
+    bmp[22:26] = (-20).to_bytes(4, "little", signed=True)
+    assert image_size(bmp) == (30, 20)
+
+
+def test_reduced_decode_factor():
+    assert reduced_decode_factor((6000, 4000), max_side=2560) == 2
+    assert reduced_decode_factor((12000, 8000), max_side=1280) == 8
+    assert reduced_decode_factor((4000, 3000), min_side=448) == 4
+    assert reduced_decode_factor((2000, 1500), max_side=2560) == 1
+    assert reduced_decode_factor((6000, 4000)) == 1
+
+
+def test_large_jpegs_are_decoded_reduced(label):
+    big = cv2.resize(label, None, fx=4, fy=4, interpolation=cv2.INTER_LINEAR)
+    data = encode(big)
+    reduced = decode_image(data, max_side=big.shape[1] // 4)
+    assert reduced.shape[:2] == (big.shape[0] // 4, big.shape[1] // 4)
+    assert decode_image(data).shape == big.shape
+    # Other formats are decoded at full size.
+    assert decode_image(encode(big, ".png"), max_side=big.shape[1] // 4).shape == big.shape
+
+
+def test_rejects_undecodable_images(label, monkeypatch):
+    with pytest.raises(UploadError) as e:
+        check_image(b"GIF89a not an image")
+    assert e.value.status == 415
+
+    # A JPEG signature without a frame header, and a BMP with a bad body.
+    for data in (b"\xff\xd8\xff\xe0" + b"\x00" * 64, b"BM" + b"\x00" * 64):
+        with pytest.raises(UploadError) as e:
+            decode_image(data)
+        assert e.value.status == 400
+
+    monkeypatch.setattr(uploads, "MAX_IMAGE_PIXELS", 1000)
+    with pytest.raises(UploadError) as e:
+        check_image(encode(label))
+    assert e.value.status == 413
+
+
+def test_read_upload_stops_at_the_limit():
+    data = os.urandom(300_000)
+    assert read_upload(FileStorage(io.BytesIO(data))) == data
+
+    stream = io.BytesIO(data)
+    with pytest.raises(UploadError) as e:
+        read_upload(FileStorage(stream), max_bytes=100_000)
+    assert e.value.status == 413
+    assert stream.tell() < 200_000
+
+    with pytest.raises(UploadError):
+        read_upload(FileStorage(io.BytesIO(b"")))
+
+
+def test_routes_reject_bad_uploads_before_queueing(monkeypatch):
+    from app import create_app
+    from app import routes
+
+    client = create_app().test_client()
+    submitted = []
+    monkeypatch.setattr(routes.job_manager, "submit", lambda *args, **kwargs: submitted.append(args))
+    monkeypatch.setattr(routes, "predict_skin_type", lambda image: submitted.append(image))
+
+    response = client.post("/analyze_product", data={
+        "skin_type": "dry", "label_file": (io.BytesIO(b"\xff\xd8\xff\xe0" + b"\x00" * 64), "label.jpg")})
+    assert response.status_code == 400 and "error" in response.json
+
+    response = client.post("/classify_skin", data={"file": (io.BytesIO(b"not an image"), "face.jpg")})
+    assert response.status_code == 415
+    assert submitted == []
+
+    client.application.config["MAX_CONTENT_LENGTH"] = 1024
+    response = client.post("/classify_skin", data={"file": (io.BytesIO(os.urandom(4096)), "face.jpg")})
+    assert response.status_code == 413 and "error" in response.json
@@ -1,11 +1,23 @@
 import openai
 from langdetect import detect
 import os
+import threading
+import time
 
 from dotenv import load_dotenv
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")  
 
+from app.llm_cache import TranslationCache, empty_cache_stats
+from app.metrics import registry, cache_metrics, record_llm_call, LLM_FAILURES
+
+TRANSLATION_MODEL = "gpt-4o"
+# Bump when the prompt or model changes so cached translations are not reused.
+TRANSLATION_PROMPT_VERSION = f"{TRANSLATION_MODEL}/translate-v1"
+
+_translation_cache = None
+_translation_cache_lock = threading.Lock()
+
 
 def detect_language(text):
     try:
@@ -13,7 +25,42 @@ def detect_language(text):
     except:
         return "unknown"
 
+def get_translation_cache():
+    global _translation_cache
+    with _translation_cache_lock:
+        if _translation_cache is None:
+            _translation_cache = TranslationCache()
+        return _translation_cache
+
+
+def set_translation_cache(cache):
+    global _translation_cache
+    with _translation_cache_lock:
+        _translation_cache = cache
+
+
+def _translation_cache_metrics():
+    # Scraping /metrics must not open (and create) the SQLite file.
+    with _translation_cache_lock:
+        cache = _translation_cache
+    return cache_metrics("translations", cache.stats() if cache is not None else empty_cache_stats())
+
+
+registry.register_collector(_translation_cache_metrics)
+
+
 def translate_to_english(text):
+    """
+    Translates an ingredient list to English with GPT-4o. Identical texts
+    are answered from the translation cache. Returns the text unchanged if
+    the translation fails.
+    """
+    cache = get_translation_cache()
+    cached = cache.get(text, TRANSLATION_PROMPT_VERSION)
+    if cached is not None:
+        print("[INFO] Translation served from cache.")
+        return cached
+
     prompt = f"""You are a translator. The following skincare ingredient list is written in a foreign language. Please translate it to English. Keep the structure and ingredient names. Only translate the words.
 
     Text:
@@ -22,14 +69,20 @@ def translate_to_english(text):
     Translated Ingredient List:"""
 
     try:
+        start = time.perf_counter()
         completion = openai.ChatCompletion.create(
-            model="gpt-4o",
+            model=TRANSLATION_MODEL,
             messages=[
                 {"role": "system", "content": "You are a translator that converts skincare ingredient lists to English accurately."},
                 {"role": "user", "content": prompt}
             ]
         )
-        return completion.choices[0].message['content']
+        record_llm_call("translation", time.perf_counter() - start, completion)
+        translation = completion.choices[0].message['content']
     except Exception as e:
+        LLM_FAILURES.inc(purpose="translation")
         print(f"[ERROR] Translation failed: {e}")
         return text  
+
+    cache.put(text, translation, TRANSLATION_PROMPT_VERSION)
+    return translation
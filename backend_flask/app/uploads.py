@@ -0,0 +1,196 @@
+# uploads.py
+import os
+import struct
+
+import cv2
+import numpy as np
+
+# Largest accepted image upload, in bytes.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+# Largest accepted image, in decoded pixels; bigger headers are rejected
+# before decoding.
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(50_000_000)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+]
+# Scale factors libjpeg can decode at directly, largest first.
+REDUCED_FLAGS = [(8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)]
+
+
+class UploadError(Exception):
+    """
+    An upload that is rejected. payload is the JSON error body and status
+    the HTTP status code to answer with.
+    """
+
+    def __init__(self, payload, status=400):
+        super().__init__(payload.get("error"))
+        self.payload = payload
+        self.status = status
+
+
+def read_upload(file, max_bytes=None):
+    """
+    Reads an uploaded file in chunks, raising UploadError (413) as soon as
+    it grows past max_bytes instead of buffering all of it first.
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    data = bytearray()
+    while True:
+        chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > max_bytes:
+            raise UploadError({"error": f"Image is larger than {max_bytes // (1024 * 1024)} MB."}, 413)
+    if not data:
+        raise UploadError({"error": "Uploaded image is empty."}, 400)
+    return data
+
+
+def image_format(data):
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    for signature, name in IMAGE_SIGNATURES:
+        if data[:len(signature)] == signature:
+            return name
+    return None
+
+
+def _jpeg_size(data):
+    # Walk the marker segments up to the first start-of-frame.
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in (0x01, *range(0xD0, 0xDA)):
+            offset += 2
+            continue
+        (length,) = struct.unpack(">H", data[offset + 2:offset + 4])
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def _webp_size(data):
+    chunk = bytes(data[12:16])
+    if chunk == b"VP8 " and len(data) >= 30 and data[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", bytes(data[26:30]))
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25 and data[20] == 0x2F:
+        (bits,) = struct.unpack("<I", bytes(data[21:25]))
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        return (int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1)
+    return None
+
+
+def _bmp_size(data):
+    if len(data) < 26:
+        return None
+    (header_size,) = struct.unpack("<I", bytes(data[14:18]))
+    if header_size == 12:
+        return struct.unpack("<HH", bytes(data[18:22]))
+    width, height = struct.unpack("<ii", bytes(data[18:26]))
+    # Negative heights are top-down bitmaps.
+    return abs(width), abs(height)
+
+
+def _tiff_size(data):
+    # Width and height tags of the first image file directory.
+    order = "<" if data[:2] == b"II" else ">"
+    try:
+        (offset,) = struct.unpack(order + "I", bytes(data[4:8]))
+        (count,) = struct.unpack(order + "H", bytes(data[offset:offset + 2]))
+        size = {}
+        for i in range(count):
+            entry = bytes(data[offset + 2 + 12 * i:offset + 14 + 12 * i])
+            tag, kind = struct.unpack(order + "HH", entry[:4])
+            if tag in (256, 257):
+                fmt = order + ("H" if kind == 3 else "I")
+                size[tag] = struct.unpack(fmt, entry[8:8 + struct.calcsize(fmt)])[0]
+    except struct.error:
+        return None
+    if 256 not in size or 257 not in size:
+        return None
+    return size[256], size[257]
+
+
+HEADER_PARSERS = {"jpeg": _jpeg_size, "webp": _webp_size, "bmp": _bmp_size, "tiff": _tiff_size}
+
+
+def image_size(data):
+    """
+    (width, height) read from the image header, or None for unknown
+    formats and truncated headers.
+    """
+    kind = image_format(data)
+    if kind == "png":
+        return struct.unpack(">II", bytes(data[16:24])) if len(data) >= 24 else None
+    parser = HEADER_PARSERS.get(kind)
+    return parser(data) if parser else None
+
+
+def check_image(data):
+    """
+    Cheap validation of an upload before it is queued: a known image
+    signature and a header size within MAX_IMAGE_PIXELS, so nothing is
+    decoded before its size is known. Returns (format, size); raises
+    UploadError otherwise.
+    """
+    kind = image_format(data)
+    if kind is None:
+        raise UploadError({"error": "Unsupported image format. Upload a JPEG, PNG, WebP, BMP or TIFF image."}, 415)
+    size = image_size(data)
+    if size is None or 0 in size:
+        raise UploadError({"error": "Image could not be decoded."}, 400)
+    if size[0] * size[1] > MAX_IMAGE_PIXELS:
+        raise UploadError({"error": f"Image is larger than {MAX_IMAGE_PIXELS // 1_000_000} megapixels."}, 413)
+    return kind, size
+
+
+def reduced_decode_factor(size, max_side=None, min_side=None):
+    """
+    Largest JPEG decode reduction (1, 2, 4 or 8) that keeps the long side
+    at least max_side and the short side at least min_side.
+    """
+    if size is None or (max_side is None and min_side is None):
+        return 1
+    long_side, short_side = max(size), min(size)
+    for factor, _ in REDUCED_FLAGS:
+        if (max_side is None or long_side / factor >= max_side) and \
+                (min_side is None or short_side / factor >= min_side):
+            return factor
+    return 1
+
+
+def decode_image(data, max_side=None, min_side=None):
+    """
+    Decodes an uploaded image to BGR. JPEGs bigger than the caller needs
+    (see reduced_decode_factor) are decoded directly at 1/2, 1/4 or 1/8
+    scale, which skips most of the IDCT work and the full-size buffer.
+    Raises UploadError for data that is not a decodable image.
+    """
+    kind, size = check_image(data)
+    flag = cv2.IMREAD_COLOR
+    if kind == "jpeg":
+        factor = reduced_decode_factor(size, max_side, min_side)
+        flag = dict(REDUCED_FLAGS).get(factor, cv2.IMREAD_COLOR)
+    image_bgr = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    if image_bgr is None or image_bgr.size == 0:
+        raise UploadError({"error": "Image could not be decoded."}, 400)
+    return image_bgr